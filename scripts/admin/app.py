@@ -4,7 +4,7 @@
 
 import os
 import re
-import yaml
+import sys
 import shutil
 from pathlib import Path
 from datetime import datetime
@@ -12,6 +12,12 @@ from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field, asdict
 from flask import Flask, render_template, jsonify, request, send_from_directory
 
+# 共享 scripts/ 目录下的 frontmatter 编解码模块
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from frontmatter_codec import parse_frontmatter as _parse_frontmatter, dump_yaml
+from output_writer import write_if_changed
+
 app = Flask(__name__,
             template_folder='templates',
             static_folder='static')
@@ -38,23 +44,15 @@ class Article:
 
 def parse_frontmatter(content: str) -> tuple[Dict[str, Any], str]:
     """解析 YAML front matter"""
-    if not content.startswith("---\n"):
-        return {}, content
     try:
-        end = content.find("\n---\n", 4)
-        if end == -1:
-            return {}, content
-        fm_text = content[4:end]
-        body = content[end + 5:]
-        fm = yaml.safe_load(fm_text) or {}
-        return fm, body
+        return _parse_frontmatter(content)
     except Exception:
         return {}, content
 
 
 def format_frontmatter(fm: Dict[str, Any]) -> str:
     """格式化 front matter"""
-    return yaml.dump(fm, allow_unicode=True, sort_keys=False, default_flow_style=False)
+    return dump_yaml(fm)
 
 
 def load_article(path: Path) -> Optional[Article]:
@@ -187,7 +185,7 @@ def create_article():
     }
 
     content = f"---\n{format_frontmatter(fm)}---\n\n{data.get('content', '')}\n"
-    file_path.write_text(content, encoding="utf-8")
+    write_if_changed(file_path, content)
 
     return jsonify({
         "success": True,
@@ -225,7 +223,7 @@ def update_article(article_path):
 
     # 写回
     new_content = f"---\n{format_frontmatter(fm)}---\n{new_body}"
-    path.write_text(new_content, encoding="utf-8")
+    write_if_changed(path, new_content)
 
     return jsonify({"success": True})
 
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Obsidian to Hugo synchronizer
+
+Generates synthetic vaults (see vault_generator.py) of each requested size
+and times the parser, frontmatter generation, a cold and an incremental
+sync_vault, and BlogManager.list_articles / get_stats on the synced site.
+Each benchmark runs `--repeat` times and the median is kept. Results are
+written as JSON together with the git commit and Python version, and
+`--compare` prints the ratio against an earlier results file. The run also
+fails when transform_body is slower than SCANNER_RATIO times the separate
+regex passes it replaced:
+
+    python bench_obsidian_sync.py --sizes 100 10000 --output before.json
+    python bench_obsidian_sync.py --sizes 100 10000 --compare before.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import logging
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from obsidian_sync import (ObsidianHugoSynchronizer, ObsidianParser, HugoFrontmatterGenerator,
+                           SyncConfig)
+from cli.manager import BlogManager
+from vault_generator import generate_vault
+
+
+DEFAULT_SIZES = [100, 10000, 100000]
+
+# Ratio against the baseline above which --compare marks a benchmark
+REGRESSION_RATIO = 1.10
+# transform_body also skips fences, inline code and comments, yet must not
+# be slower than the separate regex passes it replaced
+SCANNER_RATIO = 1.0
+
+_BASELINE_WIKILINK_RE = re.compile(r'\[\[([^\]|]+)(\|([^\]]+))?\]\]')
+_BASELINE_EMBED_RE = re.compile(r'!\[\[([^\]|]+)(\|([^\]]+))?\]\]')
+_BASELINE_TAG_RE = re.compile(r'#([a-zA-Z0-9_\-\u4e00-\u9fff]+)')
+
+
+def baseline_passes(body: str) -> str:
+    """The separate re.sub passes transform_body replaced, kept as its speed reference."""
+    _BASELINE_TAG_RE.findall(body)
+    body = _BASELINE_WIKILINK_RE.sub(lambda m: f"[{m.group(3) or m.group(1)}]({m.group(1)}.md)", body)
+    body = _BASELINE_EMBED_RE.sub(lambda m: f"![{m.group(3) or m.group(1)}]({m.group(1)})", body)
+    body = re.sub(r'%%[^%]*%%', '', body)
+    return re.sub(r'%%.*?%%', '', body, flags=re.DOTALL)
+
+
+def _measure(run: Callable[[], Any], repeat: int,
+             setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """Median and minimum wall time of `run` over `repeat` runs."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return {'median': statistics.median(times), 'min': min(times), 'runs': len(times)}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_size(workdir: Path, size: int, repeat: int, seed: int, jobs: int) -> Dict[str, Dict[str, float]]:
+    """Run every benchmark on one generated vault."""
+    vault = workdir / f"vault-{size}"
+    site = workdir / f"site-{size}"
+    start = time.perf_counter()
+    summary = generate_vault(vault, size, seed)
+    print(f"[{size}] generated {summary['notes']} notes ({summary['bytes'] / 1e6:.1f} MB) "
+          f"in {time.perf_counter() - start:.1f}s", flush=True)
+
+    config = SyncConfig(obsidian_vault_path=str(vault), hugo_content_path=str(site / 'content'),
+                        log_level='ERROR', jobs=jobs)
+    parser = ObsidianParser(config)
+    generator = HugoFrontmatterGenerator(config)
+    notes = [(path, path.read_text(encoding='utf-8')) for path in sorted(vault.rglob('*.md'))]
+    bodies = [(path, parser.extract_frontmatter(content)) for path, content in notes]
+
+    def reset_site():
+        shutil.rmtree(site, ignore_errors=True)
+
+    def generate_all():
+        for path, (frontmatter, body) in bodies:
+            generator.generate_frontmatter(path.stem, path, frontmatter, body)
+
+    benchmarks: Dict[str, Callable[[], Any]] = {
+        'parser.extract_frontmatter': lambda: [parser.extract_frontmatter(c) for _, c in notes],
+        'parser.transform_body': lambda: [parser.transform_body(b) for _, (_, b) in bodies],
+        'parser.baseline_passes': lambda: [baseline_passes(b) for _, (_, b) in bodies],
+        'parser.extract_tags_from_content': lambda: [parser.extract_tags_from_content(c) for _, c in notes],
+        'parser.parse_note': lambda: [parser.parse_note(c, p.stem) for p, c in notes],
+        'generate_frontmatter': generate_all,
+    }
+    results = {}
+    for name, run in benchmarks.items():
+        results[name] = _measure(run, repeat)
+
+    results['sync_vault.cold'] = _measure(
+        lambda: ObsidianHugoSynchronizer(config).sync_vault(), repeat, setup=reset_site)
+    results['sync_vault.incremental'] = _measure(
+        lambda: ObsidianHugoSynchronizer(config).sync_vault(), repeat)
+
+    manager = BlogManager(str(site))
+    results['BlogManager.list_articles'] = _measure(manager.list_articles, repeat)
+    results['BlogManager.get_stats'] = _measure(manager.get_stats, repeat)
+
+    for name, result in results.items():
+        result['per_note_us'] = result['median'] / size * 1e6
+        print(f"[{size}] {name:<34} {result['median']:9.4f}s  ({result['per_note_us']:8.1f} us/note)",
+              flush=True)
+    return results
+
+
+def scanner_regressions(data: Dict[str, Any]) -> List[str]:
+    """Sizes where transform_body is more than SCANNER_RATIO times slower than baseline_passes."""
+    regressions = []
+    for size, results in data['results'].items():
+        scanner, baseline = results['parser.transform_body'], results['parser.baseline_passes']
+        ratio = scanner['min'] / baseline['min'] if baseline['min'] else float('inf')
+        if ratio > SCANNER_RATIO:
+            regressions.append(f"parser.transform_body@{size} (x{ratio:.2f} of the baseline passes)")
+    return regressions
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Benchmarks that got slower than REGRESSION_RATIO, printing the whole table."""
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('commit')} (median seconds):")
+    for size, results in current['results'].items():
+        for name, result in results.items():
+            old = baseline['results'].get(size, {}).get(name)
+            if not old:
+                continue
+            ratio = result['median'] / old['median'] if old['median'] else float('inf')
+            flag = '  SLOWER' if ratio > REGRESSION_RATIO else ''
+            print(f"  [{size}] {name:<34} {old['median']:9.4f} -> {result['median']:9.4f}  x{ratio:.2f}{flag}")
+            if flag:
+                regressions.append(f"{name}@{size}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Obsidian to Hugo synchronizer')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Vault sizes in notes (default: 100 10000 100000)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark; the median is kept')
+    parser.add_argument('--seed', type=int, default=0, help='Vault generator seed')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='Worker processes for sync_vault')
+    parser.add_argument('--workdir', help='Directory for generated vaults (default: a temporary one)')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    logging.getLogger('obsidian_sync').setLevel(logging.ERROR)
+    output = Path(args.output).resolve() if args.output else None
+    baseline = Path(args.compare).resolve() if args.compare else None
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix='obsidian-bench-')).resolve()
+    cwd = os.getcwd()
+    # The synchronizer logs to obsidian_sync.log in the working directory
+    os.chdir(workdir)
+    try:
+        data = {
+            'meta': {
+                'commit': _git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'seed': args.seed,
+                'repeat': args.repeat,
+                'jobs': args.jobs,
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            },
+            'results': {},
+        }
+        for size in args.sizes:
+            data['results'][str(size)] = bench_size(workdir, size, args.repeat, args.seed, args.jobs)
+    finally:
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        print(f"\nResults written to {output}")
+    failed = False
+    slow_scanner = scanner_regressions(data)
+    if slow_scanner:
+        print(f"transform_body slower than x{SCANNER_RATIO} the baseline passes: {', '.join(slow_scanner)}")
+        failed = True
+    if baseline:
+        with open(baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(data, json.load(f))
+        if regressions:
+            print(f"{len(regressions)} benchmarks slower than x{REGRESSION_RATIO}: {', '.join(regressions)}")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,11 +11,12 @@
 import os
 import sys
 import argparse
-import shutil
 import re
 from datetime import datetime
 from pathlib import Path
 
+from output_writer import write_if_changed
+
 class BlogSync:
     def __init__(self):
         # 配置路径
@@ -142,10 +143,9 @@ TocOpen: false
                 print(f"   标题: {self.extract_title_from_content(original_content)}")
                 print(f"   描述: {self.extract_description(original_content)}")
             else:
-                # 写入文件
+                # 写入文件（原子替换）
                 try:
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(new_content)
+                    write_if_changed(file_path, new_content)
                     print(f"   [SUCCESS] 格式化完成")
                     formatted_count += 1
                 except Exception as e:
@@ -186,19 +186,14 @@ TocOpen: false
                 print(f"   然后进行格式化")
             else:
                 try:
-                    # 复制文件
-                    shutil.copy2(obsidian_file, target_file)
-                    print(f"   [COPY] 文件已复制")
-
-                    # 读取并格式化
-                    with open(target_file, 'r', encoding='utf-8') as f:
+                    # 读取源文件，一次写入带 Front Matter 的结果
+                    with open(obsidian_file, 'r', encoding='utf-8') as f:
                         content = f.read()
 
                     front_matter = self.generate_front_matter(target_file, content)
                     new_content = front_matter + content
 
-                    with open(target_file, 'w', encoding='utf-8') as f:
-                        f.write(new_content)
+                    write_if_changed(target_file, new_content)
 
                     print(f"   [SUCCESS] 同步并格式化完成")
                     synced_count += 1
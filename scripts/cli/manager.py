@@ -4,7 +4,6 @@
 
 import os
 import re
-import yaml
 import subprocess
 import platform
 from pathlib import Path
@@ -12,6 +11,9 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field
 
+from frontmatter_codec import parse_frontmatter, dump_yaml
+from output_writer import write_if_changed
+
 
 @dataclass
 class Article:
@@ -50,24 +52,14 @@ class BlogManager:
 
     def _parse_frontmatter(self, content: str) -> tuple[Dict[str, Any], str]:
         """解析 YAML front matter"""
-        if not content.startswith("---\n"):
-            return {}, content
-
         try:
-            end = content.find("\n---\n", 4)
-            if end == -1:
-                return {}, content
-
-            fm_text = content[4:end]
-            body = content[end + 5:]
-            fm = yaml.safe_load(fm_text) or {}
-            return fm, body
+            return parse_frontmatter(content)
         except Exception:
             return {}, content
 
     def _format_frontmatter(self, fm: Dict[str, Any]) -> str:
         """格式化 front matter"""
-        return yaml.dump(fm, allow_unicode=True, sort_keys=False, default_flow_style=False)
+        return dump_yaml(fm)
 
     def list_articles(self, tag: str = None, category: str = None, draft: bool = None) -> List[Article]:
         """列出所有文章"""
@@ -200,7 +192,7 @@ class BlogManager:
         }
 
         content = f"---\n{self._format_frontmatter(fm)}---\n\n# {title}\n\n"
-        file_path.write_text(content, encoding="utf-8")
+        write_if_changed(file_path, content)
 
         return file_path
 
@@ -258,7 +250,7 @@ class BlogManager:
 
         # 写回
         new_content = f"---\n{self._format_frontmatter(fm)}---\n{body}"
-        file_path.write_text(new_content, encoding="utf-8")
+        write_if_changed(file_path, new_content)
         return True
 
     def preview(self) -> bool:
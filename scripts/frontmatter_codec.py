@@ -0,0 +1,166 @@
+"""
+Shared YAML frontmatter codec
+
+Used by obsidian_sync.py, cli/manager.py and admin/app.py. Loads YAML with
+libyaml's CSafeLoader when PyYAML was built with it and falls back to the
+pure-Python SafeLoader otherwise. Dumping always uses the pure-Python
+SafeDumper: the libyaml emitter escapes some characters (emoji, U+0085,
+U+2028) that it writes literally, and output must not depend on the build. Parsed headers are kept
+in a bounded LRU cache keyed by the hash of the frontmatter text, so
+unchanged headers are only parsed once per process.
+read_frontmatter parses a file's header without reading its body.
+"""
+
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import yaml
+
+from yaml import SafeDumper
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+    HAS_LIBYAML = True
+except ImportError:
+    from yaml import SafeLoader
+    HAS_LIBYAML = False
+
+
+DEFAULT_CACHE_SIZE = 4096
+
+# Bytes read at a time by read_frontmatter; most headers fit in the first read
+HEADER_CHUNK_SIZE = 4096
+
+# Frontmatter delimiters, with LF or CRLF line endings
+_OPEN_RE = re.compile(r'---\r?\n')
+_CLOSE_RE = re.compile(r'\r?\n---\r?\n')
+_OPEN_BYTES_RE = re.compile(_OPEN_RE.pattern.encode('ascii'))
+_CLOSE_BYTES_RE = re.compile(_CLOSE_RE.pattern.encode('ascii'))
+
+_MISSING = object()
+
+
+class _FrontmatterCache:
+    """Thread-safe LRU of parsed frontmatter keyed by a digest of its text."""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[bytes, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return _MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: bytes, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_cache = _FrontmatterCache()
+
+
+def _copy(value: Any) -> Any:
+    """Copy the mutable containers YAML produces; scalars are immutable."""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+def load_yaml(text: str) -> Any:
+    """Parse YAML text, reusing the cached result for identical text.
+
+    Callers get their own copy, so mutating the result never leaks into
+    the cache. Parse errors propagate as yaml.YAMLError.
+    """
+    key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+    cached = _cache.get(key)
+    if cached is _MISSING:
+        cached = yaml.load(text, Loader=SafeLoader)
+        _cache.put(key, cached)
+    return _copy(cached)
+
+
+def dump_yaml(data: Dict[str, Any]) -> str:
+    """Serialize frontmatter the way every writer in this repo formats it."""
+    return yaml.dump(data, Dumper=SafeDumper, allow_unicode=True,
+                     sort_keys=False, default_flow_style=False)
+
+
+def split_frontmatter(content: str) -> Tuple[Optional[str], str]:
+    """Split `---` delimited frontmatter text from the body.
+
+    Returns (None, content) when the content has no complete frontmatter
+    block. Delimiter lines may end in LF or CRLF.
+    """
+    opening = _OPEN_RE.match(content)
+    if opening is None:
+        return None, content
+    closing = _CLOSE_RE.search(content, opening.end())
+    if closing is None:
+        return None, content
+    return content[opening.end():closing.start()], content[closing.end():]
+
+
+def parse_frontmatter(content: str) -> Tuple[Dict[str, Any], str]:
+    """Return (frontmatter, body); YAML errors propagate to the caller."""
+    fm_text, body = split_frontmatter(content)
+    if fm_text is None:
+        return {}, content
+    return load_yaml(fm_text) or {}, body
+
+
+def read_frontmatter(path, chunk_size: int = HEADER_CHUNK_SIZE) -> Dict[str, Any]:
+    """Parse a file's frontmatter without reading past its closing `---`.
+
+    Reads `chunk_size` bytes at a time, so a note with a short header
+    costs one small read however long its body is. The block read is
+    split by parse_frontmatter, so the result always matches parsing the
+    whole file: {} when it has no complete frontmatter block; YAML and
+    decoding errors propagate.
+    """
+    with open(path, 'rb') as f:
+        data = f.read(chunk_size)
+        opening = _OPEN_BYTES_RE.match(data)
+        if opening is None:
+            return {}
+        while True:
+            closing = _CLOSE_BYTES_RE.search(data, opening.end())
+            if closing is not None:
+                return parse_frontmatter(data[:closing.end()].decode('utf-8'))[0]
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return {}
+            data += chunk
+
+
+def cache_info() -> Dict[str, int]:
+    return {'hits': _cache.hits, 'misses': _cache.misses, 'size': len(_cache._data),
+            'maxsize': _cache.maxsize}
+
+
+def clear_cache():
+    _cache.clear()
@@ -11,16 +11,73 @@ Date: 2025-10-22
 
 import os
 import re
+import json
+import time
 import shutil
-import yaml
+import hashlib
 import argparse
-from datetime import datetime
-from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from datetime import date, datetime
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Set, Tuple, Any, Iterator, Iterable, Callable, Union
+from urllib.parse import urlparse
+from concurrent.futures import ProcessPoolExecutor
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict, field, fields
 from zoneinfo import ZoneInfo
 
+from frontmatter_codec import parse_frontmatter, read_frontmatter, load_yaml, dump_yaml
+from output_writer import encode_text, write_if_changed
+from sync_attachments import AttachmentStore
+from sync_images import ImageOptimizer, Image as _PILImage
+from sync_icloud import (ICLOUD_STUB_SUFFIX, PlaceholderPrefetcher, is_dataless,
+                         placeholder_target, stub_path)
+from sync_io import AsyncIOEngine, SharedReads
+from sync_git import GitVault
+from sync_metrics import NoteTimings, SyncMetrics
+from sync_links import (LinkIndex, NoteGraph, DependencyIndex, heading_anchors, split_link_target,
+                        note_dependency, file_dependency, embed_dependency, placeholder_dependency,
+                        HEADING_RE, next_fence)
+from sync_transclusion import Fragment, TransclusionCache, embed_section, fragment_key
+
+
+# Bump when the generated output changes in a way the config hash cannot see,
+# so every manifest entry written by an older version is treated as stale.
+MANIFEST_VERSION = 3
+
+# Number of changed notes handed to the converter (or worker pool) at once.
+SYNC_BATCH_SIZE = 256
+
+# Changed notes are read while the link index is being built; contents up to
+# this many bytes are kept for conversion, the rest are read again later.
+READ_AHEAD_BYTES = 64 * 1024 * 1024
+
+# sync_config.yaml sections whose keys map directly onto SyncConfig fields.
+_CONFIG_SECTIONS = ('content_processing', 'file_organization')
+
+# SyncConfig fields that do not influence the generated Hugo files.
+_NON_OUTPUT_CONFIG_FIELDS = ('log_level', 'manifest_path', 'manifest_scope', 'use_manifest', 'jobs',
+                             'attachment_hardlinks', 'image_jobs', 'data_path', 'io_concurrency',
+                             'icloud_prefetch', 'prefetch_wait')
+
+# A note's (headings as (level, text), first paragraph line), see _outline.
+Outline = Tuple[List[Tuple[int, str]], Optional[str]]
+
+# Values of SyncConfig.publish_filter; None syncs every note.
+PUBLISH_FILTERS = (None, 'publish', 'draft')
+
+
+def is_published(frontmatter: Dict[str, Any], mode: Optional[str]) -> bool:
+    """Whether a note with this frontmatter passes the publish filter `mode`."""
+    def flag(key: str) -> bool:
+        value = frontmatter.get(key)
+        return value is True or str(value).strip().lower() in ('true', 'yes')
+
+    if mode == 'publish':
+        return flag('publish')
+    if mode == 'draft':
+        return not flag('draft')
+    return True
+
 
 @dataclass
 class SyncConfig:
@@ -33,6 +90,46 @@ class SyncConfig:
     timezone: str = "Asia/Shanghai"
     log_level: str = "INFO"
     exclude_patterns: List[str] = None
+    manifest_path: Optional[str] = None
+    # Section of a manifest shared by several targets (see sync_multi)
+    manifest_scope: Optional[str] = None
+    use_manifest: bool = True
+    jobs: int = 1
+    # Overlap file stats, reads and writes with this many threads (0 = serial)
+    io_concurrency: int = 0
+    # Download iCloud placeholder notes in the background; a full sync
+    # waits up to prefetch_wait seconds for them and syncs the arrivals
+    icloud_prefetch: bool = False
+    prefetch_wait: float = 0.0
+    # Vault in git: find changed notes with git diff/status, date notes by their commits
+    use_git: bool = False
+    # Only sync notes whose frontmatter allows it: 'publish' keeps notes with
+    # `publish: true`, 'draft' drops notes with `draft: true`; None syncs all
+    publish_filter: Optional[str] = None
+    static_path: Optional[str] = None
+    site_base_path: Optional[str] = None
+    data_path: Optional[str] = None
+    attachment_url_prefix: Optional[str] = None
+    attachment_hardlinks: bool = True
+    optimize_images: bool = True
+    image_widths: List[int] = None
+    image_format: str = "webp"
+    image_quality: int = 80
+    image_jobs: int = 0
+    # content_processing: disabled stages are left out of the body scan
+    convert_wikilinks: bool = True
+    remove_comments: bool = True
+    extract_content_tags: bool = True
+    # Characters of the first paragraph used as summary (0 = no automatic summary)
+    summary_length: int = 200
+    # How deep ![[note]] embeds inside embedded notes are expanded (0 = link instead)
+    transclusion_depth: int = 4
+    # Obsidian frontmatter key -> Hugo frontmatter key
+    frontmatter_mapping: Dict[str, str] = None
+    # file_organization
+    organize_by_year: bool = True
+    filename_format: str = "{stem}"
+    sanitize_filenames: bool = True
 
     def __post_init__(self):
         if self.default_categories is None:
@@ -48,6 +145,481 @@ class SyncConfig:
                 r'.*/\.obsidian/.*',
                 r'.*/\.trash/.*'
             ]
+        if self.manifest_path is None:
+            # Keep sync state next to the Hugo content dir, outside the vault
+            self.manifest_path = str(
+                Path(self.hugo_content_path).parent / '.obsidian_sync' / 'manifest.json'
+            )
+        if self.image_widths is None:
+            self.image_widths = [480, 960, 1600]
+        if self.static_path is None:
+            self.static_path = str(Path(self.hugo_content_path).parent / 'static')
+        if self.data_path is None:
+            self.data_path = str(Path(self.hugo_content_path).parent / 'data')
+        if self.site_base_path is None:
+            self.site_base_path = _site_base_path(Path(self.hugo_content_path).parent)
+        if self.attachment_url_prefix is None:
+            self.attachment_url_prefix = self.site_base_path + '/attachments'
+        if self.frontmatter_mapping is None:
+            self.frontmatter_mapping = {}
+        if self.publish_filter not in PUBLISH_FILTERS:
+            raise ValueError(f"Invalid publish_filter {self.publish_filter!r}: "
+                             f"use {' or '.join(repr(mode) for mode in PUBLISH_FILTERS if mode)}")
+        try:
+            self.filename_format.format(stem='', title='', slug='', date='')
+        except (KeyError, IndexError, ValueError) as e:
+            raise ValueError(f"Invalid filename_format {self.filename_format!r}: {e}") from e
+
+    @classmethod
+    def from_yaml(cls, path, **overrides: Any) -> 'SyncConfig':
+        """Build a config from a sync_config.yaml file.
+
+        The `content_processing`, `frontmatter_mapping` and
+        `file_organization` sections are flattened onto the fields above;
+        `overrides` (e.g. from the command line) win over the file, and
+        None values are ignored.
+        """
+        data = load_yaml(Path(path).read_text(encoding='utf-8')) or {}
+        values = _config_values(data)
+        values.update({key: value for key, value in overrides.items() if value is not None})
+        return cls._from_values(values, path)
+
+    @classmethod
+    def targets_from_yaml(cls, path, **overrides: Any) -> List['SyncConfig']:
+        """Build one config per entry of the file's `targets` list.
+
+        Top-level settings apply to every target and each entry overrides
+        them; its `name` (default: the vault folder name) becomes the
+        target's section of the shared manifest. Without `targets` this is
+        [from_yaml(path)].
+        """
+        data = load_yaml(Path(path).read_text(encoding='utf-8')) or {}
+        targets = data.pop('targets', None)
+        if not targets:
+            return [cls.from_yaml(path, **overrides)]
+
+        base = _config_values(data)
+        configs = []
+        for target in targets:
+            values = {**base, **_config_values(target)}
+            values.update({key: value for key, value in overrides.items() if value is not None})
+            name = values.pop('name', None) or Path(str(values.get('obsidian_vault_path', ''))).name
+            values['manifest_scope'] = str(name)
+            configs.append(cls._from_values(values, f"{path} (target {name})"))
+        names = [config.manifest_scope for config in configs]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate target names in {path}: {', '.join(duplicates)}")
+        # One manifest for all targets: the first target's
+        for config in configs[1:]:
+            config.manifest_path = configs[0].manifest_path
+        return configs
+
+    @classmethod
+    def _from_values(cls, values: Dict[str, Any], origin) -> 'SyncConfig':
+        known = {f.name for f in fields(cls)}
+        unknown = sorted(set(values) - known)
+        if unknown:
+            logging.getLogger(__name__).warning(f"Ignoring unknown settings in {origin}: {', '.join(unknown)}")
+        missing = [name for name in ('obsidian_vault_path', 'hugo_content_path') if not values.get(name)]
+        if missing:
+            raise ValueError(f"{origin} does not set {', '.join(missing)}")
+        return cls(**{key: value for key, value in values.items() if key in known})
+
+    def config_hash(self) -> str:
+        """Hash of every setting that affects the generated output."""
+        effective = {
+            key: value for key, value in asdict(self).items()
+            if key not in _NON_OUTPUT_CONFIG_FIELDS
+        }
+        effective['manifest_version'] = MANIFEST_VERSION
+        # srcset markup is only emitted when Pillow can render the variants
+        effective['image_variants'] = self.optimize_images and _PILImage is not None
+        payload = json.dumps(effective, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _config_values(data: Dict[str, Any]) -> Dict[str, Any]:
+    """sync_config.yaml settings flattened onto SyncConfig field names."""
+    values: Dict[str, Any] = {}
+    for key, value in data.items():
+        if key in _CONFIG_SECTIONS and isinstance(value, dict):
+            values.update(value)
+        elif key == 'frontmatter_mapping':
+            values[key] = {str(k): str(v) for k, v in (value or {}).items()}
+        else:
+            values[key] = value
+    return values
+
+
+def _site_base_path(site_root: Path) -> str:
+    """Path component of the Hugo baseURL, e.g. '/blog' for .../blog/."""
+    for name in ('hugo.yaml', 'hugo.yml', 'config.yaml', 'config.yml'):
+        config_file = site_root / name
+        if not config_file.exists():
+            continue
+        try:
+            site_config = load_yaml(config_file.read_text(encoding='utf-8')) or {}
+        except Exception:
+            return ''
+        return urlparse(str(site_config.get('baseURL', ''))).path.rstrip('/')
+    return ''
+
+
+@dataclass
+class VaultFile:
+    """A note found by the vault walker, carrying the stat result taken once."""
+    path: Path
+    source: str
+    stat: os.stat_result
+
+
+# A path below a directory that exclude patterns do not name on purpose
+_DIR_PROBE = '\x00/\x00'
+
+
+class ExcludeMatcher:
+    """Exclude patterns matched against vault-relative paths.
+
+    Paths use forward slashes. Patterns written as `.*/dir/.*` also apply
+    at the vault root. Each pattern is compiled on its own, so an invalid
+    one is reported by name; they are joined into a single regular
+    expression unless one uses groups or global inline flags such as
+    `(?i)`, which change meaning once joined.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = []
+        for pattern in patterns or ():
+            try:
+                self.patterns.append(re.compile(pattern))
+            except re.error as e:
+                raise ValueError(f"Invalid exclude pattern {pattern!r}: {e}") from e
+        plain = re.compile('').flags
+        if self.patterns and all(p.groups == 0 and p.flags == plain for p in self.patterns):
+            self.regex = re.compile('|'.join(f'(?:{p.pattern})' for p in self.patterns))
+        else:
+            self.regex = None
+
+    def matches(self, relative_path: str) -> bool:
+        if self.regex is not None:
+            return bool(self.regex.match(relative_path) or self.regex.match('/' + relative_path))
+        return any(p.match(relative_path) or p.match('/' + relative_path) for p in self.patterns)
+
+    def matches_dir(self, relative_dir: str) -> bool:
+        """True when a pattern excludes the directory as a whole.
+
+        A pattern must match both the directory and a path nested below
+        it, so `drafts/[^/]*$` excludes the notes directly in drafts/ but
+        does not prune drafts/sub/. A pattern that only spares some names
+        deeper down, e.g. `drafts/(?!keep/).*`, is not told apart and
+        still prunes the whole directory.
+        """
+        directory = relative_dir + '/'
+        for p in self.patterns:
+            if (p.match(directory) or p.match('/' + directory)) and \
+                    (p.match(directory + _DIR_PROBE) or p.match('/' + directory + _DIR_PROBE)):
+                return True
+        return False
+
+
+def walk_vault(vault_path: Path, matcher: ExcludeMatcher,
+               on_excluded=None, stat_many=None, on_placeholder=None) -> Iterator[VaultFile]:
+    """Stream the vault's notes in sorted order with os.scandir.
+
+    Excluded directories are pruned before they are entered, and each
+    note's stat result comes from its DirEntry so it is stat'ed once.
+    `stat_many` (e.g. AsyncIOEngine.stat) stats a directory's notes
+    together instead of one after another. Notes iCloud has not
+    downloaded (see sync_icloud) are never opened; their sources go to
+    `on_placeholder` instead.
+    """
+    stack = ['']
+    while stack:
+        relative_dir = stack.pop()
+        directory = os.path.join(vault_path, relative_dir) if relative_dir else str(vault_path)
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            logging.getLogger(__name__).warning(f"Cannot read directory {directory}: {e}")
+            continue
+
+        subdirs = []
+        notes = []
+        for entry in entries:
+            source = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if matcher.matches_dir(source):
+                    if on_excluded:
+                        on_excluded(source + '/')
+                    continue
+                subdirs.append(source)
+            elif entry.name.endswith('.md') and entry.is_file():
+                if matcher.matches(source):
+                    if on_excluded:
+                        on_excluded(source)
+                    continue
+                notes.append((entry, source))
+            elif entry.name.endswith('.md' + ICLOUD_STUB_SUFFIX):
+                target = placeholder_target(entry.name)
+                source = f"{relative_dir}/{target}" if relative_dir else target
+                if on_placeholder and target and not matcher.matches(source):
+                    on_placeholder(source)
+
+        stats = stat_many([entry for entry, _ in notes]) if stat_many and notes else None
+        for index, (entry, source) in enumerate(notes):
+            if stats is not None:
+                stat_result = stats[index]
+                if isinstance(stat_result, Exception):
+                    continue
+            else:
+                try:
+                    stat_result = entry.stat()
+                except OSError:
+                    continue
+            if is_dataless(stat_result):
+                if on_placeholder:
+                    on_placeholder(source)
+                continue
+            yield VaultFile(Path(entry.path), source, stat_result)
+
+        # Reversed so the stack pops directories in sorted order
+        stack.extend(reversed(subdirs))
+
+
+class SyncManifest:
+    """Persistent record of what each vault note looked like when last synced.
+
+    Entries are keyed by the note path relative to the vault and store the
+    source size, mtime, content hash, the config hash used to render it,
+    the output path relative to the Hugo content dir, the note's link
+    targets (title, permalink, aliases, heading anchors), its outgoing
+    links (notes linked to, unresolved targets) and the dependency keys
+    its output was rendered from.
+
+    With a `scope`, the records live in that section of a file shared by
+    several sync targets, and saving leaves the other sections alone.
+    """
+
+    def __init__(self, path: Path, scope: Optional[str] = None):
+        self.path = Path(path)
+        self.scope = scope
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.attachments: Dict[str, Dict[str, Any]] = {}
+        self.images: Dict[str, List[int]] = {}
+        # Commit, uncommitted paths and config hash of the last full git-aware sync
+        self.git: Dict[str, Any] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def load(self) -> 'SyncManifest':
+        """Load entries from disk, starting empty if the file is unusable."""
+        if not self.path.exists():
+            return self
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                if self.scope is not None:
+                    data = data.get('scopes', {}).get(self.scope, {})
+                self.entries = data.get('entries', {})
+                self.attachments = data.get('attachments', {})
+                self.images = data.get('images', {})
+                self.git = data.get('git', {})
+            else:
+                self.logger.info("Sync manifest version changed, doing a full sync")
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable sync manifest {self.path}: {e}")
+        return self
+
+    def save(self):
+        """Write the manifest atomically."""
+        records = {'entries': self.entries, 'attachments': self.attachments, 'images': self.images,
+                   'git': self.git}
+        if self.scope is None:
+            data = {'version': MANIFEST_VERSION, **records}
+        else:
+            data = {'version': MANIFEST_VERSION, 'scopes': self._other_scopes()}
+            data['scopes'][self.scope] = records
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def _other_scopes(self) -> Dict[str, Any]:
+        """Sections of the shared file saved by other targets, as currently on disk."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('version') != MANIFEST_VERSION:
+            return {}
+        return data.get('scopes', {})
+
+    def get(self, source: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(source)
+
+    def is_unchanged(self, source: str, stat_result: os.stat_result, config_hash: str,
+                     hugo_root: Path) -> bool:
+        """Cheap check using only stat data: size, mtime, config and output presence."""
+        entry = self.entries.get(source)
+        if not entry or entry.get('config_hash') != config_hash:
+            return False
+        if entry.get('size') != stat_result.st_size or entry.get('mtime_ns') != stat_result.st_mtime_ns:
+            return False
+        return (hugo_root / entry['output']).exists()
+
+    def has_content(self, source: str, content_hash: str, config_hash: str,
+                    hugo_root: Path) -> bool:
+        """Check whether a touched-but-identical note can still be skipped."""
+        entry = self.entries.get(source)
+        if not entry or entry.get('config_hash') != config_hash:
+            return False
+        if entry.get('hash') != content_hash:
+            return False
+        return (hugo_root / entry['output']).exists()
+
+    def record(self, source: str, stat_result: os.stat_result, content_hash: str,
+               config_hash: str, output: str, **extra: Any):
+        self.entries[source] = {
+            'size': stat_result.st_size,
+            'mtime_ns': stat_result.st_mtime_ns,
+            'hash': content_hash,
+            'config_hash': config_hash,
+            'output': output,
+            **extra,
+        }
+
+    def touch(self, source: str, stat_result: os.stat_result):
+        """Refresh the stat data of a note whose content did not change."""
+        entry = self.entries[source]
+        entry['size'] = stat_result.st_size
+        entry['mtime_ns'] = stat_result.st_mtime_ns
+
+    def under(self, source: str) -> Dict[str, Dict[str, Any]]:
+        """The entry for a note, or every entry under a directory."""
+        prefix = source.rstrip('/') + '/'
+        return {key: self.entries[key] for key in sorted(self.entries)
+                if key == source or key.startswith(prefix)}
+
+    def missing(self, seen_sources) -> Dict[str, Dict[str, Any]]:
+        """Entries whose source note is not among `seen_sources`."""
+        return {source: self.entries[source]
+                for source in sorted(set(self.entries) - set(seen_sources))}
+
+    def drop(self, sources: Iterable[str]):
+        for source in sources:
+            self.entries.pop(source, None)
+
+
+@dataclass
+class MarkdownScan:
+    """Result of one ObsidianParser.scan_markdown pass."""
+    text: str
+    tags: List[str] = field(default_factory=list)
+    links: List[str] = field(default_factory=list)
+    embeds: List[str] = field(default_factory=list)
+
+
+@dataclass
+class NoteDocument:
+    """Everything derived from one note, built once by ObsidianParser.parse_note.
+
+    `body` is the converted Markdown body; the other fields are read by
+    HugoFrontmatterGenerator instead of scanning the text again.
+    """
+    frontmatter: Dict[str, Any]
+    body: str
+    title: Optional[str] = None
+    headings: List[Tuple[int, str]] = field(default_factory=list)
+    tags: List[str] = field(default_factory=list)
+    first_paragraph: Optional[str] = None
+    links: List[str] = field(default_factory=list)
+    embeds: List[str] = field(default_factory=list)
+
+
+@dataclass
+class NoteResult:
+    """What ObsidianHugoSynchronizer.sync_note wrote and the link data it recorded."""
+    hugo_file: Path
+    permalink: str
+    title: str = ''
+    aliases: List[str] = field(default_factory=list)
+    anchors: Dict[str, str] = field(default_factory=dict)
+    links_to: List[str] = field(default_factory=list)
+    unresolved: List[str] = field(default_factory=list)
+    deps: List[str] = field(default_factory=list)
+    timings: Optional[NoteTimings] = None
+
+
+@dataclass
+class PlannedChange:
+    """One line of a SyncPlan: what happens to a note and why."""
+    action: str                      # create, update, move, delete or skip
+    source: str
+    reason: str
+    output: Optional[str] = None     # output path relative to the Hugo content dir
+    previous: Optional[str] = None   # old source of a move
+
+
+@dataclass
+class SyncPlan:
+    """Everything a sync will do, worked out without writing anything.
+
+    Built by ObsidianHugoSynchronizer.plan_vault/plan_paths from stat data,
+    content hashes and the manifest. `changes` is the reviewable list;
+    the remaining fields carry what execute() needs so the vault is not
+    scanned a second time.
+    """
+    changes: List[PlannedChange] = field(default_factory=list)
+    stats: Dict[str, int] = field(default_factory=dict)
+    # Notes to render as (item, content hash, content or None)
+    convert: List[Tuple[VaultFile, str, Optional[str]]] = field(default_factory=list)
+    # Notes whose mtime changed but content did not
+    touched: List[VaultFile] = field(default_factory=list)
+    # Renamed notes as (old source, new item, new output)
+    moves: List[Tuple[str, VaultFile, str]] = field(default_factory=list)
+    # Manifest entries of notes that left the vault, moved ones included
+    removed: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # Sources whose unresolved links are reported after the sync
+    report: List[str] = field(default_factory=list)
+    # Notes iCloud has not downloaded; skipped, their outputs kept
+    placeholders: List[str] = field(default_factory=list)
+    # Plan covers the whole vault: attachment records are pruned too
+    full: bool = False
+    valid: bool = True
+    # Git state to record once the plan is carried out (use_git)
+    git_state: Optional[Dict[str, Any]] = None
+    # Synced notes the publish filter now rejects; their outputs are deleted
+    unpublished: Set[str] = field(default_factory=set)
+    # Outlines of the notes in `convert` whose content is kept, so they
+    # are not worked out again when rendering
+    outlines: Dict[str, Outline] = field(default_factory=dict)
+
+    def count(self, action: str) -> int:
+        return sum(1 for change in self.changes if change.action == action)
+
+    def describe(self) -> str:
+        """Human-readable plan: one line per write, skips summarised by reason."""
+        lines = [f"Plan: {self.count('create')} to create, {self.count('update')} to update, "
+                 f"{self.count('move')} to move, {self.count('delete')} to delete, "
+                 f"{self.count('skip')} to skip"]
+        skipped: Dict[str, int] = {}
+        for change in self.changes:
+            if change.action == 'skip':
+                skipped[change.reason] = skipped.get(change.reason, 0) + 1
+                continue
+            source = f"{change.previous} -> {change.source}" if change.previous else change.source
+            target = f" => {change.output}" if change.output else ''
+            lines.append(f"  {change.action:<6} {source}{target} ({change.reason})")
+        for reason in sorted(skipped):
+            lines.append(f"  skip   {skipped[reason]} notes ({reason})")
+        return '\n'.join(lines)
+
+
+RenderHook = Optional[Callable[[str, Optional[str]], Optional[str]]]
 
 
 class ObsidianParser:
@@ -59,19 +631,8 @@ class ObsidianParser:
 
     def extract_frontmatter(self, content: str) -> Tuple[Dict[str, Any], str]:
         """Extract YAML frontmatter from markdown content."""
-        if not content.startswith('---\n'):
-            return {}, content
-
         try:
-            end_index = content.find('\n---\n', 4)
-            if end_index == -1:
-                return {}, content
-
-            frontmatter_text = content[4:end_index]
-            frontmatter = yaml.safe_load(frontmatter_text) or {}
-            body_content = content[end_index + 5:]
-
-            return frontmatter, body_content
+            return parse_frontmatter(content)
         except Exception as e:
             self.logger.warning(f"Failed to parse frontmatter: {e}")
             return {}, content
@@ -87,56 +648,335 @@ class ObsidianParser:
 
     def extract_tags_from_content(self, content: str) -> List[str]:
         """Extract tags from content using Obsidian tag format."""
-        tags = set()
-
-        # Find #tag patterns
-        tag_pattern = r'#([a-zA-Z0-9_\-\u4e00-\u9fff]+)'
-        matches = re.findall(tag_pattern, content)
-        tags.update(matches)
+        frontmatter, body = self.extract_frontmatter(content)
+        tags = dict.fromkeys(self.scan_markdown(body, collect_tags=True).tags)
 
         # Find tags from frontmatter
-        frontmatter, _ = self.extract_frontmatter(content)
         if 'tags' in frontmatter:
             if isinstance(frontmatter['tags'], list):
-                tags.update(frontmatter['tags'])
+                tags.update(dict.fromkeys(frontmatter['tags']))
             elif isinstance(frontmatter['tags'], str):
-                tags.add(frontmatter['tags'])
+                tags[frontmatter['tags']] = None
 
         return list(tags)
 
     def convert_wikilinks_to_markdown(self, content: str) -> str:
         """Convert Obsidian wikilinks to standard markdown links."""
         # Convert [[filename]] to [filename](filename.md)
-        content = re.sub(
-            r'\[\[([^\]|]+)(\|([^\]]+))?\]\]',
-            lambda m: f"[{m.group(3) or m.group(1)}]({m.group(1)}.md)",
-            content
-        )
-        return content
+        return self.scan_markdown(content, convert_links=True).text
 
     def convert_obsidian_links(self, content: str) -> str:
         """Convert various Obsidian link formats to standard markdown."""
-        # Convert wikilinks
-        content = self.convert_wikilinks_to_markdown(content)
-
-        # Convert ![[image.png]] to ![image.png](image.png)
-        content = re.sub(
-            r'!\[\[([^\]|]+)(\|([^\]]+))?\]\]',
-            lambda m: f"![{m.group(3) or m.group(1)}]({m.group(1)})",
-            content
-        )
-
-        return content
+        # Convert [[filename]] and ![[image.png]] to ![image.png](image.png)
+        return self.scan_markdown(content, convert_links=True, convert_embeds=True).text
 
     def remove_obsidian_comments(self, content: str) -> str:
         """Remove Obsidian-style comments."""
-        # Remove inline comments %%comment%%
-        content = re.sub(r'%%[^%]*%%', '', content)
+        return self.scan_markdown(content, strip_comments=True).text
+
+    def transform_body(self, content: str,
+                       render_embed: RenderHook = None,
+                       render_link: RenderHook = None) -> MarkdownScan:
+        """Convert links and embeds, drop comments and collect tags in one pass."""
+        config = self.config
+        return self.scan_markdown(content, config.convert_wikilinks, True, config.remove_comments,
+                                  config.extract_content_tags, render_embed, render_link)
+
+    def parse_note(self, content: str, fallback_title: Optional[str] = None,
+                   render_embed: RenderHook = None,
+                   render_link: RenderHook = None) -> NoteDocument:
+        """Parse a whole note once into a NoteDocument."""
+        frontmatter, body = self.extract_frontmatter(content)
+        return self.parse_body(body, frontmatter, fallback_title, render_embed, render_link)
+
+    def parse_body(self, body: str, frontmatter: Dict[str, Any],
+                   fallback_title: Optional[str] = None,
+                   render_embed: RenderHook = None,
+                   render_link: RenderHook = None,
+                   outline: Optional[Outline] = None) -> NoteDocument:
+        """Build a NoteDocument from a body whose frontmatter is already parsed.
+
+        Title, headings and summary come from the note's own text, not
+        from the notes its embeds bring in. `outline` is _outline(body)
+        when the caller already has it.
+        """
+        headings, first_paragraph = outline if outline is not None else _outline(body)
+        scan = self.transform_body(body, render_embed, render_link)
+        if first_paragraph:
+            # Links as in the body; embeds inside the line shrink to their text
+            first_paragraph = self.scan_markdown(
+                first_paragraph, convert_links=self.config.convert_wikilinks, convert_embeds=True,
+                render_embed=lambda target, alias: alias or target, render_link=render_link,
+            ).text.strip() or None
+
+        title = frontmatter.get('title')
+        if not title:
+            title = next((text for level, text in headings if level == 1), None)
+        if not title:
+            title = fallback_title
+
+        return NoteDocument(
+            frontmatter=frontmatter,
+            body=scan.text,
+            title=title,
+            headings=headings,
+            tags=scan.tags,
+            first_paragraph=first_paragraph,
+            links=scan.links,
+            embeds=scan.embeds,
+        )
 
-        # Remove block comments %% ... %%
-        content = re.sub(r'%%.*?%%', '', content, flags=re.DOTALL)
+    def scan_markdown(self, content: str,
+                      convert_links: bool = False,
+                      convert_embeds: bool = False,
+                      strip_comments: bool = False,
+                      collect_tags: bool = False,
+                      render_embed: RenderHook = None,
+                      render_link: RenderHook = None) -> MarkdownScan:
+        """Single linear pass over a note body.
+
+        Fenced code blocks and inline code spans are copied verbatim, so
+        `#include` or `%%` inside code is neither a tag nor a comment.
+        `render_embed(target, alias)` may return the replacement for an
+        embed, e.g. a link to the published attachment; when it returns
+        None the embed becomes a plain image link to the target.
+        `render_link(target, alias)` does the same for wikilinks, which
+        otherwise become links to `<target>.md`.
+        Returns the rewritten text together with the tags, wikilink targets
+        and embed targets found outside comments and code, in order of
+        first appearance. Wikilinks are only looked for when converting
+        them and tags only when collecting them.
+        """
+        # A single character is found much faster than a pattern is searched
+        kinds = []
+        if '`' in content:
+            kinds.append(_TICK_TOKEN_RE)
+        if '~' in content:
+            kinds.append(_TILDE_TOKEN_RE)
+        if '%' in content:
+            kinds.append(_COMMENT_TOKEN_RE)
+        code = _code_regions(content, kinds) if kinds else []
+        finditer = (_LINK_TOKEN_RE if convert_links else _EMBED_TOKEN_RE).finditer
+        find_tag = _TAG_RE.search
+        find_tags = _TAG_RE.findall
+        parts = []
+        append = parts.append
+        tags: Dict[str, None] = {}
+        links: Dict[str, None] = {}
+        embeds: Dict[str, None] = {}
+        hidden_tags = False
+
+        # `code` holds the (start, end) of each code span, fence and comment,
+        # only comments start with '%'; `index` is the first that does not
+        # end before `pos`
+        index = 0
+        count = len(code)
+        pos = 0
+        matches = finditer(content)
+        while True:
+            for match in matches:
+                first, last = match.span()
+                while index < count and code[index][1] <= first:
+                    start, end = code[index]
+                    if strip_comments and content[start] == '%':
+                        append(content[pos:start])
+                        pos = end
+                    index += 1
+                if index < count:
+                    start, end = code[index]
+                    if start <= first:
+                        # Links inside code or a comment are left alone
+                        if last > end:
+                            # It may hide a link that starts after the code
+                            matches = finditer(content, end)
+                            break
+                        continue
+                    if start < last:
+                        # Code or a comment marker inside a link is part of the link
+                        code[index:] = _code_regions(content, kinds, last)
+                        count = len(code)
+
+                target, alias = match.groups()
+                # A link with a '!' in front is an embed
+                if not convert_links:
+                    embed = True
+                elif first and content[first - 1] == '!':
+                    embed = True
+                    first -= 1
+                else:
+                    embed = False
+                append(content[pos:first])
+                # A '#' right after '[[' or '|' is never a tag
+                if '#' in target and find_tag(target, 1) or alias and '#' in alias and find_tag(alias, 1):
+                    hidden_tags = True
+                if embed:
+                    embeds[target] = None
+                    rendered = render_embed(target, alias) if convert_embeds and render_embed else None
+                    if rendered:
+                        append(rendered)
+                    elif convert_embeds:
+                        append(f"![{alias or target}]({target})")
+                    else:
+                        append(content[first:last])
+                else:
+                    links[target] = None
+                    rendered = render_link(target, alias) if render_link else None
+                    append(rendered if rendered is not None else f"[{alias or target}]({target}.md)")
+                pos = last
+            else:
+                break
 
-        return content
+        for start, end in code[index:]:
+            if strip_comments and content[start] == '%':
+                append(content[pos:start])
+                pos = end
+        append(content[pos:])
+
+        if collect_tags:
+            if not code and not hidden_tags:
+                tags = dict.fromkeys(find_tags(content))
+            else:
+                # Tags in code, comments and a link's own text are not the note's
+                found = []
+                start = 0
+                length = len(content)
+                for end, after in code + [(length, length)]:
+                    if hidden_tags:
+                        gaps = _link_gaps(content, start, end, convert_links)
+                        for gap in range(0, len(gaps), 2):
+                            found += find_tags(content, gaps[gap], gaps[gap + 1])
+                    else:
+                        found += find_tags(content, start, end)
+                    start = after
+                tags = dict.fromkeys(found)
+        return MarkdownScan(''.join(parts), list(tags), list(links), list(embeds))
+
+
+# Code spans, fenced code and comments are copied verbatim, so nothing
+# inside them is taken for a link or tag. Each kind starts with its own
+# character, so str.find skips ahead to it and the pattern is only tried
+# there; a fence is only one when that character opens its line after at
+# most three spaces. A fence runs to the first line closing it with at least
+# as many of its own characters, or to the end of the note; only line
+# starts are tried for that closing line.
+_TICK_TOKEN_RE = re.compile(
+    r"`(?:(?:(?<=^`)|(?<=^ `)|(?<=^  `)|(?<=^   `))(?P<fence>``+)[^\n]*"
+    r"(?s:\n(?:[^\n]*\n)*?[ ]{0,3}`(?P=fence)`*[ \t]*$|.*)"
+    r"|(?P<ticks>`*)[^\n]*?(?<!`)`(?P=ticks)(?!`))", re.MULTILINE)
+_TILDE_TOKEN_RE = re.compile(
+    r"~(?:(?<=^~)|(?<=^ ~)|(?<=^  ~)|(?<=^   ~))(?P<fence>~~+)[^\n]*"
+    r"(?s:\n(?:[^\n]*\n)*?[ ]{0,3}~(?P=fence)~*[ \t]*$|.*)", re.MULTILINE)
+_COMMENT_TOKEN_RE = re.compile(r"%%.*?%%", re.DOTALL)
+# Groups: target, alias. An embed is a wikilink with a '!' in front.
+_LINK_TOKEN_RE = re.compile(r"\[\[([^\]|\n]+)(?:\|([^\]\n]+))?\]\]")
+_EMBED_TOKEN_RE = re.compile(r"!\[\[([^\]|\n]+)(?:\|([^\]\n]+))?\]\]")
+# The lookbehind follows the '#' so the search can skip ahead to each '#'.
+# Obsidian ignores purely numeric tags such as #1.
+_TAG_RE = re.compile(r"#(?<!\S#)(?![0-9]+(?![a-zA-Z0-9_\-\u4e00-\u9fff]))([a-zA-Z0-9_\-\u4e00-\u9fff]+)")
+
+_COMMENT_SPAN_RE = re.compile(r'%%.*?(?:%%|$)')
+
+
+def _code_regions(content: str, kinds: List['re.Pattern'], pos: int = 0) -> List[Tuple[int, int]]:
+    """(start, end) of each code span, fence and comment from `pos` on.
+
+    `kinds` holds the token patterns worth searching for. The earliest
+    token wins and hides any starting inside it, so when tokens of
+    different kinds overlap each kind is searched again past the token
+    just taken.
+    """
+    regions = []
+    find = content.find
+    for kind in kinds:
+        if kind is _COMMENT_TOKEN_RE:
+            # A comment needs no pattern: it runs to the next '%%'
+            start = find('%', pos)
+            while start >= 0:
+                if not content.startswith('%', start + 1):
+                    start = find('%', start + 1)
+                    continue
+                end = find('%%', start + 2)
+                if end < 0:
+                    break
+                regions.append((start, end + 2))
+                start = find('%', end + 2)
+            continue
+        # Each pattern starts with the character it is found by
+        char, match = kind.pattern[0], kind.match
+        start = find(char, pos)
+        while start >= 0:
+            token = match(content, start)
+            if token is None:
+                start = find(char, start + 1)
+            else:
+                regions.append(token.span())
+                start = find(char, token.end())
+    if len(kinds) == 1:
+        return regions
+    regions.sort()
+    if all(before[1] <= after[0] for before, after in zip(regions, regions[1:])):
+        return regions
+    regions = []
+    matches = [kind.search(content, pos) for kind in kinds]
+    while True:
+        first = None
+        for index, match in enumerate(matches):
+            if match is not None and (first is None or match.start() < matches[first].start()):
+                first = index
+        if first is None:
+            return regions
+        start, pos = matches[first].span()
+        regions.append((start, pos))
+        for index, match in enumerate(matches):
+            if match is not None and match.start() < pos:
+                matches[index] = kinds[index].search(content, pos)
+
+
+def _link_gaps(content: str, start: int, end: int, links: bool) -> List[int]:
+    """Start and end offsets of the stretches of content[start:end] outside wikilinks."""
+    gaps = [start]
+    for match in (_LINK_TOKEN_RE if links else _EMBED_TOKEN_RE).finditer(content, start, end):
+        first = match.start()
+        if first > start and content[first - 1] == '!':
+            first -= 1
+        gaps.append(first)
+        gaps.append(match.end())
+    gaps.append(end)
+    return gaps
+
+
+def _outline(text: str) -> Outline:
+    """Collect headings and the first paragraph line of a note's markdown.
+
+    Fenced code and %%comments%% are skipped; the paragraph line is
+    returned as written, wikilinks unconverted.
+    """
+    headings = []
+    first_paragraph = None
+    fence = None
+    in_comment = False
+
+    for line in text.split('\n'):
+        if in_comment:
+            in_comment = line.count('%%') % 2 == 0
+            continue
+        after = next_fence(line, fence)
+        if fence is not None or after is not None:
+            fence = after
+            continue
+
+        if '%%' in line:
+            in_comment = line.count('%%') % 2 == 1
+            line = _COMMENT_SPAN_RE.sub('', line)
+        stripped = line.strip()
+        heading = HEADING_RE.match(stripped)
+        if heading:
+            headings.append((len(heading.group(1)), heading.group(2)))
+        elif first_paragraph is None and stripped and not stripped.startswith(('#', '!')) \
+                and not (stripped.startswith('<') and stripped.endswith('>')):
+            # Images and lines of HTML, e.g. a rendered embed, are no summary
+            first_paragraph = stripped
+    return headings, first_paragraph
 
 
 class HugoFrontmatterGenerator:
@@ -145,23 +985,47 @@ class HugoFrontmatterGenerator:
     def __init__(self, config: SyncConfig):
         self.config = config
         self.logger = logging.getLogger(__name__)
+        self.parser = ObsidianParser(config)
+        # Vault path -> (created, updated) commit timestamps, set when use_git is on
+        self.git_dates: Optional[Dict[str, Tuple[int, int]]] = None
 
     def generate_frontmatter(self,
                            title: str,
                            file_path: Path,
                            obsidian_frontmatter: Dict[str, Any],
-                           content: str) -> Dict[str, Any]:
+                           content: str,
+                           file_stat: Optional[os.stat_result] = None) -> Dict[str, Any]:
         """Generate Hugo frontmatter from Obsidian data."""
+        document = self.parser.parse_body(content, obsidian_frontmatter, title)
+        document.title = title
+        return self.generate_for_document(document, file_path, file_stat)
+
+    def generate_for_document(self,
+                              document: NoteDocument,
+                              file_path: Path,
+                              file_stat: Optional[os.stat_result] = None) -> Dict[str, Any]:
+        """Generate Hugo frontmatter from an already parsed note.
+
+        The result is canonical: keys come in a fixed order followed by the
+        note's own keys in source order, tags and categories are
+        de-duplicated in order of appearance and dates are ISO 8601 in the
+        configured time zone, so identical notes give byte-identical files.
+        """
+        obsidian_frontmatter = self._map_frontmatter(document.frontmatter)
         hugo_frontmatter = {}
 
         # Basic required fields
-        hugo_frontmatter['title'] = title
-        hugo_frontmatter['date'] = self._get_date_from_file(file_path, obsidian_frontmatter)
+        hugo_frontmatter['title'] = document.title or file_path.stem
+        hugo_frontmatter['date'] = self._normalize_date(
+            self._get_date_from_file(file_path, obsidian_frontmatter, file_stat))
+        commit_dates = self._commit_dates(file_path)
+        if commit_dates and 'lastmod' not in obsidian_frontmatter:
+            hugo_frontmatter['lastmod'] = self._normalize_date(self._from_timestamp(commit_dates[1]))
         hugo_frontmatter['draft'] = False
         hugo_frontmatter['author'] = self.config.default_author
 
         # Extract description from content or obsidian metadata
-        description = self._extract_description(content, obsidian_frontmatter)
+        description = self._extract_description(document, obsidian_frontmatter)
         if description:
             hugo_frontmatter['description'] = description
             hugo_frontmatter['summary'] = description
@@ -172,13 +1036,15 @@ class HugoFrontmatterGenerator:
             hugo_frontmatter['categories'] = categories
 
         # Handle tags
-        tags = self._process_tags(content, obsidian_frontmatter)
+        tags = self._process_tags(document)
         if tags:
             hugo_frontmatter['tags'] = tags
 
         # Copy additional metadata
         for key, value in obsidian_frontmatter.items():
             if key not in ['date', 'title', 'author', 'tags', 'categories', 'description']:
+                if isinstance(value, date):
+                    value = self._normalize_date(value)
                 hugo_frontmatter[key] = value
 
         # Add Hugo-specific settings
@@ -187,7 +1053,8 @@ class HugoFrontmatterGenerator:
 
         return hugo_frontmatter
 
-    def _get_date_from_file(self, file_path: Path, obsidian_frontmatter: Dict[str, Any]) -> str:
+    def _get_date_from_file(self, file_path: Path, obsidian_frontmatter: Dict[str, Any],
+                            file_stat: Optional[os.stat_result] = None) -> Any:
         """Get date from file metadata or frontmatter."""
         # Try to get date from Obsidian frontmatter
         if 'date' in obsidian_frontmatter:
@@ -196,13 +1063,89 @@ class HugoFrontmatterGenerator:
         if 'created' in obsidian_frontmatter:
             return obsidian_frontmatter['created']
 
+        # First commit of the note, which checkouts and iCloud do not reset
+        commit_dates = self._commit_dates(file_path)
+        if commit_dates:
+            return self._from_timestamp(commit_dates[0])
+
         # Use file modification time
-        file_stat = file_path.stat()
-        dt = datetime.fromtimestamp(file_stat.st_mtime, tz=ZoneInfo(self.config.timezone))
-        return dt.strftime('%Y-%m-%dT%H:%M:%S%z')
+        if file_stat is None:
+            file_stat = file_path.stat()
+        return self._from_timestamp(file_stat.st_mtime)
+
+    def note_date(self, file_path: Path, obsidian_frontmatter: Dict[str, Any],
+                  file_stat: Optional[os.stat_result] = None) -> datetime:
+        """The note's `date` as an aware datetime in the configured time zone.
+
+        A frontmatter date that is not ISO 8601 falls back to the commit or
+        modification time.
+        """
+        value = self._normalize_date(
+            self._get_date_from_file(file_path, self._map_frontmatter(obsidian_frontmatter), file_stat))
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return self._get_date_from_file(file_path, {}, file_stat)
+
+    def _from_timestamp(self, timestamp: float) -> datetime:
+        return datetime.fromtimestamp(timestamp, tz=ZoneInfo(self.config.timezone))
+
+    def _commit_dates(self, file_path: Path) -> Optional[Tuple[int, int]]:
+        """(created, updated) commit timestamps of a note, None without git dates."""
+        if not self.git_dates:
+            return None
+        try:
+            source = file_path.relative_to(self.config.obsidian_vault_path).as_posix()
+        except ValueError:
+            return None
+        return self.git_dates.get(source)
+
+    def _normalize_date(self, value: Any) -> Any:
+        """Render a date as ISO 8601 seconds with an explicit UTC offset.
+
+        Naive values are taken to be in the configured time zone; strings
+        that are not ISO dates are returned unchanged.
+        """
+        if isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+            except ValueError:
+                return value
+        if isinstance(value, date) and not isinstance(value, datetime):
+            value = datetime(value.year, value.month, value.day)
+        if isinstance(value, datetime):
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=ZoneInfo(self.config.timezone))
+            return value.isoformat(timespec='seconds')
+        return value
+
+    @staticmethod
+    def _unique(values: Iterable[Any]) -> List[str]:
+        """Strings in order of first appearance, without duplicates or blanks."""
+        return list(dict.fromkeys(str(value).strip() for value in values
+                                  if value is not None and str(value).strip()))
+
+    def _map_frontmatter(self, obsidian_frontmatter: Dict[str, Any]) -> Dict[str, Any]:
+        """Rename keys per `frontmatter_mapping`, keeping source order.
+
+        A key the note already sets explicitly wins over one mapped onto it.
+        """
+        mapping = self.config.frontmatter_mapping
+        if not mapping:
+            return obsidian_frontmatter
+        mapped = {}
+        for key, value in obsidian_frontmatter.items():
+            target = mapping.get(key, key)
+            if target != key and target in obsidian_frontmatter:
+                continue
+            mapped[target] = value
+        return mapped
 
-    def _extract_description(self, content: str, obsidian_frontmatter: Dict[str, Any]) -> Optional[str]:
+    def _extract_description(self, document: NoteDocument,
+                             obsidian_frontmatter: Optional[Dict[str, Any]] = None) -> Optional[str]:
         """Extract description from content or frontmatter."""
+        if obsidian_frontmatter is None:
+            obsidian_frontmatter = document.frontmatter
         # Check frontmatter first
         if 'description' in obsidian_frontmatter:
             return obsidian_frontmatter['description']
@@ -210,46 +1153,42 @@ class HugoFrontmatterGenerator:
         if 'summary' in obsidian_frontmatter:
             return obsidian_frontmatter['summary']
 
-        # Extract first paragraph from content
-        lines = content.split('\n')
-        for line in lines:
-            line = line.strip()
-            if line and not line.startswith('#') and not line.startswith('!'):
-                # Truncate if too long
-                if len(line) > 200:
-                    return line[:197] + '...'
-                return line
-
-        return None
+        # Use the first paragraph line found while parsing, unless summaries are off
+        length = self.config.summary_length
+        if length <= 0:
+            return None
+        line = document.first_paragraph
+        if line and len(line) > length:
+            # Truncate if too long
+            return line[:max(length - 3, 0)] + '...'
+        return line
 
     def _process_categories(self, obsidian_frontmatter: Dict[str, Any]) -> List[str]:
         """Process categories from Obsidian metadata."""
         if 'categories' in obsidian_frontmatter:
             categories = obsidian_frontmatter['categories']
             if isinstance(categories, list):
-                return categories
+                return self._unique(categories)
             elif isinstance(categories, str):
-                return [categories]
+                return self._unique([categories])
 
         # Use default categories
         return self.config.default_categories.copy()
 
-    def _process_tags(self, content: str, obsidian_frontmatter: Dict[str, Any]) -> List[str]:
+    def _process_tags(self, document: NoteDocument) -> List[str]:
         """Process tags from content and frontmatter."""
-        parser = ObsidianParser(self.config)
-        content_tags = parser.extract_tags_from_content(content)
+        content_tags = document.tags
 
         frontmatter_tags = []
-        if 'tags' in obsidian_frontmatter:
-            tags = obsidian_frontmatter['tags']
+        if 'tags' in document.frontmatter:
+            tags = document.frontmatter['tags']
             if isinstance(tags, list):
                 frontmatter_tags = tags
             elif isinstance(tags, str):
                 frontmatter_tags = [tags]
 
-        # Combine and deduplicate
-        all_tags = list(set(content_tags + frontmatter_tags + self.config.default_tags))
-        return all_tags
+        # Combine and deduplicate, keeping the order of first appearance
+        return self._unique(content_tags + frontmatter_tags + self.config.default_tags)
 
 
 class ObsidianHugoSynchronizer:
@@ -261,6 +1200,23 @@ class ObsidianHugoSynchronizer:
         self.parser = ObsidianParser(config)
         self.frontmatter_generator = HugoFrontmatterGenerator(config)
         self.logger = logging.getLogger(__name__)
+        self.manifest: Optional[SyncManifest] = None
+        self.exclude_matcher = ExcludeMatcher(config.exclude_patterns)
+        self.attachments: Optional[AttachmentStore] = None
+        self.links: Optional[LinkIndex] = None
+        self.graph: Optional[NoteGraph] = None
+        self.dependencies: Optional[DependencyIndex] = None
+        self.metrics = SyncMetrics()
+        self.io: Optional[AsyncIOEngine] = None
+        self.prefetcher: Optional[PlaceholderPrefetcher] = None
+        # Set by MultiVaultSynchronizer: reads of notes other targets also
+        # sync, and a worker pool shared with them
+        self.shared_reads: Optional[SharedReads] = None
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.git: Optional[GitVault] = None
+        self.git_checked = False
+        # Embedded notes expanded in this sync run
+        self.transclusions: Optional[TransclusionCache] = None
 
     def setup_logging(self):
         """Setup logging configuration."""
@@ -276,158 +1232,1527 @@ class ObsidianHugoSynchronizer:
     def should_exclude_file(self, file_path: Path) -> bool:
         """Check if file should be excluded based on patterns."""
         relative_path = file_path.relative_to(self.config.obsidian_vault_path)
+        return self.exclude_matcher.matches(relative_path.as_posix())
 
-        for pattern in self.config.exclude_patterns:
-            if re.match(pattern, str(relative_path)):
-                return True
-        return False
+    def get_hugo_file_path(self, obsidian_file: Path, file_stat: Optional[os.stat_result] = None,
+                           frontmatter: Optional[Dict[str, Any]] = None) -> Path:
+        """Generate Hugo file path from Obsidian file path.
 
-    def get_hugo_file_path(self, obsidian_file: Path) -> Path:
-        """Generate Hugo file path from Obsidian file path."""
-        # Use year-based organization
-        file_stat = obsidian_file.stat()
-        year = datetime.fromtimestamp(file_stat.st_mtime).year
+        The file name follows `filename_format`, which may use {stem},
+        {title} (frontmatter title, else the stem), {slug} (frontmatter
+        slug, else the stem) and {date} (the note's `date`, YYYY-MM-DD).
+        The year folder comes from the same date.
+        """
+        frontmatter = frontmatter or {}
+        note_date = self.frontmatter_generator.note_date(obsidian_file, frontmatter, file_stat)
 
         # Generate filename
-        filename = obsidian_file.stem
-        # Sanitize filename
-        filename = re.sub(r'[^\w\s\-\.]', '', filename).strip()
-        filename = re.sub(r'[-\s]+', '-', filename)
+        stem = obsidian_file.stem
+        filename = self.config.filename_format.format(
+            stem=stem,
+            title=str(frontmatter.get('title') or stem),
+            slug=str(frontmatter.get('slug') or stem),
+            date=note_date.strftime('%Y-%m-%d'),
+        )
+        if self.config.sanitize_filenames:
+            filename = re.sub(r'[^\w\s\-\.]', '', filename).strip()
+            filename = re.sub(r'[-\s]+', '-', filename)
+        else:
+            # Never let a title escape the posts directory
+            filename = filename.replace('/', '-').replace('\\', '-').strip()
+        filename = filename or stem
 
-        hugo_path = Path(self.config.hugo_content_path) / "posts" / str(year) / f"{filename}.md"
-        return hugo_path
+        # Use year-based organization
+        hugo_path = Path(self.config.hugo_content_path) / "posts"
+        if self.config.organize_by_year:
+            hugo_path /= str(note_date.year)
+        return hugo_path / f"{filename}.md"
+
+    def get_permalink(self, hugo_file: Path, frontmatter: Dict[str, Any]) -> str:
+        """URL Hugo publishes an output file under, honouring `url` and `slug` frontmatter."""
+        base = self.config.site_base_path
+        if frontmatter.get('url'):
+            return f"{base}/{str(frontmatter['url']).strip('/')}/"
+        parts = list(hugo_file.relative_to(self.config.hugo_content_path).with_suffix('').parts)
+        if frontmatter.get('slug'):
+            parts[-1] = str(frontmatter['slug'])
+        # Hugo lowercases content paths unless disablePathToLower is set
+        return f"{base}/{'/'.join(parts).lower()}/"
+
+    def _link_info(self, frontmatter: Dict[str, Any], headings: List[Tuple[int, str]],
+                   hugo_file: Path) -> Tuple[str, List[str], Dict[str, str]]:
+        """(permalink, aliases, heading anchors) under which other notes can link to a note."""
+        aliases = frontmatter.get('aliases') or frontmatter.get('alias') or []
+        if isinstance(aliases, str):
+            aliases = [aliases]
+        return (self.get_permalink(hugo_file, frontmatter),
+                [str(alias) for alias in aliases if alias],
+                heading_anchors(headings))
+
+    def _source_of(self, obsidian_file: Path) -> str:
+        try:
+            return obsidian_file.relative_to(self.config.obsidian_vault_path).as_posix()
+        except ValueError:
+            return obsidian_file.name
 
-    def process_markdown_file(self, obsidian_file: Path) -> bool:
+    def process_markdown_file(self, obsidian_file: Path, original_content: Optional[str] = None,
+                              file_stat: Optional[os.stat_result] = None) -> bool:
         """Process a single markdown file."""
         try:
-            self.logger.info(f"Processing file: {obsidian_file}")
-
-            # Read original content
-            with open(obsidian_file, 'r', encoding='utf-8') as f:
-                original_content = f.read()
+            self.sync_note(obsidian_file, original_content, file_stat)
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to process {obsidian_file}: {e}")
+            return False
 
-            # Parse Obsidian content
-            obsidian_frontmatter, body_content = self.parser.extract_frontmatter(original_content)
+    def sync_note(self, obsidian_file: Path, original_content: Optional[str] = None,
+                  file_stat: Optional[os.stat_result] = None,
+                  outline: Optional[Outline] = None) -> NoteResult:
+        """Convert one note and write it to Hugo, returning what was written.
 
-            # Extract title
-            title = obsidian_frontmatter.get('title')
-            if not title:
-                title = self.parser.extract_title_from_content(body_content)
-            if not title:
-                title = obsidian_file.stem
+        Unlike process_markdown_file this raises on failure, so callers such
+        as the worker pool can report the error against the file.
+        """
+        result, data = self.render_note(obsidian_file, original_content, file_stat, outline)
 
-            # Process content
-            processed_content = self.parser.convert_obsidian_links(body_content)
-            processed_content = self.parser.remove_obsidian_comments(processed_content)
+        # Write to Hugo destination, leaving identical files untouched
+        with result.timings.stage('write', len(data)):
+            written = write_if_changed(result.hugo_file, data)
+        self._log_written(result.hugo_file, written)
+        return result
 
-            # Generate Hugo frontmatter
-            hugo_frontmatter = self.frontmatter_generator.generate_frontmatter(
-                title, obsidian_file, obsidian_frontmatter, processed_content
+    def _log_written(self, hugo_file: Path, written: bool):
+        if written:
+            self.logger.info(f"Successfully synced to: {hugo_file}")
+        else:
+            self.logger.info(f"Output unchanged: {hugo_file}")
+
+    def render_note(self, obsidian_file: Path, original_content: Optional[str] = None,
+                    file_stat: Optional[os.stat_result] = None,
+                    outline: Optional[Outline] = None) -> Tuple[NoteResult, bytes]:
+        """Convert one note without writing it, returning the result and the output bytes.
+
+        `outline` is the outline of `original_content` if the scan already
+        worked it out.
+        """
+        self.logger.info(f"Processing file: {obsidian_file}")
+        timings = NoteTimings()
+
+        # Read original content
+        if original_content is None:
+            with timings.stage('read'):
+                with open(obsidian_file, 'r', encoding='utf-8') as f:
+                    original_content = f.read()
+            timings.add_bytes('read', file_stat.st_size if file_stat else len(original_content))
+
+        with timings.stage('frontmatter', len(original_content)):
+            frontmatter, body = self.parser.extract_frontmatter(original_content)
+            hugo_file = self.get_hugo_file_path(obsidian_file, file_stat, frontmatter)
+
+        # Keep this note's own entry current so links to it resolve
+        source = self._source_of(obsidian_file)
+        links = self._get_links()
+        with timings.stage('links'):
+            if outline is None:
+                outline = _outline(body)
+            permalink, aliases, anchors = self._link_info(frontmatter, outline[0], hugo_file)
+            links.add(source, permalink, aliases, anchors)
+        linked: Dict[str, None] = {}
+        unresolved: Dict[str, None] = {}
+        # Keys of everything the output is rendered from, see sync_links
+        deps: Set[str] = set()
+        embedded: Set[str] = set()
+
+        def render_link(target: str, alias: Optional[str]) -> str:
+            return self._render_wikilink(target, alias, source, deps, linked, unresolved)
+
+        def render_embed(target: str, alias: Optional[str]) -> Optional[str]:
+            expanded = self._expand_embed(target, alias, source, ((source, ''),), deps)
+            if expanded is not None:
+                return expanded[0].text
+            rendered = attachments.render_embed(target, alias, obsidian_file, embedded)
+            if rendered is None:
+                # Neither a published note nor a file: degrade like a dead wikilink
+                return render_link(target, alias)
+            return rendered
+
+        # Parse the note once; everything below reads from the document
+        attachments = self._get_attachments()
+        with timings.stage('convert', len(body)):
+            document = self.parser.parse_body(
+                body, frontmatter, fallback_title=obsidian_file.stem,
+                render_embed=render_embed, render_link=render_link, outline=outline,
             )
 
-            # Generate final content
-            final_content = self._generate_final_content(hugo_frontmatter, processed_content)
-
-            # Write to Hugo destination
-            hugo_file = self.get_hugo_file_path(obsidian_file)
-            hugo_file.parent.mkdir(parents=True, exist_ok=True)
-
-            with open(hugo_file, 'w', encoding='utf-8') as f:
-                f.write(final_content)
-
-            self.logger.info(f"Successfully synced to: {hugo_file}")
-            return True
+        # Generate Hugo frontmatter
+        with timings.stage('generate'):
+            hugo_frontmatter = self.frontmatter_generator.generate_for_document(
+                document, obsidian_file, file_stat
+            )
 
-        except Exception as e:
-            self.logger.error(f"Failed to process {obsidian_file}: {e}")
-            return False
+        # Generate final content
+        with timings.stage('dump'):
+            final_content = self._generate_final_content(hugo_frontmatter, document.body)
+            data = encode_text(final_content)
+
+        deps.update(file_dependency(relative) for relative in embedded)
+        result = NoteResult(hugo_file, permalink, hugo_frontmatter['title'], aliases, anchors,
+                            list(linked), list(unresolved), sorted(deps), timings)
+        return result, data
+
+    def _render_wikilink(self, target: str, alias: Optional[str], source: str, deps: Set[str],
+                         linked: Dict[str, None], unresolved: Dict[str, None]) -> str:
+        """Markdown link for a wikilink in `source`, or its text if it does not resolve."""
+        note, heading = split_link_target(target)
+        text = alias or (f"{note} > {heading}" if note and heading else heading or note or target)
+        dependency = note_dependency(target)
+        if dependency:
+            deps.add(dependency)
+        resolved = self._get_links().resolve_with_source(target, source)
+        if resolved is None:
+            # Plain text instead of a dead link; reported after the sync
+            unresolved[target] = None
+            return text
+        linked[resolved[0]] = None
+        return f"[{text}]({resolved[1]})"
+
+    def _read_embedded(self, embedded: str) -> Union[Tuple[Dict[str, Any], str], Exception, None]:
+        """Frontmatter and body of a note to transclude, read like the notes being synced.
+
+        None when iCloud has not downloaded the note, so it is not
+        read (which would block); an exception when it cannot be read.
+        """
+        path = Path(self.config.obsidian_vault_path) / embedded
+        try:
+            stat_result = path.stat()
+        except OSError as e:
+            return None if stub_path(path).exists() else e
+        if is_dataless(stat_result):
+            return None
+        _, raw = next(self._read_notes([VaultFile(path, embedded, stat_result)]))
+        if isinstance(raw, Exception):
+            return raw
+        try:
+            return self.parser.extract_frontmatter(raw.decode('utf-8'))
+        except UnicodeDecodeError as e:
+            return e
+
+    def _get_transclusions(self) -> TransclusionCache:
+        if self.transclusions is None:
+            self.transclusions = TransclusionCache()
+        return self.transclusions
+
+    def _expand_embed(self, target: str, alias: Optional[str], source: str,
+                      stack: Tuple[Tuple[str, str], ...], deps: Set[str]
+                      ) -> Optional[Tuple[Fragment, bool]]:
+        """Inline the note, section or block an embed in `source` names.
+
+        Returns (fragment, complete), or None when the target is not a
+        note the link index knows, e.g. an attachment or a missing or
+        unpublished note. `stack` lists the (note, fragment_key)
+        expansions in progress, outermost first; an embed that would
+        repeat one of them, or nest deeper than transclusion_depth,
+        becomes a link instead and leaves the result incomplete. Missing
+        sections are left as their text.
+        Complete fragments are memoized for the rest of the sync run and
+        reused wherever expanding them again would give the same text.
+        The fragment's dependency keys are added to `deps`.
+        """
+        note, _ = split_link_target(target)
+        embedded = self._get_links().lookup(note, source) if note else source
+        if embedded is None:
+            return None
+        key = (embedded, fragment_key(target.partition('#')[2]))
+        dependency = note_dependency(target)
+        if dependency:
+            deps.add(dependency)
+        deps.add(embed_dependency(embedded))
+
+        def unexpanded(text: str, complete: bool = True) -> Tuple[Fragment, bool]:
+            return Fragment(text, frozenset(), frozenset(), 0), complete
+
+        depth = self.config.transclusion_depth
+        if key in stack or len(stack) > depth:
+            reason = 'it embeds itself' if key in stack else f"embeds nest deeper than {depth}"
+            self.logger.warning(f"Not expanding ![[{target}]] in {source}: {reason}")
+            return unexpanded(self._render_wikilink(target, alias, source, deps, {}, {}), False)
+        cache = self._get_transclusions()
+        fragment = cache.get(key, stack, depth)
+        if fragment is not None:
+            deps.update(fragment.deps)
+            return fragment, True
+
+        if embedded not in cache.notes:
+            note_content = self._read_embedded(embedded)
+            if note_content is None:
+                # Re-rendered once the download arrives, see _downloaded_placeholder_keys
+                self.logger.warning(f"Not expanding ![[{target}]] in {source}: "
+                                    f"{embedded} is not downloaded from iCloud")
+                deps.add(placeholder_dependency(embedded))
+                return unexpanded(alias or target, False)
+            if isinstance(note_content, Exception):
+                self.logger.error(f"Failed to read embedded note {embedded}: {note_content}")
+                return unexpanded(alias or target)
+            cache.notes[embedded] = note_content
+        frontmatter, body = cache.notes[embedded]
+        if not is_published(frontmatter, self.config.publish_filter):
+            return unexpanded(alias or target)
+        section = embed_section(body, key[1])
+        if section is None:
+            self.logger.warning(f"Embedded section not found: ![[{target}]] in {source}")
+            return unexpanded(alias or target)
+
+        fragment_deps: Set[str] = set()
+        keys = {key}
+        height = 0
+        used: Set[str] = set()
+        complete = True
+        embedded_file = Path(self.config.obsidian_vault_path) / embedded
+
+        def render_embed(inner: str, inner_alias: Optional[str]) -> Optional[str]:
+            nonlocal height, complete
+            expanded = self._expand_embed(inner, inner_alias, embedded, stack + (key,), fragment_deps)
+            if expanded is None:
+                rendered = self._get_attachments().render_embed(inner, inner_alias, embedded_file, used)
+                if rendered is None:
+                    return self._render_wikilink(inner, inner_alias, embedded, fragment_deps, {}, {})
+                return rendered
+            inner_fragment, inner_complete = expanded
+            keys.update(inner_fragment.keys)
+            height = max(height, inner_fragment.height)
+            complete = complete and inner_complete
+            return inner_fragment.text
+
+        # Links inside the fragment resolve from the embedded note, as in Obsidian
+        scan = self.parser.transform_body(
+            section, render_embed=render_embed,
+            render_link=lambda inner, inner_alias: self._render_wikilink(
+                inner, inner_alias, embedded, fragment_deps, {}, {}))
+        fragment_deps.update(file_dependency(relative) for relative in used)
+        fragment = Fragment(scan.text, frozenset(fragment_deps), frozenset(keys), height + 1)
+        if complete:
+            cache.add(key, fragment)
+        deps.update(fragment.deps)
+        return fragment, complete
+
+    def _worker_count(self) -> int:
+        return self.config.jobs if self.config.jobs > 0 else (os.cpu_count() or 1)
+
+    def worker_state(self) -> Tuple[SyncConfig, AttachmentStore, LinkIndex, Optional[Dict]]:
+        """What a pool worker needs to convert this synchronizer's notes."""
+        return (self.config, self._get_attachments(), self._get_links(),
+                self.frontmatter_generator.git_dates)
+
+    def _run_sync_tasks(self, tasks: List[Tuple[Path, Optional[str], os.stat_result, Optional[Outline]]],
+                        executor: Optional[ProcessPoolExecutor] = None
+                        ) -> Iterator[Tuple[Optional[NoteResult], Optional[str]]]:
+        """Run sync_note over (file, content, stat, outline) tasks, yielding results in task order.
+
+        Each result is (NoteResult, None) on success or (None, error) on
+        failure. With an executor the notes are converted in worker processes.
+        """
+        if executor is None and self._get_io() is not None:
+            yield from self._run_sync_tasks_io(tasks)
+            return
+        if executor is None or len(tasks) <= 1:
+            for obsidian_file, content, file_stat, outline in tasks:
+                try:
+                    yield self.sync_note(obsidian_file, content, file_stat, outline), None
+                except Exception as e:
+                    yield None, f"{type(e).__name__}: {e}"
+            return
+
+        chunksize = max(1, len(tasks) // (self._worker_count() * 8))
+        key = self.config.manifest_scope or ''
+        worker_tasks = [(key, str(path), content, file_stat, outline)
+                        for path, content, file_stat, outline in tasks]
+        attachments = self._get_attachments()
+        for result, error, attachment_updates in executor.map(_sync_note_worker, worker_tasks,
+                                                              chunksize=chunksize):
+            attachments.merge_updates(attachment_updates)
+            yield result, error
+
+    def _run_sync_tasks_io(self, tasks: List[Tuple[Path, Optional[str], os.stat_result, Optional[Outline]]]
+                           ) -> Iterator[Tuple[Optional[NoteResult], Optional[str]]]:
+        """_run_sync_tasks with reads and writes overlapped by the I/O engine.
+
+        Notes without content are read together first, then rendered one
+        by one on this thread, then all outputs are written together.
+        """
+        io = self._get_io()
+        missing = [index for index, task in enumerate(tasks) if task[1] is None]
+        read_start = time.perf_counter()
+        raws = dict(zip(missing, io.read_bytes(tasks[index][0] for index in missing)))
+        read_seconds = (time.perf_counter() - read_start) / max(1, len(missing))
+
+        outcomes: List[Tuple[Optional[NoteResult], Optional[str]]] = []
+        writes = []
+        for index, (obsidian_file, content, file_stat, outline) in enumerate(tasks):
+            try:
+                if index in raws:
+                    raw = raws[index]
+                    if isinstance(raw, Exception):
+                        raise raw
+                    content = raw.decode('utf-8')
+                result, data = self.render_note(obsidian_file, content, file_stat, outline)
+            except Exception as e:
+                outcomes.append((None, f"{type(e).__name__}: {e}"))
+                continue
+            if index in raws:
+                # Share of the batch read, which overlapped with the others
+                result.timings.seconds['read'] = read_seconds
+                result.timings.calls['read'] = 1
+                result.timings.add_bytes('read', len(raws[index]))
+            outcomes.append((result, None))
+            writes.append((len(outcomes) - 1, result.hugo_file, data))
+
+        for (position, hugo_file, data), written in zip(writes, io.write((path, data) for _, path, data in writes)):
+            result = outcomes[position][0]
+            if isinstance(written, Exception):
+                outcomes[position] = (None, f"{type(written).__name__}: {written}")
+                continue
+            result.timings.seconds['write'] = written[1]
+            result.timings.calls['write'] = 1
+            result.timings.add_bytes('write', len(data))
+            self._log_written(hugo_file, written[0])
+        yield from outcomes
+
+    def _get_io(self) -> Optional[AsyncIOEngine]:
+        """The I/O engine when io_concurrency asks for one, created on first use."""
+        if self.config.io_concurrency <= 1:
+            return None
+        if self.io is None:
+            self.io = AsyncIOEngine(self.config.io_concurrency)
+        return self.io
 
     def _generate_final_content(self, frontmatter: Dict[str, Any], content: str) -> str:
         """Generate final markdown content with YAML frontmatter."""
-        frontmatter_yaml = yaml.dump(frontmatter, default_flow_style=False,
-                                   allow_unicode=True, sort_keys=False)
+        frontmatter_yaml = dump_yaml(frontmatter)
         return f"---\n{frontmatter_yaml}---\n\n{content}"
 
-    def copy_attachments(self, obsidian_file: Path):
-        """Copy attachment files (images, etc.) to Hugo static directory."""
-        # This is a placeholder for future implementation
-        # Could copy images to static/ or assets/ directory
-        pass
-
-    def sync_vault(self) -> Dict[str, int]:
-        """Sync the entire Obsidian vault to Hugo."""
-        self.logger.info("Starting Obsidian to Hugo synchronization")
-
-        stats = {
+    def _get_attachments(self) -> AttachmentStore:
+        """Create the attachment store on first use, sharing the manifest's hash records."""
+        if self.attachments is None:
+            manifest = self._get_manifest()
+            images = None
+            if self.config.optimize_images:
+                images = ImageOptimizer(
+                    Path(self.config.static_path) / 'attachments',
+                    self.config.attachment_url_prefix,
+                    self.config.image_widths,
+                    image_format=self.config.image_format,
+                    quality=self.config.image_quality,
+                    dimensions=manifest.images,
+                    jobs=self.config.image_jobs,
+                )
+            self.attachments = AttachmentStore(
+                Path(self.config.obsidian_vault_path),
+                Path(self.config.static_path) / 'attachments',
+                self.config.attachment_url_prefix,
+                matcher=self.exclude_matcher,
+                known=manifest.attachments,
+                hardlinks=self.config.attachment_hardlinks,
+                images=images,
+            ).build_index()
+        return self.attachments
+
+    def copy_attachments(self, obsidian_file: Path) -> Dict[str, str]:
+        """Copy the files a note embeds into the Hugo static directory.
+
+        Returns a mapping of embed target to published URL.
+        """
+        with open(obsidian_file, 'r', encoding='utf-8') as f:
+            document = self.parser.parse_note(f.read())
+        attachments = self._get_attachments()
+        urls = {}
+        for target in document.embeds:
+            url = attachments.url_for(target, obsidian_file)
+            if url:
+                urls[target] = url
+        return urls
+
+    def _new_stats(self) -> Dict[str, int]:
+        return {
             'processed': 0,
             'skipped': 0,
-            'errors': 0
+            'unchanged': 0,
+            'errors': 0,
+            'invalidated': 0,
+            'moved': 0,
+            'placeholders': 0,
+            'unresolved_links': 0
         }
 
-        obsidian_path = Path(self.config.obsidian_vault_path)
-        if not obsidian_path.exists():
-            self.logger.error(f"Obsidian vault path does not exist: {obsidian_path}")
-            return stats
+    def _get_manifest(self) -> SyncManifest:
+        """Load the sync manifest once and keep it in memory between syncs."""
+        if self.manifest is None:
+            self.manifest = SyncManifest(Path(self.config.manifest_path), self.config.manifest_scope)
+            if self.config.use_manifest:
+                self.manifest.load()
+        return self.manifest
 
-        # Find all markdown files
-        markdown_files = list(obsidian_path.rglob("*.md"))
+    def _save_manifest(self):
+        """Write the manifest, logging instead of failing the sync."""
+        try:
+            self.manifest.save()
+        except OSError as e:
+            self.logger.warning(f"Failed to save sync manifest {self.manifest.path}: {e}")
+
+    def _get_links(self) -> LinkIndex:
+        """Create the link index on first use from the notes recorded in the manifest."""
+        if self.links is None:
+            self.links = LinkIndex()
+            for source, entry in self._get_manifest().entries.items():
+                self._register_entry(source, entry)
+        return self.links
+
+    def _get_graph(self) -> NoteGraph:
+        """Create the note graph on first use from the links recorded in the manifest."""
+        if self.graph is None:
+            self.graph = NoteGraph()
+            for source, entry in self._get_manifest().entries.items():
+                self.graph.set_links(source, entry.get('links_to', ()))
+            self.graph.dirty = not Path(self.config.data_path, 'backlinks.json').exists()
+        return self.graph
+
+    def _write_graph(self):
+        """Rewrite data/backlinks.json when links, titles or the set of notes changed."""
+        graph = self._get_graph()
+        if not graph.dirty:
+            return
+        path = Path(self.config.data_path) / 'backlinks.json'
+        try:
+            if graph.write(path, self._get_manifest().entries):
+                self.logger.info(f"Wrote note graph to {path}")
+        except OSError as e:
+            self.logger.warning(f"Failed to write note graph {path}: {e}")
+
+    def _register_entry(self, source: str, entry: Dict[str, Any]):
+        """Add an already synced note to the link index from its manifest entry."""
+        if 'permalink' in entry:
+            self.links.add(source, entry['permalink'], entry.get('aliases', []),
+                           entry.get('anchors', {}))
+
+    def _get_dependencies(self) -> DependencyIndex:
+        """Create the dependency index on first use from the manifest."""
+        if self.dependencies is None:
+            self.dependencies = DependencyIndex()
+            for source, entry in self._get_manifest().entries.items():
+                self.dependencies.set_edges(source, entry.get('deps', ()))
+        return self.dependencies
+
+    def _scan_files(self, files: Iterable[VaultFile], plan: SyncPlan) -> Set[str]:
+        """Find the notes whose content or config changed since the last sync.
+
+        Every note is registered in the link index, unchanged notes from
+        their manifest entry and changed ones from their header and
+        headings, so a link can resolve to any note in the vault. Changed
+        notes are added to the plan as (item, content hash, content or
+        None); returns the dependency keys invalidated by new notes or
+        changed link targets.
+        """
+        hugo_root = Path(self.config.hugo_content_path)
+        config_hash = self.config.config_hash()
+        manifest = self._get_manifest()
+        links = self._get_links()
+        stats = plan.stats
+        dirty_keys: Set[str] = set()
+        read_ahead = READ_AHEAD_BYTES
+
+        def to_read() -> Iterator[VaultFile]:
+            for item in files:
+                if manifest.is_unchanged(item.source, item.stat, config_hash, hugo_root) \
+                        and self._dates_current(item.source):
+                    self._register_entry(item.source, manifest.get(item.source))
+                    plan.changes.append(PlannedChange('skip', item.source, 'unchanged'))
+                    stats['unchanged'] += 1
+                    continue
+                yield item
+
+        for item, raw in self._read_notes(self._published(to_read(), plan)):
+            if isinstance(raw, Exception):
+                self.logger.error(f"Failed to read {item.path}: {raw}")
+                plan.changes.append(PlannedChange('skip', item.source, 'unreadable'))
+                stats['errors'] += 1
+                continue
 
-        for file_path in markdown_files:
-            if self.should_exclude_file(file_path):
-                self.logger.debug(f"Excluding file: {file_path}")
-                stats['skipped'] += 1
+            with self.metrics.stage('hash', len(raw)):
+                content_hash = hashlib.sha256(raw).hexdigest()
+            if manifest.has_content(item.source, content_hash, config_hash, hugo_root) \
+                    and self._dates_current(item.source):
+                # Touched but not edited: refresh stat data, keep the output
+                plan.touched.append(item)
+                self._register_entry(item.source, manifest.get(item.source))
+                plan.changes.append(PlannedChange('skip', item.source, 'touched, content unchanged'))
+                stats['unchanged'] += 1
                 continue
 
-            if self.process_markdown_file(file_path):
-                stats['processed'] += 1
-            else:
+            try:
+                original_content = raw.decode('utf-8')
+            except UnicodeDecodeError as e:
+                self.logger.error(f"Failed to process {item.path}: {e}")
+                plan.changes.append(PlannedChange('skip', item.source, 'not valid UTF-8'))
                 stats['errors'] += 1
+                continue
+
+            if not self._passes_publish_filter(original_content):
+                # Edited since its header was read
+                self._plan_unpublished(plan, item.source)
+                continue
+            frontmatter, body = self.parser.extract_frontmatter(original_content)
+            hugo_file = self.get_hugo_file_path(item.path, item.stat, frontmatter)
+            outline = _outline(body)
+            permalink, aliases, anchors = self._link_info(frontmatter, outline[0], hugo_file)
+            links.add(item.source, permalink, aliases, anchors)
+
+            # Notes linking here need new output if this note's URL,
+            # headings or names changed, or if it is new
+            entry = manifest.get(item.source)
+            if entry is None or (entry.get('permalink'), entry.get('aliases'), entry.get('anchors')) \
+                    != (permalink, aliases, anchors):
+                dirty_keys.update(links.dependency_keys(item.source, aliases))
+                if entry is not None:
+                    dirty_keys.update(links.dependency_keys(item.source, entry.get('aliases', [])))
+            # Notes transcluding this one carry its content
+            if entry is not None and entry.get('hash') != content_hash:
+                dirty_keys.add(embed_dependency(item.source))
+
+            if entry is None:
+                action, reason = 'create', 'new note'
+            elif entry.get('config_hash') != config_hash:
+                action, reason = 'update', 'settings changed'
+            elif entry.get('hash') != content_hash:
+                action, reason = 'update', 'content changed'
+            elif not self._dates_current(item.source):
+                action, reason = 'update', 'new commits'
+            else:
+                action, reason = 'update', 'output missing'
+            output = hugo_file.relative_to(hugo_root).as_posix()
+            plan.changes.append(PlannedChange(action, item.source, reason, output))
+
+            if len(raw) <= read_ahead:
+                read_ahead -= len(raw)
+                plan.outlines[item.source] = outline
+            else:
+                original_content = None
+            plan.convert.append((item, content_hash, original_content))
+
+        return dirty_keys
+
+    def _published(self, items: Iterable[VaultFile], plan: SyncPlan) -> Iterator[VaultFile]:
+        """Drop the notes the publish filter rejects, reading only their frontmatter.
+
+        A private note costs one small read instead of a full read, parse
+        and write. A header that does not parse counts as private. Notes
+        whose header cannot be read are passed on, so the full read
+        reports the error.
+        """
+        mode = self.config.publish_filter
+        if not mode:
+            yield from items
+            return
+        io = self._get_io()
+
+        def read_header(path: Path) -> Union[Dict[str, Any], Exception]:
+            try:
+                return read_frontmatter(path)
+            except Exception as e:
+                return e
+
+        def check_batch(batch: List[VaultFile]) -> Iterator[VaultFile]:
+            with self.metrics.stage('header_read'):
+                if io is not None:
+                    headers = io.map(read_header, [item.path for item in batch])
+                else:
+                    headers = [read_header(item.path) for item in batch]
+            for item, header in zip(batch, headers):
+                if isinstance(header, OSError):
+                    yield item
+                    continue
+                if isinstance(header, Exception):
+                    # Whether it is a draft cannot be told, so it stays private
+                    self.logger.warning(f"Cannot parse the frontmatter of {item.source}, "
+                                        f"not publishing it: {header}")
+                    self._plan_unpublished(plan, item.source)
+                elif is_published(header, mode):
+                    yield item
+                else:
+                    self._plan_unpublished(plan, item.source)
+
+        batch_size = SYNC_BATCH_SIZE if io is not None else 1
+        batch: List[VaultFile] = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield from check_batch(batch)
+                batch = []
+        if batch:
+            yield from check_batch(batch)
+
+    def _passes_publish_filter(self, content: str) -> bool:
+        """Whether a note's text passes the publish filter; an unparsable header does not."""
+        mode = self.config.publish_filter
+        if not mode:
+            return True
+        try:
+            frontmatter, _ = parse_frontmatter(content)
+        except Exception:
+            return False
+        return is_published(frontmatter, mode)
+
+    def _plan_unpublished(self, plan: SyncPlan, source: str):
+        """Skip a note the publish filter rejects, removing what was synced from it."""
+        self.logger.debug(f"Not published: {source}")
+        plan.changes.append(PlannedChange('skip', source, 'not published'))
+        plan.stats['skipped'] += 1
+        entry = self._get_manifest().get(source)
+        if entry is not None:
+            plan.removed[source] = entry
+            plan.unpublished.add(source)
+
+    def _read_notes(self, items: Iterable[VaultFile]
+                    ) -> Iterator[Tuple[VaultFile, Union[bytes, Exception]]]:
+        """Read notes in order, SYNC_BATCH_SIZE at a time through the I/O engine if enabled.
+
+        Notes another target has already read come from shared_reads.
+        """
+        io = self._get_io()
+        shared = self.shared_reads
+        if io is None:
+            for item in items:
+                raw = shared.take(item.path) if shared else None
+                if raw is None:
+                    try:
+                        with self.metrics.stage('scan_read'):
+                            raw = item.path.read_bytes()
+                    except OSError as e:
+                        yield item, e
+                        continue
+                    self.metrics.stages.add_bytes('scan_read', len(raw))
+                    if shared:
+                        shared.keep(item.path, raw)
+                yield item, raw
+            return
+
+        def read_batch(batch: List[VaultFile]):
+            raws: List[Union[bytes, Exception, None]] = [
+                shared.take(item.path) if shared else None for item in batch]
+            missing = [index for index, raw in enumerate(raws) if raw is None]
+            with self.metrics.stage('scan_read'):
+                read = io.read_bytes(batch[index].path for index in missing)
+            for index, raw in zip(missing, read):
+                raws[index] = raw
+                if shared and isinstance(raw, bytes):
+                    shared.keep(batch[index].path, raw)
+            self.metrics.stages.add_bytes('scan_read', sum(len(raw) for raw in read
+                                                           if isinstance(raw, bytes)))
+            return zip(batch, raws)
+
+        batch: List[VaultFile] = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= SYNC_BATCH_SIZE:
+                yield from read_batch(batch)
+                batch = []
+        if batch:
+            yield from read_batch(batch)
+
+    def _remove_output(self, output: str, claimed: Optional[Set[str]] = None):
+        """Delete a generated file unless another note still writes to it.
+
+        `claimed` is the set of outputs of the current manifest entries;
+        it is computed when not given.
+        """
+        if claimed is None:
+            claimed = {entry.get('output') for entry in self._get_manifest().entries.values()}
+        if output in claimed:
+            return
+        path = Path(self.config.hugo_content_path) / output
+        try:
+            path.unlink()
+            self.logger.info(f"Removed orphaned output: {path}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.logger.warning(f"Failed to remove orphaned output {path}: {e}")
+
+    def _moves_with_file(self, entry: Dict[str, Any], old_source: str, new_source: str) -> bool:
+        """Whether a note's output stays valid when only its vault path changes."""
+        old, new = PurePosixPath(old_source), PurePosixPath(new_source)
+        # The title fell back to the file name
+        if old.stem != new.stem and entry.get('title') == old.stem:
+            return False
+        # Embeds are resolved relative to the note's folder
+        if old.parent != new.parent and any(dep.startswith('file:') for dep in entry.get('deps', ())):
+            return False
+        # Commit dates follow the rename
+        return self._dates_current(new_source, entry)
+
+    def _plan_renames(self, plan: SyncPlan):
+        """Pair new notes with removed ones by content hash.
+
+        A paired note becomes a move: its old output is renamed to the new
+        output path and its manifest entry carried over, so it is not
+        rendered again unless its output depends on its location.
+        """
+        hugo_root = Path(self.config.hugo_content_path)
+        config_hash = self.config.config_hash()
+        manifest = self._get_manifest()
+        by_hash: Dict[str, List[str]] = {}
+        for source, entry in plan.removed.items():
+            if entry.get('config_hash') == config_hash and (hugo_root / entry['output']).exists():
+                by_hash.setdefault(entry['hash'], []).append(source)
+        if not by_hash:
+            return
+
+        created = {change.source: change for change in plan.changes if change.action == 'create'}
+        remaining = []
+        for item, content_hash, content in plan.convert:
+            candidates = by_hash.get(content_hash)
+            change = created.get(item.source)
+            if not candidates or change is None or manifest.get(item.source) is not None:
+                remaining.append((item, content_hash, content))
+                continue
+            old_source = candidates[0]
+            entry = plan.removed[old_source]
+            if change.output != entry['output'] and (hugo_root / change.output).exists():
+                # Another note owns that path; render this one normally
+                remaining.append((item, content_hash, content))
+                continue
+            candidates.pop(0)
+            plan.moves.append((old_source, item, change.output))
+            change.action, change.previous, change.reason = 'move', old_source, 'renamed'
+            if not self._moves_with_file(entry, old_source, item.source):
+                change.reason = 'renamed, output depends on its location'
+                remaining.append((item, content_hash, content))
+        plan.convert[:] = remaining
+
+    def _apply_moves(self, plan: SyncPlan, convert: List[Tuple[VaultFile, str, Optional[str]]],
+                     stats: Dict[str, int]) -> Set[str]:
+        """Move the outputs of renamed notes and carry their manifest entries over.
+
+        Returns the old sources whose output was moved.
+        """
+        hugo_root = Path(self.config.hugo_content_path)
+        manifest = self._get_manifest()
+        links = self._get_links()
+        queued = {item.source for item, _, _ in convert}
+        moved: Set[str] = set()
+        for old_source, item, output in plan.moves:
+            entry = dict(plan.removed[old_source])
+            if output != entry['output']:
+                new_file = hugo_root / output
+                if new_file.exists():
+                    # Created since the plan was made; render the note instead
+                    if item.source not in queued:
+                        convert.append((item, entry['hash'], None))
+                    continue
+                new_file.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(hugo_root / entry['output'], new_file)
+            moved.add(old_source)
+            stats['moved'] += 1
+            self.logger.info(f"Moved {old_source} -> {item.source}")
+
+            info = links.notes[item.source]
+            entry.update(size=item.stat.st_size, mtime_ns=item.stat.st_mtime_ns, output=output,
+                         permalink=info['permalink'], aliases=info['aliases'],
+                         anchors=info['anchors'])
+            manifest.entries[item.source] = entry
+            self._get_graph().set_links(item.source, entry.get('links_to', ()))
+            self._get_dependencies().set_edges(item.source, entry.get('deps', ()))
+        return moved
+
+    def _plan_removals(self, plan: SyncPlan) -> Set[str]:
+        """Add deletes for removed notes that were not renamed.
+
+        Returns the dependency keys every removed note answered to.
+        """
+        links = self._get_links()
+        moved = {old_source for old_source, _, _ in plan.moves}
+        dirty_keys: Set[str] = set()
+        for source, entry in plan.removed.items():
+            if source not in moved:
+                reason = 'unpublished' if source in plan.unpublished else 'source deleted'
+                plan.changes.append(PlannedChange('delete', source, reason, entry['output']))
+            dirty_keys.update(links.dependency_keys(source, entry.get('aliases', [])))
+        return dirty_keys
+
+    def _drop_sources(self, removed: Dict[str, Dict[str, Any]],
+                      moved: Optional[Set[str]] = None):
+        """Forget notes that left the vault and delete their outputs.
+
+        Outputs in `moved` were taken over by a renamed note and are kept.
+        """
+        links = self._get_links()
+        graph = self._get_graph()
+        dependencies = self._get_dependencies()
+        claimed = {entry.get('output') for entry in self._get_manifest().entries.values()}
+        for source, entry in removed.items():
+            if not moved or source not in moved:
+                self.logger.info(f"Source removed: {source}")
+                self._remove_output(entry['output'], claimed)
+            links.remove(source)
+            graph.remove(source)
+            graph.dirty = True
+            dependencies.remove(source)
+
+    def _changed_attachment_keys(self) -> Set[str]:
+        """Dependency keys of embedded files that changed or vanished since they were published."""
+        vault = Path(self.config.obsidian_vault_path)
+        known = self._get_manifest().attachments
+        dirty_keys = set()
+        for key in self._get_dependencies().reverse:
+            if not key.startswith('file:'):
+                continue
+            record = known.get(key[5:])
+            try:
+                stat_result = (vault / key[5:]).stat()
+            except OSError:
+                dirty_keys.add(key)
+                continue
+            if record and (record.get('size') != stat_result.st_size
+                           or record.get('mtime_ns') != stat_result.st_mtime_ns):
+                dirty_keys.add(key)
+        return dirty_keys
+
+    def _downloaded_placeholder_keys(self) -> Set[str]:
+        """Dependency keys of transcluded notes that were not downloaded when last rendered but are now."""
+        vault = Path(self.config.obsidian_vault_path)
+        dirty_keys = set()
+        for key in self._get_dependencies().reverse:
+            if not key.startswith('placeholder:'):
+                continue
+            try:
+                stat_result = (vault / key[12:]).stat()
+            except OSError:
+                continue
+            if not is_dataless(stat_result):
+                dirty_keys.add(key)
+        return dirty_keys
+
+    def _add_dependents(self, plan: SyncPlan, dirty_keys: Set[str]):
+        """Queue unchanged notes whose output depends on one of the dirty keys."""
+        if not dirty_keys:
+            return
+        vault = Path(self.config.obsidian_vault_path)
+        manifest = self._get_manifest()
+        queued = {item.source for item, _, _ in plan.convert} | set(plan.removed)
+        dependents = self._get_dependencies().dependents(dirty_keys)
+        # A renamed note inherits the edges recorded for its old path
+        moves = {item.source: old_source for old_source, item, _ in plan.moves}
+        dependents.update(new for new, old in moves.items() if old in dependents)
+        changes = {change.source: change for change in plan.changes if change.action == 'move'}
+
+        for source in sorted(dependents - queued):
+            entry = manifest.get(source) or plan.removed.get(moves.get(source))
+            path = vault / source
+            if entry is None:
+                continue
+            try:
+                stat_result = path.stat()
+            except OSError:
+                continue
+            self.logger.debug(f"Re-rendering {source}: a note or file it depends on changed")
+            plan.convert.append((VaultFile(path, source, stat_result), entry['hash'], None))
+            if source in changes:
+                changes[source].reason = 'renamed, a note or file it depends on changed'
+            else:
+                plan.changes.append(PlannedChange('update', source, 'a note or file it depends on changed',
+                                                  entry['output']))
+            plan.stats['invalidated'] += 1
+
+    def _convert_files(self, changed: List[Tuple[VaultFile, str, Optional[str]]],
+                       stats: Dict[str, int], outlines: Optional[Dict[str, Outline]] = None,
+                       serial: bool = False):
+        """Convert the given notes in batches of SYNC_BATCH_SIZE.
+
+        Runs serially (with reads and writes overlapped when io_concurrency
+        > 1), or in the worker pool when jobs > 1 and not `serial`, and
+        records each result in the manifest, the note graph and the
+        dependency index.
+        """
+        hugo_root = Path(self.config.hugo_content_path)
+        config_hash = self.config.config_hash()
+        manifest = self._get_manifest()
+        links = self._get_links()
+        graph = self._get_graph()
+        dependencies = self._get_dependencies()
+        executor = None if serial else self.executor
+        owned = None
+        try:
+            while changed:
+                batch = changed[:SYNC_BATCH_SIZE]
+                del changed[:SYNC_BATCH_SIZE]
+                if executor is None and not serial and len(batch) > 1 and self._worker_count() > 1:
+                    self.logger.info(f"Processing notes with {self._worker_count()} worker processes")
+                    executor = owned = ProcessPoolExecutor(
+                        max_workers=self._worker_count(), initializer=_init_sync_worker,
+                        initargs=({self.config.manifest_scope or '': self.worker_state()},))
+                tasks = [(item.path, content, item.stat,
+                          (outlines or {}).get(item.source) if content is not None else None)
+                         for item, _, content in batch]
+                moved_from = []
+                for (item, content_hash, _), (result, error) in zip(batch, self._run_sync_tasks(tasks, executor)):
+                    if error:
+                        self.logger.error(f"Failed to process {item.path}: {error}")
+                        stats['errors'] += 1
+                        continue
+                    output = result.hugo_file.relative_to(hugo_root).as_posix()
+                    previous = manifest.get(item.source)
+                    manifest.record(item.source, item.stat, content_hash, config_hash, output,
+                                    title=result.title, permalink=result.permalink,
+                                    aliases=result.aliases, anchors=result.anchors,
+                                    links_to=result.links_to, unresolved=result.unresolved,
+                                    deps=result.deps, **self._recorded_dates(item.source))
+                    self.metrics.add_note(item.source, result.timings)
+                    graph.set_links(item.source, result.links_to)
+                    # Title or URL may have changed even when the edges did not
+                    graph.dirty = True
+                    dependencies.set_edges(item.source, result.deps)
+                    if self.config.icloud_prefetch:
+                        for key in result.deps:
+                            if key.startswith('placeholder:'):
+                                self._get_prefetcher().request(key[12:])
+                    if previous and previous['output'] != output:
+                        # e.g. the note's year or title changed
+                        moved_from.append(previous['output'])
+                    stats['processed'] += 1
+                if moved_from:
+                    # Once the batch is recorded, so outputs taken over within it are kept
+                    claimed = {entry.get('output') for entry in manifest.entries.values()}
+                    for old_output in moved_from:
+                        self._remove_output(old_output, claimed)
+        finally:
+            if owned is not None:
+                owned.shutdown()
+
+    def _report_unresolved(self, sources: Iterable[str], stats: Dict[str, int]):
+        """Log every wikilink target that did not resolve, grouped by target."""
+        manifest = self._get_manifest()
+        unresolved: Dict[str, List[str]] = {}
+        for source in sources:
+            entry = manifest.get(source)
+            for target in (entry or {}).get('unresolved', ()):
+                unresolved.setdefault(target, []).append(source)
+        stats['unresolved_links'] = len(unresolved)
+        if not unresolved:
+            return
+
+        lines = [f"{len(unresolved)} wikilink targets could not be resolved:"]
+        for target in sorted(unresolved):
+            sources = sorted(unresolved[target])
+            shown = ', '.join(sources[:3])
+            if len(sources) > 3:
+                shown += f" (+{len(sources) - 3} more)"
+            lines.append(f"  [[{target}]] <- {shown}")
+        self.logger.warning('\n'.join(lines))
+
+    def plan_vault(self, walk: Optional[Callable[..., Iterator[VaultFile]]] = None) -> SyncPlan:
+        """Work out what syncing the entire vault would do, without writing anything.
+
+        `walk(on_excluded, on_placeholder)` replaces the vault walk, e.g.
+        with this target's share of a walk over a parent folder.
+        """
+        plan = SyncPlan(stats=self._new_stats(), full=True)
+        obsidian_path = Path(self.config.obsidian_vault_path)
+        if not obsidian_path.exists():
+            self.logger.error(f"Obsidian vault path does not exist: {obsidian_path}")
+            plan.valid = False
+            return plan
+        self._load_git_dates()
+        if walk is None:
+            git_plan = self._plan_from_git()
+            if git_plan is not None:
+                return git_plan
+            plan.git_state = self._git_state()
+
+        seen_sources = set()
+        if self.attachments is not None:
+            self.attachments.build_index()
+        self._get_attachments()
+        # Rebuilt from the walk, so deleted notes drop out of the index
+        self.links = LinkIndex()
+
+        def on_excluded(source: str):
+            self.logger.debug(f"Excluding: {source}")
+            plan.changes.append(PlannedChange('skip', source, 'excluded'))
+            plan.stats['skipped'] += 1
+
+        def on_placeholder(source: str):
+            # Still in the vault, so its output and link targets stay
+            seen_sources.add(source)
+            self._plan_placeholder(plan, source)
+
+        def included_files() -> Iterator[VaultFile]:
+            if walk is not None:
+                files = walk(on_excluded, on_placeholder)
+            else:
+                io = self._get_io()
+                files = walk_vault(obsidian_path, self.exclude_matcher, on_excluded,
+                                   stat_many=io.stat if io else None,
+                                   on_placeholder=on_placeholder)
+            for item in files:
+                seen_sources.add(item.source)
+                yield item
+
+        with self.metrics.phase('plan'):
+            dirty_keys = self._scan_files(included_files(), plan)
+            plan.removed.update(self._get_manifest().missing(seen_sources))
+            plan.report = sorted(seen_sources)
+            self._plan_dependents(plan, dirty_keys)
+        return plan
+
+    def plan_paths(self, paths, load_dates: bool = True) -> SyncPlan:
+        """Work out what re-syncing the given vault paths would do.
+
+        Paths may be notes or directories, as reported by a file watcher;
+        paths that no longer exist remove their notes.
+        """
+        if load_dates:
+            self._load_git_dates()
+        plan = SyncPlan(stats=self._new_stats())
+        obsidian_path = Path(self.config.obsidian_vault_path)
+        manifest = self._get_manifest()
+        candidates: Dict[str, VaultFile] = {}
+
+        def on_excluded(source: str):
+            plan.changes.append(PlannedChange('skip', source, 'excluded'))
+            plan.stats['skipped'] += 1
+
+        for path in paths:
+            path = Path(path)
+            source = path.relative_to(obsidian_path).as_posix()
+            if path.is_dir():
+                if self.exclude_matcher.matches_dir(source):
+                    continue
+                for item in walk_vault(path, self.exclude_matcher, on_excluded,
+                                       on_placeholder=lambda note: self._plan_placeholder(
+                                           plan, f"{source}/{note}")):
+                    item.source = f"{source}/{item.source}"
+                    candidates[item.source] = item
+            elif path.exists():
+                if path.suffix != '.md':
+                    continue
+                if self.exclude_matcher.matches(source):
+                    on_excluded(source)
+                    continue
+                stat_result = path.stat()
+                if is_dataless(stat_result):
+                    self._plan_placeholder(plan, source)
+                    continue
+                candidates[source] = VaultFile(path, source, stat_result)
+            else:
+                for removed_source, entry in manifest.under(source).items():
+                    # Evicted by iCloud: the note is replaced by a stub, not deleted
+                    if stub_path(obsidian_path / removed_source).exists():
+                        self._plan_placeholder(plan, removed_source)
+                    else:
+                        plan.removed[removed_source] = entry
+
+        with self.metrics.phase('plan'):
+            dirty_keys = self._scan_files((candidates[key] for key in sorted(candidates)), plan)
+            self._plan_dependents(plan, dirty_keys)
+        plan.report = sorted(set(candidates) | {item.source for item, _, _ in plan.convert})
+        return plan
+
+    def _plan_placeholder(self, plan: SyncPlan, source: str):
+        """Skip a note that is not downloaded, keeping what was synced from it."""
+        entry = self._get_manifest().get(source)
+        if entry is not None:
+            self._register_entry(source, entry)
+        self.logger.debug(f"Not downloaded from iCloud: {source}")
+        plan.placeholders.append(source)
+        plan.changes.append(PlannedChange('skip', source, 'not downloaded from iCloud'))
+        plan.stats['placeholders'] += 1
+
+    def _plan_dependents(self, plan: SyncPlan, dirty_keys: Set[str]):
+        """Plan renames and deletes, then re-render whatever depends on them."""
+        self._plan_renames(plan)
+        dirty_keys |= self._plan_removals(plan)
+        dirty_keys |= self._changed_attachment_keys()
+        dirty_keys |= self._downloaded_placeholder_keys()
+        self._add_dependents(plan, dirty_keys)
+
+    def execute(self, plan: SyncPlan) -> Dict[str, int]:
+        """Carry out a plan from plan_vault() or plan_paths()."""
+        stats = dict(plan.stats)
+        if not plan.valid:
+            return stats
+        # Embedded notes may have changed since the last run
+        self.transclusions = None
+
+        manifest = self._get_manifest()
+        for item in plan.touched:
+            manifest.touch(item.source, item.stat)
+        manifest.drop(plan.removed)
+        if plan.placeholders:
+            self.logger.warning(f"{len(plan.placeholders)} notes are not downloaded from iCloud "
+                                f"and were skipped: {', '.join(plan.placeholders[:5])}"
+                                + (' ...' if len(plan.placeholders) > 5 else ''))
+            if self.config.icloud_prefetch:
+                prefetcher = self._get_prefetcher()
+                for source in plan.placeholders:
+                    prefetcher.request(source)
+        convert = list(plan.convert)
+        with self.metrics.phase('moves'):
+            moved = self._apply_moves(plan, convert, stats)
+            self._drop_sources(plan.removed, moved)
+        with self.metrics.phase('convert'):
+            self._convert_files(convert, stats, plan.outlines)
+
+        if plan.full:
+            indexed = {relative for paths in self._get_attachments().index.values()
+                       for relative in paths}
+            for relative in set(manifest.attachments) - indexed:
+                del manifest.attachments[relative]
+            live_hashes = {record['hash'] for record in manifest.attachments.values()}
+            for content_hash in set(manifest.images) - live_hashes:
+                del manifest.images[content_hash]
+        self._report_unresolved(plan.report, stats)
+        # Notes that failed or are not downloaded are retried by the next
+        # diff from the old commit
+        if plan.git_state is not None and not stats['errors'] and not plan.placeholders:
+            manifest.git = plan.git_state
+        with self.metrics.phase('finish'):
+            self._finish_sync()
+        self.metrics.finish()
+
+        if plan.full:
+            self.logger.info(self.metrics.summary())
+            for total, source, _ in self.metrics.slowest():
+                self.logger.debug(f"Slow note: {source} {total:.3f}s")
+            self.logger.info(f"Sync completed. Processed: {stats['processed']} "
+                            f"({stats['invalidated']} for changed dependencies), "
+                            f"Moved: {stats['moved']}, "
+                            f"Unchanged: {stats['unchanged']}, "
+                            f"Skipped: {stats['skipped']}, Errors: {stats['errors']}, "
+                            f"Not downloaded: {stats['placeholders']}, "
+                            f"Unresolved links: {stats['unresolved_links']}")
+        return stats
 
-        self.logger.info(f"Sync completed. Processed: {stats['processed']}, "
-                        f"Skipped: {stats['skipped']}, Errors: {stats['errors']}")
+    def sync_vault(self) -> Dict[str, int]:
+        """Sync the entire Obsidian vault to Hugo.
+
+        With icloud_prefetch and prefetch_wait, placeholder notes that
+        finish downloading within prefetch_wait seconds are synced in a
+        second batch.
+        """
+        self.logger.info("Starting Obsidian to Hugo synchronization")
+        self.metrics = SyncMetrics()
+        plan = self.plan_vault()
+        stats = self.execute(plan)
+        if plan.placeholders and self.config.icloud_prefetch and self.config.prefetch_wait > 0:
+            arrived = self._get_prefetcher().wait(self.config.prefetch_wait)
+            if arrived:
+                later = self.sync_downloaded(arrived)
+                for key in ('processed', 'errors', 'invalidated', 'moved'):
+                    stats[key] += later[key]
+                stats['placeholders'] -= len(arrived)
         return stats
 
+    def sync_paths(self, paths) -> Dict[str, int]:
+        """Re-sync only the given vault paths, as reported by a file watcher."""
+        self.metrics = SyncMetrics()
+        return self.execute(self.plan_paths(paths))
+
+    def sync_downloaded(self, sources: Optional[List[str]] = None) -> Dict[str, int]:
+        """Sync placeholder notes whose background download has finished.
+
+        `sources` defaults to every prefetched note that has arrived.
+        """
+        if sources is None:
+            sources = self.prefetcher.ready() if self.prefetcher else []
+        if not sources:
+            return self._new_stats()
+        self.logger.info(f"Syncing {len(sources)} notes downloaded from iCloud")
+        vault = Path(self.config.obsidian_vault_path)
+        return self.execute(self.plan_paths([vault / source for source in sources]))
+
+    def awaiting_downloads(self) -> bool:
+        """Whether prefetched notes are still downloading."""
+        return bool(self.prefetcher and self.prefetcher.pending)
+
+    def _get_prefetcher(self) -> PlaceholderPrefetcher:
+        if self.prefetcher is None:
+            self.prefetcher = PlaceholderPrefetcher(Path(self.config.obsidian_vault_path))
+        return self.prefetcher
+
+    def _get_git(self) -> Optional[GitVault]:
+        """The vault's git work tree when use_git is set, looked up once."""
+        if self.config.use_git and not self.git_checked:
+            self.git_checked = True
+            self.git = GitVault.open(Path(self.config.obsidian_vault_path))
+            if self.git is None:
+                self.logger.warning("use_git is set but the vault is not in a git work tree; "
+                                    "using file times and a full scan")
+        return self.git
+
+    def _load_git_dates(self):
+        """Read every note's commit dates with one git log pass."""
+        git = self._get_git()
+        if git is not None:
+            with self.metrics.stage('git_log'):
+                self.frontmatter_generator.git_dates = git.dates()
+
+    def _dates_current(self, source: str, entry: Optional[Dict[str, Any]] = None) -> bool:
+        """Whether a note's output was rendered with its current commit dates."""
+        git_dates = self.frontmatter_generator.git_dates
+        if git_dates is None:
+            return True
+        if entry is None:
+            entry = self._get_manifest().get(source) or {}
+        dates = git_dates.get(source)
+        return entry.get('dates') == (list(dates) if dates else None)
+
+    def _recorded_dates(self, source: str) -> Dict[str, Any]:
+        """Manifest fields recording the commit dates a note was rendered with."""
+        git_dates = self.frontmatter_generator.git_dates
+        if git_dates is None:
+            return {}
+        dates = git_dates.get(source)
+        return {'dates': list(dates) if dates else None}
+
+    def _git_state(self, uncommitted: Optional[Set[str]] = None) -> Optional[Dict[str, Any]]:
+        """The commit and uncommitted paths a full sync covers now."""
+        git = self._get_git()
+        if git is None:
+            return None
+        head = git.head()
+        if uncommitted is None:
+            uncommitted = git.uncommitted()
+        if head is None or uncommitted is None:
+            return None
+        return {'commit': head, 'dirty': sorted(uncommitted), 'config_hash': self.config.config_hash()}
+
+    def _plan_from_git(self) -> Optional[SyncPlan]:
+        """Plan a full sync from what git reports changed since the last one.
+
+        Needs a previous git-aware full sync with the same settings; None
+        means the vault has to be walked instead.
+        """
+        git = self._get_git()
+        manifest = self._get_manifest()
+        state = manifest.git
+        if git is None or not manifest.entries or not state.get('commit') \
+                or state.get('config_hash') != self.config.config_hash():
+            return None
+        with self.metrics.stage('git_status'):
+            committed = git.committed_since(state['commit'])
+            uncommitted = git.uncommitted()
+        if committed is None or uncommitted is None:
+            self.logger.info(f"Cannot diff against commit {state['commit'][:12]}, scanning the vault")
+            return None
+
+        # Paths uncommitted at the last sync may have been reverted since
+        changed = committed | uncommitted | set(state.get('dirty', ()))
+        self.logger.info(f"git: {len(changed)} paths changed since {state['commit'][:12]}")
+        vault = Path(self.config.obsidian_vault_path)
+        plan = self.plan_paths([vault / source for source in sorted(changed)], load_dates=False)
+        plan.git_state = self._git_state(uncommitted)
+        return plan
+
+    def _render_without_variants(self, sources: List[str]):
+        """Convert the notes embedding these images again, leaving out the variants that failed.
+
+        Runs in this process, the only one that knows which variants failed.
+        """
+        vault = self._get_attachments().vault_path
+        keys = {file_dependency(Path(path).relative_to(vault).as_posix()) for path in sources}
+        manifest = self._get_manifest()
+        convert = []
+        for source in sorted(self._get_dependencies().dependents(keys)):
+            entry = manifest.get(source)
+            path = Path(self.config.obsidian_vault_path) / source
+            try:
+                stat_result = path.stat()
+            except OSError:
+                continue
+            if entry is not None:
+                convert.append((VaultFile(path, source, stat_result), entry['hash'], None))
+        self.logger.info(f"Rendering {len(convert)} notes again without the image variants that failed")
+        # Embedded notes may carry the failed variants too
+        self.transclusions = None
+        self._convert_files(convert, {'processed': 0, 'errors': 0}, serial=True)
+
+    def _finish_sync(self):
+        """Render queued image variants, write the note graph and persist the manifest."""
+        if self.attachments is not None:
+            images = self.attachments.images
+            if images is not None:
+                failed = images.flush()['failed_sources']
+                while failed:
+                    self._render_without_variants(failed)
+                    failed = images.flush()['failed_sources']
+            self.attachments.take_updates()
+        self._write_graph()
+        self._save_manifest()
+
+
+# Per-process synchronizers used by the --jobs worker pool, by manifest scope
+_worker_synchronizers: Dict[str, ObsidianHugoSynchronizer] = {}
+
+
+def _init_sync_worker(targets: Dict[str, Tuple[SyncConfig, AttachmentStore, LinkIndex, Optional[Dict]]]):
+    """Process pool initializer: build one synchronizer per target in each worker."""
+    for key, (config, attachments, links, git_dates) in targets.items():
+        synchronizer = ObsidianHugoSynchronizer(config)
+        synchronizer.attachments = attachments
+        synchronizer.links = links
+        synchronizer.frontmatter_generator.git_dates = git_dates
+        _worker_synchronizers[key] = synchronizer
+
+
+def _sync_note_worker(task: Tuple[str, str, Optional[str], os.stat_result, Optional[Outline]]
+                      ) -> Tuple[Optional[NoteResult], Optional[str], Dict[str, Dict]]:
+    """Convert one note inside a worker, returning (result, error, attachment_updates)."""
+    key, path, content, file_stat, outline = task
+    synchronizer = _worker_synchronizers[key]
+    attachments = synchronizer.attachments
+    try:
+        result = synchronizer.sync_note(Path(path), content, file_stat, outline)
+        return result, None, attachments.take_updates()
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}", attachments.take_updates()
+
 
 def main():
     """Main entry point."""
     parser = argparse.ArgumentParser(description='Sync Obsidian vault to Hugo blog')
-    parser.add_argument('--obsidian-vault', required=True,
+    parser.add_argument('--config',
+                       help='sync_config.yaml to load; command line options override it. '
+                            'A config with a `targets` list syncs several vaults in one run')
+    parser.add_argument('--obsidian-vault',
                        help='Path to Obsidian vault directory')
-    parser.add_argument('--hugo-content', required=True,
+    parser.add_argument('--hugo-content',
                        help='Path to Hugo content directory')
-    parser.add_argument('--author', default='clef233',
-                       help='Default author name')
-    parser.add_argument('--log-level', default='INFO',
+    parser.add_argument('--author',
+                       help='Default author name (default: clef233)')
+    parser.add_argument('--log-level',
                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
-                       help='Logging level')
+                       help='Logging level (default: INFO)')
     parser.add_argument('--dry-run', action='store_true',
                        help='Show what would be synced without actually doing it')
+    parser.add_argument('--manifest',
+                       help='Path to the sync manifest (default: <hugo-content>/../.obsidian_sync/manifest.json)')
+    parser.add_argument('--force', action='store_true',
+                       help='Ignore the sync manifest and re-process every note')
+    parser.add_argument('--jobs', '-j', type=int,
+                       help='Number of worker processes (0 = one per CPU core, default: 1)')
+    parser.add_argument('--io-concurrency', type=int,
+                       help='Overlap file stats, reads and writes with this many threads, '
+                            'for vaults on slow mounts such as iCloud Drive (default: serial)')
+    parser.add_argument('--icloud-prefetch', action='store_true',
+                       help='Download iCloud placeholder notes in the background and sync them once they arrive')
+    parser.add_argument('--prefetch-wait', type=float,
+                       help='Seconds a one-off sync waits for prefetched notes before finishing (default: 0)')
+    parser.add_argument('--git', action='store_true',
+                       help='The vault is in git: find changed notes with git diff/status and '
+                            'take note dates from their commits')
+    parser.add_argument('--publish-filter', choices=['publish', 'draft'],
+                       help="Only sync notes with 'publish: true' (publish) or without "
+                            "'draft: true' (draft) in their frontmatter")
+    parser.add_argument('--watch', action='store_true',
+                       help='Keep running and re-sync notes as they change')
+    parser.add_argument('--debounce', type=float, default=0.3,
+                       help='Seconds of quiet before a batch of changes is synced (watch mode)')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                       help='Polling interval in seconds when inotify is unavailable (watch mode)')
+    parser.add_argument('--metrics-json',
+                       help='Write per-stage timings, byte counts and the slowest notes to this JSON file')
 
     args = parser.parse_args()
 
-    # Create configuration
-    config = SyncConfig(
+    # Create configuration; options left unset fall back to the config file
+    overrides = dict(
         obsidian_vault_path=args.obsidian_vault,
         hugo_content_path=args.hugo_content,
         default_author=args.author,
-        log_level=args.log_level
+        log_level=args.log_level,
+        manifest_path=args.manifest,
+        use_manifest=False if args.force else None,
+        jobs=args.jobs,
+        io_concurrency=args.io_concurrency,
+        icloud_prefetch=True if args.icloud_prefetch else None,
+        prefetch_wait=args.prefetch_wait,
+        use_git=True if args.git else None,
+        publish_filter=args.publish_filter
     )
+    if args.config:
+        try:
+            configs = SyncConfig.targets_from_yaml(args.config, **overrides)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    elif args.obsidian_vault and args.hugo_content:
+        configs = [SyncConfig(**{key: value for key, value in overrides.items() if value is not None})]
+    else:
+        parser.error('--obsidian-vault and --hugo-content are required without --config')
+
+    if len(configs) > 1:
+        if args.obsidian_vault or args.hugo_content or args.watch:
+            parser.error('--obsidian-vault, --hugo-content and --watch need a config with a single target')
+        _sync_targets(configs, args)
+        return
 
     # Create synchronizer
-    synchronizer = ObsidianHugoSynchronizer(config)
+    synchronizer = ObsidianHugoSynchronizer(configs[0])
 
     if args.dry_run:
-        print("Dry run mode - showing what would be processed:")
-        # Add dry run logic here if needed
+        print("Dry run mode - nothing will be written:")
+        print(synchronizer.plan_vault().describe())
+        return
+
+    if args.watch:
+        from sync_watch import watch_vault
+        watch_vault(synchronizer, debounce=args.debounce, poll_interval=args.poll_interval)
         return
 
     # Run synchronization
     stats = synchronizer.sync_vault()
 
     print(f"\nSynchronization completed:")
+    _print_stats(stats)
+
+    if args.metrics_json:
+        with open(args.metrics_json, 'w', encoding='utf-8') as f:
+            json.dump(synchronizer.metrics.to_dict(stats), f, ensure_ascii=False, indent=1)
+        print(f"  Metrics written to {args.metrics_json}")
+
+
+def _sync_targets(configs: List[SyncConfig], args: argparse.Namespace):
+    """Run main() for a config listing several targets."""
+    from sync_multi import MultiVaultSynchronizer
+    multi = MultiVaultSynchronizer(configs)
+    try:
+        if args.dry_run:
+            print("Dry run mode - nothing will be written:")
+            for name, plan in multi.plan().items():
+                print(f"\n[{name}]")
+                print(plan.describe())
+            return
+        results = multi.sync()
+    finally:
+        multi.close()
+
+    print(f"\nSynchronization completed:")
+    for name, stats in results.items():
+        print(f"[{name}]")
+        _print_stats(stats)
+
+    if args.metrics_json:
+        metrics = {name: multi.synchronizers[name].metrics.to_dict(stats) for name, stats in results.items()}
+        with open(args.metrics_json, 'w', encoding='utf-8') as f:
+            json.dump(metrics, f, ensure_ascii=False, indent=1)
+        print(f"  Metrics written to {args.metrics_json}")
+
+
+def _print_stats(stats: Dict[str, int]):
     print(f"  Processed: {stats['processed']} files")
+    print(f"  Moved: {stats['moved']} files")
+    print(f"  Unchanged: {stats['unchanged']} files")
     print(f"  Skipped: {stats['skipped']} files")
     print(f"  Errors: {stats['errors']} files")
+    print(f"  Not downloaded (iCloud): {stats['placeholders']} files")
+    print(f"  Unresolved links: {stats['unresolved_links']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,80 @@
+"""
+Shared atomic, write-if-changed file writer
+
+Used by obsidian_sync.py, blog_sync.py, cli/manager.py and admin/app.py for
+every file they put into the Hugo site. New content is compared with the
+existing file (size first, then a BLAKE2 digest) and identical writes are
+skipped, so the file keeps its mtime and Hugo, git and rsync see nothing.
+Real changes go to a temporary file in the same directory that is renamed
+over the target, so readers never observe a partially written file.
+Text is encoded with encode_text, which turns "\n" into os.linesep like a
+file opened in text mode, so output keeps the platform's line endings.
+"""
+
+import os
+import hashlib
+from pathlib import Path
+from typing import Union
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def file_digest(path: Union[str, Path]) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_text(text: str, encoding: str = 'utf-8') -> bytes:
+    """Encode text as open(path, 'w') would write it, with '\\n' as os.linesep."""
+    if os.linesep != '\n':
+        text = text.replace('\n', os.linesep)
+    return text.encode(encoding)
+
+
+def atomic_write(path: Union[str, Path], data: bytes, durable: bool = False):
+    """Replace `path` with `data` via a temporary file and rename.
+
+    An existing file's permission bits are kept. With `durable` the data is
+    fsync'ed before the rename, for callers that must survive power loss.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def write_if_changed(path: Union[str, Path], content: Union[str, bytes],
+                     encoding: str = 'utf-8', durable: bool = False) -> bool:
+    """Atomically write `content` unless the file already holds exactly it.
+
+    Returns True when the file was written, False when it was left alone.
+    """
+    data = encode_text(content, encoding) if isinstance(content, str) else content
+    try:
+        if os.stat(path).st_size == len(data) and file_digest(path) == content_digest(data):
+            return False
+    except FileNotFoundError:
+        pass
+    atomic_write(path, data, durable)
+    return True
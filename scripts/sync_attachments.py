@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Content-addressed attachment store for the Obsidian to Hugo synchronizer
+
+Resolves `![[image.png]]` embeds against the vault the way Obsidian does and
+publishes each file under static/attachments/<hash[:2]>/<hash[:16]><ext>. Files
+with the same content are stored once no matter how many notes embed them.
+Source hashes are cached by size and mtime, and existing targets are never
+copied again; new targets are hardlinked when source and static dir share a
+filesystem, otherwise copied with copy_file_range where available.
+"""
+
+import os
+import shutil
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from sync_images import ImageOptimizer
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _copy_file(src: Path, dest: Path):
+    """Copy file data, in the kernel when copy_file_range is available."""
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as fsrc, open(dest, 'wb') as fdest:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdest.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining == 0:
+                return
+        except OSError:
+            pass
+    shutil.copyfile(src, dest)
+
+
+class AttachmentStore:
+    """Resolve embeds to vault files and publish them into Hugo's static dir.
+
+    `known` maps vault-relative attachment paths to {size, mtime_ns, hash}
+    and is normally the `attachments` section of the sync manifest.
+    Records refreshed since the last `take_updates()` call are tracked so
+    worker processes can hand them back to the parent.
+    """
+
+    def __init__(self, vault_path: Path, static_path: Path, url_prefix: str,
+                 matcher=None, known: Optional[Dict[str, Dict]] = None,
+                 hardlinks: bool = True, images: Optional[ImageOptimizer] = None):
+        self.vault_path = Path(vault_path)
+        self.vault_root = self.vault_path.resolve()
+        self.static_path = Path(static_path)
+        self.url_prefix = url_prefix.rstrip('/')
+        self.matcher = matcher
+        self.known = known if known is not None else {}
+        self.hardlinks = hardlinks
+        self.images = images
+        self.index: Dict[str, List[str]] = {}
+        self.updated: Dict[str, Dict] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def build_index(self):
+        """Index every non-note file in the vault by lower-cased file name."""
+        index: Dict[str, List[str]] = {}
+        stack = ['']
+        while stack:
+            relative_dir = stack.pop()
+            directory = self.vault_path / relative_dir if relative_dir else self.vault_path
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                relative = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name.startswith('.'):
+                        continue
+                    if self.matcher is not None and self.matcher.matches_dir(relative):
+                        continue
+                    stack.append(relative)
+                elif not entry.name.endswith('.md'):
+                    index.setdefault(entry.name.lower(), []).append(relative)
+        for paths in index.values():
+            paths.sort(key=lambda p: (p.count('/'), p))
+        self.index = index
+        return self
+
+    def resolve(self, target: str, note_path: Path) -> Optional[Path]:
+        """Find the vault file an embed refers to, or None if it is not an attachment.
+
+        Files outside the vault or matched by the exclude patterns are
+        never returned.
+        """
+        target = target.split('#', 1)[0].strip()
+        if not target or Path(target).suffix.lower() in ('', '.md'):
+            return None
+
+        note_dir = note_path.parent
+        candidates = []
+        if '/' in target:
+            candidates.append(self.vault_path / target)
+        candidates.append(note_dir / target)
+
+        # Obsidian prefers a file next to the note, then the shortest path
+        matches = [self.vault_path / relative
+                   for relative in self.index.get(Path(target).name.lower(), [])]
+        candidates.extend(path for path in matches if path.parent == note_dir)
+        candidates.extend(matches)
+
+        for candidate in candidates:
+            relative = self._vault_relative(candidate)
+            if relative is not None and candidate.is_file():
+                return self.vault_path / relative
+        return None
+
+    def _vault_relative(self, path: Path) -> Optional[str]:
+        """The path relative to the vault, None if it lies outside it or is excluded.
+
+        `../` segments and symlinks are resolved first, so an embed cannot
+        publish files from elsewhere on disk.
+        """
+        try:
+            relative = path.resolve().relative_to(self.vault_root).as_posix()
+        except (OSError, ValueError):
+            return None
+        if self.matcher is not None and self.matcher.matches(relative):
+            return None
+        return relative
+
+    def _hash(self, path: Path, relative: str, stat_result: os.stat_result) -> str:
+        record = self.known.get(relative)
+        if (record and record.get('size') == stat_result.st_size
+                and record.get('mtime_ns') == stat_result.st_mtime_ns):
+            return record['hash']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        record = {'size': stat_result.st_size, 'mtime_ns': stat_result.st_mtime_ns,
+                  'hash': digest.hexdigest()}
+        self.known[relative] = record
+        self.updated[relative] = record
+        return record['hash']
+
+    def stored_name(self, content_hash: str, suffix: str) -> str:
+        return f"{content_hash[:2]}/{content_hash[:16]}{suffix.lower()}"
+
+    def _materialize(self, src: Path, dest: Path):
+        """Create dest from src atomically, preferring a hardlink."""
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+        try:
+            linked = False
+            if self.hardlinks:
+                try:
+                    os.link(src, tmp)
+                    linked = True
+                except OSError:
+                    pass
+            if not linked:
+                _copy_file(src, tmp)
+            os.replace(tmp, dest)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    def _publish(self, path: Path) -> Tuple[str, str]:
+        stat_result = path.stat()
+        relative = path.relative_to(self.vault_path).as_posix()
+        content_hash = self._hash(path, relative, stat_result)
+        name = self.stored_name(content_hash, path.suffix)
+        dest = self.static_path / name
+        if not dest.exists():
+            self._materialize(path, dest)
+            self.logger.debug(f"Stored attachment {relative} as {name}")
+        return f"{self.url_prefix}/{name}", content_hash
+
+    def publish(self, path: Path) -> str:
+        """Store one vault file under its content hash and return its URL."""
+        return self._publish(path)[0]
+
+    def render_embed(self, target: str, alias: Optional[str], note_path: Path,
+                     used: Optional[Set[str]] = None) -> Optional[str]:
+        """Markdown (or <img> for optimizable images) replacing an embed, or None.
+
+        The vault-relative path of the resolved file is added to `used`.
+        """
+        path = self.resolve(target, note_path)
+        if path is None:
+            if Path(target).suffix.lower() not in ('', '.md'):
+                self.logger.warning(f"Attachment not found: {target} (embedded in {note_path})")
+            return None
+        url, content_hash = self._publish(path)
+        if used is not None:
+            used.add(path.relative_to(self.vault_path).as_posix())
+
+        # Obsidian reads ![[pic.png|300]] as a display width, not alt text
+        display_width = None
+        if alias and alias.strip().isdigit():
+            display_width = int(alias.strip())
+            alias = None
+        alt = alias or target
+
+        if self.images is not None:
+            html = self.images.render_html(path, content_hash, url, alt, display_width)
+            if html:
+                return html
+        return f"![{alt}]({url})"
+
+    def url_for(self, target: str, note_path: Path) -> Optional[str]:
+        """Resolve and publish an embed target; None leaves the embed as it was."""
+        path = self.resolve(target, note_path)
+        if path is None:
+            if Path(target).suffix.lower() not in ('', '.md'):
+                self.logger.warning(f"Attachment not found: {target} (embedded in {note_path})")
+            return None
+        return self.publish(path)
+
+    def take_updates(self) -> Dict[str, Dict]:
+        """Return and reset the state refreshed since the last call."""
+        updates = {'attachments': self.updated,
+                   'images': self.images.take_updates() if self.images is not None else None}
+        self.updated = {}
+        return updates
+
+    def merge_updates(self, updates: Dict[str, Dict]):
+        """Fold state returned by a worker process into this store."""
+        self.known.update(updates['attachments'])
+        if self.images is not None and updates['images']:
+            self.images.merge_updates(updates['images'])
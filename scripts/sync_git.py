@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Git-aware change detection and note dates
+
+When the vault is (inside) a git work tree, the notes that changed since
+the last sync come from two commands instead of a walk that stats and
+hashes every note: `git diff` between the last synced commit and HEAD,
+and `git status` for edits and new files not committed yet. Dates come
+from one `git log` pass over the vault's history: a note's first commit
+is its creation date and its latest commit its update date. Checkouts
+and iCloud reset mtimes, so these dates are stable where mtimes are not.
+"""
+
+import os
+import logging
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+
+class GitVault:
+    """The git work tree a vault lives in, with paths relative to the vault."""
+
+    def __init__(self, vault_path: Path, toplevel: Path):
+        self.vault_path = Path(vault_path)
+        self.toplevel = Path(toplevel)
+        self.logger = logging.getLogger(__name__)
+        prefix = os.path.relpath(os.path.realpath(self.vault_path), os.path.realpath(self.toplevel))
+        # Vault folder relative to the repository root, '' when it is the root
+        self.prefix = '' if prefix == '.' else prefix.replace(os.sep, '/') + '/'
+
+    @classmethod
+    def open(cls, vault_path: Path) -> Optional['GitVault']:
+        """The vault's work tree, or None if it is not in one or git is missing."""
+        try:
+            result = subprocess.run(['git', 'rev-parse', '--show-toplevel'], cwd=vault_path,
+                                    capture_output=True, text=True, check=True)
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return cls(vault_path, Path(result.stdout.strip()))
+
+    def _git(self, *args: str) -> Optional[str]:
+        """Run git at the repository root; None (logged) if it fails."""
+        try:
+            result = subprocess.run(['git', *args], cwd=self.toplevel, capture_output=True, check=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            stderr = getattr(e, 'stderr', b'') or b''
+            self.logger.debug(f"git {' '.join(args)} failed: {e} {stderr.decode('utf-8', 'replace').strip()}")
+            return None
+        return result.stdout.decode('utf-8', 'surrogateescape')
+
+    def _in_vault(self, paths) -> Set[str]:
+        """Repository paths under the vault, made relative to it."""
+        return {path[len(self.prefix):] for path in paths if path and path.startswith(self.prefix)}
+
+    def _pathspec(self) -> str:
+        return self.prefix or '.'
+
+    def head(self) -> Optional[str]:
+        """The commit checked out, None in a repository without commits."""
+        output = self._git('rev-parse', '--verify', '--quiet', 'HEAD')
+        return output.strip() if output else None
+
+    def committed_since(self, commit: str) -> Optional[Set[str]]:
+        """Vault paths changed by the commits from `commit` to HEAD, None if it is unknown."""
+        output = self._git('diff', '--name-only', '-z', '--no-renames', commit, 'HEAD',
+                           '--', self._pathspec())
+        if output is None:
+            return None
+        return self._in_vault(output.split('\0'))
+
+    def uncommitted(self) -> Optional[Set[str]]:
+        """Vault paths edited, deleted or added since HEAD, untracked ones included."""
+        output = self._git('status', '--porcelain', '-z', '--untracked-files=all', '--no-renames',
+                           '--', self._pathspec())
+        if output is None:
+            return None
+        # Each entry is "XY path"
+        return self._in_vault(entry[3:] for entry in output.split('\0') if len(entry) > 3)
+
+    def dates(self) -> Dict[str, Tuple[int, int]]:
+        """(created, updated) author timestamps of every note in the history.
+
+        One `git log` pass, newest commit first. A renamed note keeps the
+        creation date of its first name; a note deleted and later added
+        again starts over. Notes never committed are missing.
+        """
+        output = self._git('log', '--format=%x01%at', '--name-status', '-z', '-M',
+                           '--', self._pathspec())
+        dates: Dict[str, Tuple[int, int]] = {}
+        # Older name -> the note it is now; None once a note was deleted there
+        names: Dict[str, Optional[str]] = {}
+        for record in (output or '').split('\x01'):
+            timestamp, _, changes = record.partition('\0')
+            if not timestamp.strip():
+                continue
+            when = int(timestamp)
+            tokens = changes.lstrip('\n').split('\0')
+            index = 0
+            while index + 1 < len(tokens):
+                status = tokens[index]
+                if status[:1] in ('R', 'C'):
+                    old, path = tokens[index + 1], tokens[index + 2]
+                    index += 3
+                else:
+                    old, path = None, tokens[index + 1]
+                    index += 2
+                if status[:1] == 'D':
+                    # Older history of this path belongs to a note that is gone
+                    names[path] = None
+                    continue
+                note = names.get(path, path)
+                if note is None:
+                    continue
+                if status[:1] == 'R':
+                    names[old] = note
+                previous = dates.get(note)
+                dates[note] = (when, previous[1] if previous else when)
+        return {path[len(self.prefix):]: when for path, when in dates.items()
+                if path.startswith(self.prefix) and path.endswith('.md')}
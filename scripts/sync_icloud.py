@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+iCloud Drive placeholder detection and background download
+
+Notes iCloud has not downloaded yet show up in one of two ways: as a
+hidden `.Name.md.icloud` stub next to where `Name.md` should be (older
+macOS), or as a "dataless" file with the real name whose first read
+blocks until the download finishes (newer macOS: SF_DATALESS in
+st_flags; iCloud for Windows: recall-on-access file attributes). Both are
+recognised from the directory entry and its stat result, without opening
+the file, so the synchronizer can skip them instead of stalling.
+
+PlaceholderPrefetcher asks for the downloads in the background (`brctl
+download` on macOS, otherwise a daemon thread that reads one byte, which
+makes the OS fetch the file) and reports which notes have arrived, so
+they can be synced in a later batch.
+"""
+
+import os
+import time
+import queue
+import shutil
+import logging
+import threading
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ICLOUD_STUB_SUFFIX = '.icloud'
+
+# macOS: file content lives only in the cloud (sys/stat.h)
+SF_DATALESS = 0x40000000
+# Windows cloud files: content is fetched on open or on first read
+_WINDOWS_RECALL_ATTRIBUTES = 0x00001000 | 0x00040000 | 0x00400000
+
+# Seconds between checks while waiting for downloads
+PREFETCH_POLL_INTERVAL = 0.2
+
+
+def placeholder_target(name: str) -> Optional[str]:
+    """Real file name behind a `.Name.md.icloud` stub, None for other names."""
+    if name.startswith('.') and name.endswith(ICLOUD_STUB_SUFFIX) and len(name) > len(ICLOUD_STUB_SUFFIX) + 1:
+        return name[1:-len(ICLOUD_STUB_SUFFIX)]
+    return None
+
+
+def stub_path(path: Path) -> Path:
+    """Where the stub of a not yet downloaded file would be."""
+    return path.with_name(f".{path.name}{ICLOUD_STUB_SUFFIX}")
+
+
+def is_dataless(stat_result: os.stat_result) -> bool:
+    """Whether the file's content has not been downloaded (reading it would block)."""
+    if getattr(stat_result, 'st_flags', 0) & SF_DATALESS:
+        return True
+    return bool(getattr(stat_result, 'st_file_attributes', 0) & _WINDOWS_RECALL_ATTRIBUTES)
+
+
+class PlaceholderPrefetcher:
+    """Requests downloads of placeholder notes and tracks which have arrived."""
+
+    def __init__(self, vault_path: Path):
+        self.vault_path = Path(vault_path)
+        self.pending: Dict[str, float] = {}
+        self.logger = logging.getLogger(__name__)
+        self._brctl = shutil.which('brctl')
+        self._processes: List[subprocess.Popen] = []
+        self._queue: Optional[queue.Queue] = None
+
+    def request(self, source: str):
+        """Start downloading a note in the background; repeated calls are no-ops."""
+        if source in self.pending:
+            return
+        self.pending[source] = time.monotonic()
+        path = self.vault_path / source
+        if self._brctl:
+            try:
+                self._processes.append(subprocess.Popen(
+                    [self._brctl, 'download', str(path)],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+                return
+            except OSError as e:
+                self.logger.debug(f"brctl download failed for {path}: {e}")
+        if self._queue is None:
+            self._queue = queue.Queue()
+            threading.Thread(target=self._read_first_bytes, name='icloud-prefetch', daemon=True).start()
+        self._queue.put(path)
+
+    def _read_first_bytes(self):
+        while True:
+            path = self._queue.get()
+            try:
+                with open(path, 'rb') as f:
+                    f.read(1)
+            except OSError as e:
+                # A stub without brctl cannot be downloaded from here
+                self.logger.debug(f"Cannot prefetch {path}: {e}")
+
+    def ready(self) -> List[str]:
+        """Requested notes that are now fully downloaded, no longer pending."""
+        self._processes = [process for process in self._processes if process.poll() is None]
+        arrived = []
+        for source in list(self.pending):
+            path = self.vault_path / source
+            try:
+                stat_result = path.stat()
+            except OSError:
+                continue
+            if not is_dataless(stat_result) and not stub_path(path).exists():
+                arrived.append(source)
+                del self.pending[source]
+        return sorted(arrived)
+
+    def wait(self, timeout: float) -> List[str]:
+        """Wait up to `timeout` seconds for pending downloads, returning those that arrived."""
+        deadline = time.monotonic() + timeout
+        arrived = self.ready()
+        while self.pending and time.monotonic() < deadline:
+            time.sleep(PREFETCH_POLL_INTERVAL)
+            arrived.extend(self.ready())
+        return sorted(arrived)
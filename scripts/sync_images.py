@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Responsive image variants for the Obsidian to Hugo synchronizer
+
+Intrinsic sizes are read from the PNG/JPEG/GIF/WebP headers without decoding
+pixels (JPEG EXIF orientation is honoured), so the rewritten Markdown can
+carry width/height and a srcset as soon as a note is converted. The resized
+variants themselves are queued and rendered at the end of the sync on a
+process pool. Variant file names contain the source hash and a hash of the
+settings, so only new images or new settings cost CPU.
+
+Rendering needs Pillow (`pip install Pillow`); without it images keep their
+original file but still get width, height and lazy loading.
+"""
+
+import os
+import json
+import struct
+import hashlib
+import logging
+from html import escape
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+
+OPTIMIZABLE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.webp')
+_HEADER_SUFFIXES = OPTIMIZABLE_SUFFIXES + ('.gif',)
+
+
+def _jpeg_orientation(segment: bytes) -> int:
+    """EXIF orientation from an APP1 segment body, 1 when absent."""
+    if not segment.startswith(b'Exif\x00\x00'):
+        return 1
+    tiff = segment[6:]
+    if len(tiff) < 8:
+        return 1
+    endian = '<' if tiff[:2] == b'II' else '>'
+    try:
+        ifd_offset = struct.unpack(endian + 'I', tiff[4:8])[0]
+        (count,) = struct.unpack(endian + 'H', tiff[ifd_offset:ifd_offset + 2])
+        for i in range(count):
+            entry = ifd_offset + 2 + i * 12
+            tag, _, _, value = struct.unpack(endian + 'HHIH', tiff[entry:entry + 10])
+            if tag == 0x0112:
+                return value
+    except struct.error:
+        pass
+    return 1
+
+
+def _jpeg_size(f) -> Optional[Tuple[int, int]]:
+    orientation = 1
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':
+            byte = f.read(1)
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in (0x01, 0xd8) or 0xd0 <= marker <= 0xd7:
+            continue
+        if marker in (0xd9, 0xda):
+            return None
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if marker == 0xe1 and orientation == 1:
+            orientation = _jpeg_orientation(f.read(length - 2))
+            continue
+        if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack('>HH', data[1:5])
+            # Orientations 5-8 rotate the picture by 90 degrees
+            return (height, width) if orientation >= 5 else (width, height)
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def read_image_size(path: Path) -> Optional[Tuple[int, int]]:
+    """Return (width, height) from the file header, or None if unknown."""
+    if path.suffix.lower() not in _HEADER_SUFFIXES:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(32)
+            if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+                return struct.unpack('>II', head[16:24])
+            if head[:6] in (b'GIF87a', b'GIF89a'):
+                return struct.unpack('<HH', head[6:10])
+            if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+                chunk = head[12:16]
+                if chunk == b'VP8X':
+                    width = int.from_bytes(head[24:27], 'little') + 1
+                    height = int.from_bytes(head[27:30], 'little') + 1
+                    return width, height
+                if chunk == b'VP8L':
+                    bits = int.from_bytes(head[21:25], 'little')
+                    return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+                if chunk == b'VP8 ':
+                    width, height = struct.unpack('<HH', head[26:30])
+                    return width & 0x3fff, height & 0x3fff
+                return None
+            if head[:2] == b'\xff\xd8':
+                return _jpeg_size(f)
+    except (OSError, struct.error):
+        return None
+    return None
+
+
+def _render_variant(job: Tuple[str, str, int, str, int]) -> Optional[str]:
+    """Resize one image; runs in a worker process. Returns an error or None."""
+    src, dest, width, image_format, quality = job
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    try:
+        with Image.open(src) as img:
+            if img.format == 'JPEG':
+                img.draft('RGB', (width, width * 4))
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((width, 1 << 20), Image.LANCZOS)
+            if image_format == 'jpeg' and img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            options = {'quality': quality}
+            if image_format == 'webp':
+                options['method'] = 4
+            Path(dest).parent.mkdir(parents=True, exist_ok=True)
+            img.save(tmp, format=image_format.upper(), **options)
+        os.replace(tmp, dest)
+        return None
+    except Exception as e:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        return f"{type(e).__name__}: {e}"
+
+
+class ImageOptimizer:
+    """Describe images for the Markdown output and render their variants.
+
+    `dimensions` maps source content hashes to [width, height] and is
+    normally the `images` section of the sync manifest.
+    """
+
+    def __init__(self, output_path: Path, url_prefix: str, widths: List[int],
+                 image_format: str = 'webp', quality: int = 80,
+                 dimensions: Optional[Dict[str, List[int]]] = None, jobs: int = 0):
+        self.output_path = Path(output_path)
+        self.url_prefix = url_prefix.rstrip('/')
+        self.widths = sorted(set(widths))
+        self.image_format = image_format
+        self.quality = quality
+        self.dimensions = dimensions if dimensions is not None else {}
+        self.jobs = jobs
+        self.queue: Dict[str, Tuple[str, str, int, str, int]] = {}
+        # Variants that failed to render; they are left out of srcsets from then on
+        self.failed: Set[str] = set()
+        self.updated: Dict[str, List[int]] = {}
+        self.logger = logging.getLogger(__name__)
+        settings = json.dumps([self.widths, image_format, quality])
+        self.settings_hash = hashlib.sha256(settings.encode('utf-8')).hexdigest()[:8]
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    def size_of(self, path: Path, content_hash: str) -> Optional[Tuple[int, int]]:
+        cached = self.dimensions.get(content_hash)
+        if cached:
+            return cached[0], cached[1]
+        size = read_image_size(path)
+        if size:
+            self.dimensions[content_hash] = list(size)
+            self.updated[content_hash] = list(size)
+        return size
+
+    def variants(self, path: Path, content_hash: str, width: int, height: int) -> List[Tuple[int, int, str]]:
+        """(width, height, url) for each variant, queueing the missing ones.
+
+        Variants that failed to render in this process are left out.
+        """
+        if not self.available or path.suffix.lower() not in OPTIMIZABLE_SUFFIXES:
+            return []
+        extension = 'jpg' if self.image_format == 'jpeg' else self.image_format
+        result = []
+        for target_width in self.widths:
+            if target_width >= width:
+                break
+            name = f"{content_hash[:2]}/{content_hash[:16]}-{target_width}w-{self.settings_hash}.{extension}"
+            if name in self.failed:
+                continue
+            dest = self.output_path / name
+            if not dest.exists() and name not in self.queue:
+                self.queue[name] = (str(path), str(dest), target_width, self.image_format, self.quality)
+            result.append((target_width, round(height * target_width / width), f"{self.url_prefix}/{name}"))
+        return result
+
+    def render_html(self, path: Path, content_hash: str, original_url: str,
+                    alt: str, display_width: Optional[int] = None) -> Optional[str]:
+        """<img> markup with srcset, intrinsic size and lazy loading, or None if the size is unknown."""
+        size = self.size_of(path, content_hash)
+        if not size:
+            return None
+        width, height = size
+        attrs = [f'src="{escape(original_url)}"', f'alt="{escape(alt)}"']
+        variants = self.variants(path, content_hash, width, height)
+        if variants:
+            srcset = ', '.join(f"{escape(url)} {w}w" for w, _, url in variants)
+            srcset += f", {escape(original_url)} {width}w"
+            attrs.append(f'srcset="{srcset}"')
+            attrs.append(f'sizes="(max-width: {display_width or width}px) 100vw, {display_width or width}px"')
+        if display_width and display_width < width:
+            height = round(height * display_width / width)
+            width = display_width
+        attrs += [f'width="{width}"', f'height="{height}"', 'loading="lazy"', 'decoding="async"']
+        return f"<img {' '.join(attrs)}>"
+
+    def take_updates(self) -> Dict[str, object]:
+        updates = {'dimensions': self.updated, 'queue': self.queue}
+        self.updated, self.queue = {}, {}
+        return updates
+
+    def merge_updates(self, updates: Dict[str, object]):
+        self.dimensions.update(updates['dimensions'])
+        for name, job in updates['queue'].items():
+            self.queue.setdefault(name, job)
+
+    def flush(self) -> Dict[str, Any]:
+        """Render every queued variant, in a process pool when there are several.
+
+        `failed_sources` lists the images a variant failed for. Markdown
+        rendered before the flush still points at those variants, so the
+        notes embedding them have to be rendered again.
+        """
+        stats: Dict[str, Any] = {'rendered': 0, 'failed': 0, 'failed_sources': []}
+        names = sorted(self.queue)
+        jobs = [self.queue[name] for name in names]
+        self.queue = {}
+        if not jobs:
+            return stats
+
+        workers = min(self.jobs if self.jobs > 0 else (os.cpu_count() or 1), len(jobs))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                errors = list(executor.map(_render_variant, jobs))
+        else:
+            errors = [_render_variant(job) for job in jobs]
+
+        for name, job, error in zip(names, jobs, errors):
+            if error:
+                self.logger.error(f"Failed to render {job[1]} from {job[0]}: {error}")
+                stats['failed'] += 1
+                self.failed.add(name)
+                if job[0] not in stats['failed_sources']:
+                    stats['failed_sources'].append(job[0])
+            else:
+                stats['rendered'] += 1
+        self.logger.info(f"Rendered {stats['rendered']} image variants, {stats['failed']} failed")
+        return stats
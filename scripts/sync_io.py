@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Concurrent file I/O for vaults on high-latency filesystems
+
+On iCloud Drive and network mounts every open() and stat() can block for
+tens of milliseconds, so a serial loop mostly waits. AsyncIOEngine runs
+batches of blocking calls (stat, read, write) on an asyncio event loop
+that offloads each one to a thread, keeping at most `concurrency` in
+flight, and hands the results back in input order. Parsing and rendering
+stay on the calling thread; only the waiting overlaps.
+
+SharedReads hands a note read for one sync target to the other targets
+whose vaults contain it, so overlapping vaults read each note once.
+"""
+
+import os
+import time
+import asyncio
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from output_writer import write_if_changed
+
+
+class AsyncIOEngine:
+    """Bounded-concurrency stat/read/write batches, results in input order.
+
+    Errors raised by a call are returned in its slot instead of raised,
+    so one unreadable file does not fail the batch.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = max(1, concurrency)
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def map(self, func: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+        """Run func over items in worker threads, returning results or exceptions."""
+        items = list(items)
+        if not items:
+            return []
+        if self.loop is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                               thread_name_prefix='sync-io')
+            self.loop = asyncio.new_event_loop()
+        return self.loop.run_until_complete(self._gather(func, items))
+
+    async def _gather(self, func: Callable[[Any], Any], items: List[Any]) -> List[Any]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_running_loop()
+
+        async def run(item):
+            async with semaphore:
+                try:
+                    return await loop.run_in_executor(self.executor, func, item)
+                except Exception as e:
+                    return e
+
+        return await asyncio.gather(*(run(item) for item in items))
+
+    def stat(self, entries: Iterable[Union[os.DirEntry, Path]]) -> List[Union[os.stat_result, OSError]]:
+        return self.map(lambda entry: entry.stat(), entries)
+
+    def read_bytes(self, paths: Iterable[Path]) -> List[Union[bytes, OSError]]:
+        return self.map(lambda path: Path(path).read_bytes(), paths)
+
+    def write(self, items: Iterable[Tuple[Path, bytes]]
+              ) -> List[Union[Tuple[bool, float], Exception]]:
+        """write_if_changed for each (path, data): (written, seconds) or the error."""
+        def write_one(item: Tuple[Path, bytes]) -> Tuple[bool, float]:
+            start = time.perf_counter()
+            written = write_if_changed(item[0], item[1])
+            return written, time.perf_counter() - start
+
+        return self.map(write_one, items)
+
+    def close(self):
+        if self.loop is not None:
+            self.loop.close()
+            self.executor.shutdown()
+            self.loop = None
+            self.executor = None
+
+
+class SharedReads:
+    """Note contents read by one sync target and still wanted by others.
+
+    `readers` counts, per absolute note path, how many targets sync that
+    note. A read is kept only until every other reader has taken it, so
+    notes that belong to a single target never stay in memory.
+    """
+
+    def __init__(self, readers: Dict[str, int]):
+        self.readers = readers
+        self.contents: Dict[str, bytes] = {}
+
+    def take(self, path: Union[str, Path]) -> Optional[bytes]:
+        """The note's content if another target already read it, else None."""
+        key = os.path.abspath(path)
+        raw = self.contents.get(key)
+        if raw is not None:
+            self.readers[key] -= 1
+            if self.readers[key] <= 0:
+                del self.contents[key]
+        return raw
+
+    def keep(self, path: Union[str, Path], raw: bytes):
+        """Offer a note just read to the targets that have not read it yet."""
+        key = os.path.abspath(path)
+        remaining = self.readers.get(key, 1) - 1
+        if remaining > 0:
+            self.readers[key] = remaining
+            self.contents[key] = raw
+
+    def clear(self):
+        self.contents.clear()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Vault-wide link index for the Obsidian to Hugo synchronizer
+
+Maps note names, vault-relative paths, frontmatter aliases and heading
+anchors to the final Hugo permalinks, so each `[[Note#Heading|alias]]`
+resolves with dictionary lookups. The index is rebuilt from the walk and
+the sync manifest once per sync and updated per note afterwards.
+
+NoteGraph keeps the resolved links between notes in both directions and
+serialises them as the Hugo data file behind "linked from" sections and
+the graph view; only the edges of converted notes change per sync.
+DependencyIndex uses the same adjacency to record what each note's output
+depends on, so a change can be traced to the notes that must be rebuilt.
+"""
+
+import re
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from output_writer import write_if_changed
+
+
+_SLUG_DROP_RE = re.compile(r'[^\w\- ]')
+_HEADING_LINK_RE = re.compile(r'!?\[\[([^\]|\n]+)(?:\|([^\]\n]+))?\]\]|!?\[([^\]\n]*)\]\([^)\n]*\)')
+
+
+# Markdown structure shared by the parser's outline and transclusion
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)(?:\s+#+)?\s*$')
+FENCE_OPEN_RE = re.compile(r'^[ ]{0,3}(`{3,}|~{3,})')
+FENCE_CLOSE_RE = re.compile(r'^[ ]{0,3}(`{3,}|~{3,})[ \t]*$', re.MULTILINE)
+
+
+def next_fence(line: str, fence: Optional[str]) -> Optional[str]:
+    """The code fence open after `line`, given the one open before it (None outside code)."""
+    if fence is not None:
+        close = FENCE_CLOSE_RE.match(line)
+        if close and close.group(1)[0] == fence[0] and len(close.group(1)) >= len(fence):
+            return None
+        return fence
+    opening = FENCE_OPEN_RE.match(line)
+    return opening.group(1) if opening else None
+
+
+def _heading_text(text: str) -> str:
+    """Heading text as rendered: links reduced to their label."""
+    return _HEADING_LINK_RE.sub(
+        lambda m: m.group(3) if m.group(3) is not None else (m.group(2) or m.group(1)), text)
+
+
+def heading_slug(text: str) -> str:
+    """Anchor id Hugo's goldmark renderer generates for a heading (GitHub style)."""
+    text = _heading_text(text).strip().lower()
+    text = _SLUG_DROP_RE.sub('', text)
+    return text.replace(' ', '-')
+
+
+def heading_anchors(headings: List[Tuple[int, str]]) -> Dict[str, str]:
+    """Map normalised heading text to its anchor, numbering duplicates like goldmark."""
+    anchors: Dict[str, str] = {}
+    used: Dict[str, int] = {}
+    for _, text in headings:
+        slug = heading_slug(text)
+        if slug in used:
+            used[slug] += 1
+            slug = f"{slug}-{used[slug]}"
+        else:
+            used[slug] = 0
+        anchors.setdefault(_normalize(_heading_text(text)), slug)
+    return anchors
+
+
+def _normalize(name: str) -> str:
+    return ' '.join(name.strip().lower().split())
+
+
+def note_dependency(target: str) -> Optional[str]:
+    """Dependency key for the note a wikilink names, None for links within a note."""
+    note, _ = split_link_target(target)
+    return f"note:{_normalize(note)}" if note else None
+
+
+def file_dependency(relative_path: str) -> str:
+    """Dependency key for a vault file a note embeds."""
+    return f"file:{relative_path}"
+
+
+def embed_dependency(source: str) -> str:
+    """Dependency key for the content of a note other notes transclude."""
+    return f"embed:{source}"
+
+
+def placeholder_dependency(source: str) -> str:
+    """Dependency key for a transcluded note iCloud had not downloaded yet."""
+    return f"placeholder:{source}"
+
+
+def split_link_target(target: str) -> Tuple[str, Optional[str]]:
+    """Split 'Note#Heading' into ('Note', 'Heading'); block refs drop the '^id'."""
+    note, _, fragment = target.partition('#')
+    note = note.strip()
+    if note.lower().endswith('.md'):
+        note = note[:-3]
+    fragment = fragment.strip()
+    if not fragment or fragment.startswith('^'):
+        return note, None
+    # Obsidian writes nested heading paths as Note#H1#H2; the last one is the target
+    return note, fragment.split('#')[-1].strip()
+
+
+class LinkIndex:
+    """Lookup tables from link targets to vault notes and their permalinks."""
+
+    def __init__(self):
+        self.notes: Dict[str, Dict[str, Any]] = {}
+        self.names: Dict[str, List[str]] = {}
+
+    def dependency_keys(self, source: str, aliases: List[str]) -> List[str]:
+        """note: dependency keys a note answers to, see note_dependency()."""
+        return [f"note:{key}" for key in self._keys(source, aliases)]
+
+    def _keys(self, source: str, aliases: List[str]) -> List[str]:
+        path = source[:-3] if source.endswith('.md') else source
+        keys = {_normalize(path), _normalize(path.rsplit('/', 1)[-1])}
+        keys.update(_normalize(alias) for alias in aliases if alias)
+        return sorted(keys)
+
+    def add(self, source: str, permalink: str, aliases: List[str], anchors: Dict[str, str]):
+        """Register or replace one note."""
+        if source in self.notes:
+            self.remove(source)
+        self.notes[source] = {'permalink': permalink, 'aliases': aliases, 'anchors': anchors}
+        for key in self._keys(source, aliases):
+            self.names.setdefault(key, []).append(source)
+
+    def remove(self, source: str):
+        info = self.notes.pop(source, None)
+        if info is None:
+            return
+        for key in self._keys(source, info['aliases']):
+            sources = self.names.get(key)
+            if sources and source in sources:
+                sources.remove(source)
+                if not sources:
+                    del self.names[key]
+
+    def lookup(self, note: str, from_source: str) -> Optional[str]:
+        """Source path of the note a link names, preferring the linking note's folder."""
+        sources = self.names.get(_normalize(note))
+        if not sources:
+            return None
+        if len(sources) == 1:
+            return sources[0]
+        folder = from_source.rsplit('/', 1)[0] if '/' in from_source else ''
+        same_folder = [s for s in sources if (s.rsplit('/', 1)[0] if '/' in s else '') == folder]
+        return min(same_folder or sources, key=lambda s: (s.count('/'), s))
+
+    def resolve(self, target: str, from_source: str) -> Optional[str]:
+        """URL for a wikilink target, or None if the note or heading does not exist.
+
+        Links to a heading of the linking note itself resolve to the bare anchor.
+        """
+        resolved = self.resolve_with_source(target, from_source)
+        return resolved[1] if resolved else None
+
+    def resolve_with_source(self, target: str, from_source: str) -> Optional[Tuple[str, str]]:
+        """(source, url) for a wikilink target, or None if it does not resolve."""
+        note, heading = split_link_target(target)
+        source = self.lookup(note, from_source) if note else from_source
+        info = self.notes.get(source) if source else None
+        if info is None:
+            return None
+
+        url = info['permalink'] if note else ''
+        if heading:
+            anchor = info['anchors'].get(_normalize(heading))
+            if anchor is None:
+                # Obsidian drops characters such as ':' when linking to a heading
+                slug = heading_slug(heading)
+                if slug not in info['anchors'].values():
+                    return None
+                anchor = slug
+            url += f"#{anchor}"
+        return source, url
+
+
+class DependencyIndex:
+    """Edges from notes to the keys they depend on, with the reverse lookup."""
+
+    def __init__(self):
+        self.forward: Dict[str, Set[str]] = {}
+        self.reverse: Dict[str, Set[str]] = {}
+
+    def set_edges(self, source: str, targets: Iterable[str]) -> bool:
+        """Replace the outgoing edges of one note; returns whether they changed."""
+        new = set(targets) - {source}
+        old = self.forward.get(source, set())
+        if new == old:
+            return False
+        for target in old - new:
+            backlinks = self.reverse.get(target)
+            if backlinks is not None:
+                backlinks.discard(source)
+                if not backlinks:
+                    del self.reverse[target]
+        for target in new - old:
+            self.reverse.setdefault(target, set()).add(source)
+        if new:
+            self.forward[source] = new
+        else:
+            self.forward.pop(source, None)
+        return True
+
+    def remove(self, source: str):
+        """Drop a note's outgoing edges; edges pointing at it stay until their notes change."""
+        self.set_edges(source, ())
+
+    def dependents(self, keys: Iterable[str]) -> Set[str]:
+        """Every note with an edge to one of the keys."""
+        result: Set[str] = set()
+        for key in keys:
+            result.update(self.reverse.get(key, ()))
+        return result
+
+
+class NoteGraph(DependencyIndex):
+    """Links between notes, keyed by their vault-relative source paths.
+
+    `dirty` is set whenever an edge changes so the data file is only
+    rewritten then.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.dirty = False
+
+    def set_links(self, source: str, targets: Iterable[str]):
+        """Replace the notes one note links to; self-links are ignored."""
+        if self.set_edges(source, targets):
+            self.dirty = True
+
+    def remove(self, source: str):
+        self.set_links(source, ())
+
+    def backlinks(self, source: str) -> Set[str]:
+        return self.reverse.get(source, set())
+
+    def to_data(self, notes: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Hugo data keyed by output path (a page's .File.Path).
+
+        `notes` maps source paths to {output, title, permalink}; edges to
+        notes missing from it are left out.
+        """
+        def outputs(sources: Iterable[str]) -> List[str]:
+            return sorted(notes[s]['output'] for s in sources if s in notes)
+
+        data = {}
+        for source, note in notes.items():
+            data[note['output']] = {
+                'title': note.get('title') or '',
+                'url': note.get('permalink') or '',
+                'links': outputs(self.forward.get(source, ())),
+                'backlinks': outputs(self.reverse.get(source, ())),
+            }
+        return data
+
+    def write(self, path: Path, notes: Dict[str, Dict[str, Any]]) -> bool:
+        """Write the data file if its content changed and clear the dirty flag."""
+        data = json.dumps(self.to_data(notes), ensure_ascii=False, indent=1, sort_keys=True)
+        written = write_if_changed(path, data)
+        self.dirty = False
+        return written
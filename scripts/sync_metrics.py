@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing and throughput counters for the Obsidian to Hugo synchronizer
+
+sync_note times each step of converting a note (read, frontmatter split,
+link index update, Markdown conversion, frontmatter generation, YAML dump,
+write) into a NoteTimings, which travels back from worker processes inside
+the NoteResult. SyncMetrics adds those up per stage, keeps the N slowest
+notes and times the phases of a run (planning, moves, conversion,
+finishing), so `--metrics-json` can be compared between runs.
+"""
+
+import time
+import heapq
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+# Number of notes listed as the slowest of a run.
+SLOWEST_NOTES = 10
+
+
+@dataclass
+class NoteTimings:
+    """Seconds and bytes per stage, for one note or added up for a run."""
+    seconds: Dict[str, float] = field(default_factory=dict)
+    bytes: Dict[str, int] = field(default_factory=dict)
+    calls: Dict[str, int] = field(default_factory=dict)
+
+    @contextmanager
+    def stage(self, name: str, nbytes: int = 0) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+            self.calls[name] = self.calls.get(name, 0) + 1
+            if nbytes:
+                self.add_bytes(name, nbytes)
+
+    def add_bytes(self, name: str, nbytes: int):
+        self.bytes[name] = self.bytes.get(name, 0) + nbytes
+
+    def merge(self, other: 'NoteTimings'):
+        for name, seconds in other.seconds.items():
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        for name, calls in other.calls.items():
+            self.calls[name] = self.calls.get(name, 0) + calls
+        for name, nbytes in other.bytes.items():
+            self.add_bytes(name, nbytes)
+
+    @property
+    def total(self) -> float:
+        return sum(self.seconds.values())
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for name in self.seconds:
+            seconds = self.seconds[name]
+            nbytes = self.bytes.get(name, 0)
+            result[name] = {
+                'seconds': round(seconds, 6),
+                'calls': self.calls.get(name, 0),
+                'bytes': nbytes,
+                'mb_per_s': round(nbytes / seconds / 1e6, 3) if nbytes and seconds > 0 else None,
+            }
+        return result
+
+
+class SyncMetrics:
+    """Counters for one sync run."""
+
+    def __init__(self, slowest: int = SLOWEST_NOTES):
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.stages = NoteTimings()
+        self.phases = NoteTimings()
+        self.slowest_count = slowest
+        self._slowest: List[Tuple[float, str, Dict[str, float]]] = []
+
+    def stage(self, name: str, nbytes: int = 0):
+        """Time a stage that runs in this process, e.g. reading during the scan."""
+        return self.stages.stage(name, nbytes)
+
+    def phase(self, name: str):
+        """Time a phase of the run, wall clock including worker time."""
+        return self.phases.stage(name)
+
+    def add_note(self, source: str, timings: Optional[NoteTimings]):
+        """Add the stage timings sync_note recorded for one note."""
+        if timings is None:
+            return
+        self.stages.merge(timings)
+        entry = (timings.total, source, dict(timings.seconds))
+        if len(self._slowest) < self.slowest_count:
+            heapq.heappush(self._slowest, entry)
+        elif self.slowest_count:
+            heapq.heappushpop(self._slowest, entry)
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def wall_seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def slowest(self) -> List[Tuple[float, str, Dict[str, float]]]:
+        return sorted(self._slowest, key=lambda entry: (-entry[0], entry[1]))
+
+    def to_dict(self, stats: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """JSON-ready metrics; stage seconds are summed over all workers."""
+        return {
+            'wall_seconds': round(self.wall_seconds, 6),
+            'stats': dict(stats or {}),
+            'phases': self.phases.to_dict(),
+            'stages': self.stages.to_dict(),
+            'slowest': [
+                {'source': source, 'seconds': round(total, 6),
+                 'stages': {name: round(seconds, 6) for name, seconds in stages.items()}}
+                for total, source, stages in self.slowest()
+            ],
+        }
+
+    def summary(self) -> str:
+        """One line per stage, slowest first, for the log."""
+        parts = []
+        for name, seconds in sorted(self.stages.seconds.items(), key=lambda item: -item[1]):
+            nbytes = self.stages.bytes.get(name, 0)
+            rate = f", {nbytes / seconds / 1e6:.1f} MB/s" if nbytes and seconds > 0 else ''
+            parts.append(f"{name} {seconds:.3f}s{rate}")
+        return f"Stage times ({self.wall_seconds:.3f}s wall): " + ('; '.join(parts) or 'none')
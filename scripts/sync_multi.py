@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Syncing several vault folders to several Hugo sites in one run
+
+Each target is a vault folder and a Hugo content dir with its own
+SyncConfig, e.g. the main vault for the blog and the reading-notes folder
+inside it for a notes section. MultiVaultSynchronizer runs them together:
+
+- Targets whose vaults nest are walked once from the outermost folder,
+  each getting its share of the walk with its own exclude patterns.
+- A note that several targets sync is read from disk once (SharedReads).
+- All targets convert in one worker pool and share one I/O engine.
+- Their records go to sections of one manifest file.
+
+Targets are listed under `targets:` in sync_config.yaml; see
+SyncConfig.targets_from_yaml.
+"""
+
+import os
+import logging
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from obsidian_sync import (ObsidianHugoSynchronizer, SyncConfig, SyncPlan, VaultFile, ExcludeMatcher,
+                           walk_vault, _init_sync_worker)
+from sync_io import AsyncIOEngine, SharedReads
+from sync_metrics import SyncMetrics
+
+
+# What a target sees of a shared walk: ('file', VaultFile), ('excluded', source)
+# or ('placeholder', source), in walk order
+WalkEvent = Tuple[str, object]
+
+
+def _relative(prefix: str, source: str) -> Optional[str]:
+    """`source` relative to a target folder `prefix` of the walk root, None if outside it."""
+    if not prefix:
+        return source
+    if source == prefix:
+        return ''
+    if source.startswith(prefix + '/'):
+        return source[len(prefix) + 1:]
+    return None
+
+
+class _UnionMatcher:
+    """Excludes a path from a shared walk only when every target excludes it.
+
+    Targets are (prefix, matcher) pairs, the prefix being the target's
+    vault folder relative to the walk root. A directory above a target's
+    folder is always entered.
+    """
+
+    def __init__(self, targets: List[Tuple[str, ExcludeMatcher]]):
+        self.targets = targets
+
+    def matches(self, source: str) -> bool:
+        for prefix, matcher in self.targets:
+            relative = _relative(prefix, source)
+            if relative is not None and not matcher.matches(relative):
+                return False
+        return True
+
+    def matches_dir(self, source: str) -> bool:
+        for prefix, matcher in self.targets:
+            if prefix.startswith(source + '/'):
+                return False
+            relative = _relative(prefix, source)
+            if relative is not None and (not relative or not matcher.matches_dir(relative)):
+                return False
+        return True
+
+
+class MultiVaultSynchronizer:
+    """Sync several targets with one walk per vault tree, one pool and one manifest."""
+
+    def __init__(self, configs: List[SyncConfig]):
+        self.logger = logging.getLogger(__name__)
+        self.synchronizers: Dict[str, ObsidianHugoSynchronizer] = {}
+        for index, config in enumerate(configs):
+            name = config.manifest_scope or f"target-{index + 1}"
+            if name in self.synchronizers:
+                raise ValueError(f"Duplicate sync target name: {name}")
+            config.manifest_scope = name
+            self.synchronizers[name] = ObsidianHugoSynchronizer(config)
+
+        concurrency = max(config.io_concurrency for config in configs)
+        self.io = AsyncIOEngine(concurrency) if concurrency > 1 else None
+        for synchronizer in self.synchronizers.values():
+            if synchronizer.config.io_concurrency > 1:
+                synchronizer.io = self.io
+
+    def _walk_groups(self) -> List[Tuple[str, Dict[str, str]]]:
+        """Targets grouped under the outermost vault folder containing them.
+
+        Returns (walk root, {target name: folder relative to the root}).
+        """
+        vaults = sorted(((os.path.abspath(synchronizer.config.obsidian_vault_path), name)
+                         for name, synchronizer in self.synchronizers.items()),
+                        key=lambda vault: (len(vault[0]), vault[1]))
+        groups: List[Tuple[str, Dict[str, str]]] = []
+        for vault, name in vaults:
+            for root, members in groups:
+                if vault == root or vault.startswith(root.rstrip(os.sep) + os.sep):
+                    members[name] = '' if vault == root else os.path.relpath(vault, root).replace(os.sep, '/')
+                    break
+            else:
+                groups.append((vault, {name: ''}))
+        return groups
+
+    def _shared_walk(self, root: str, members: Dict[str, str]) -> Dict[str, List[WalkEvent]]:
+        """Walk a vault tree once and split what it finds among its targets."""
+        events: Dict[str, List[WalkEvent]] = {name: [] for name in members}
+        targets = [(name, prefix, self.synchronizers[name]) for name, prefix in members.items()]
+        # (target, folder) -> the folder's outermost excluded ancestor, or ''
+        excluded_dirs: Dict[Tuple[str, str], str] = {}
+
+        def excluded_ancestor(name: str, matcher: ExcludeMatcher, folder: str) -> str:
+            """A folder one target excludes while others still need the walk to enter it."""
+            if not folder:
+                return ''
+            key = (name, folder)
+            if key not in excluded_dirs:
+                parent = excluded_ancestor(name, matcher, folder.rpartition('/')[0])
+                excluded_dirs[key] = parent or (folder if matcher.matches_dir(folder) else '')
+                if excluded_dirs[key] == folder:
+                    events[name].append(('excluded', folder + '/'))
+            return excluded_dirs[key]
+
+        def dispatch(source: str, kind: str, item: Optional[VaultFile] = None):
+            directory = source.endswith('/')
+            for name, prefix, synchronizer in targets:
+                relative = _relative(prefix, source.rstrip('/'))
+                if not relative:
+                    continue
+                matcher = synchronizer.exclude_matcher
+                folder = relative.rpartition('/')[0]
+                if excluded_ancestor(name, matcher, folder):
+                    continue
+                if kind != 'placeholder' and (matcher.matches_dir(relative) if directory
+                                              else matcher.matches(relative)):
+                    events[name].append(('excluded', relative + '/' if directory else relative))
+                elif kind == 'file':
+                    path = Path(synchronizer.config.obsidian_vault_path) / relative
+                    events[name].append(('file', VaultFile(path, relative, item.stat)))
+                elif kind == 'placeholder' and not matcher.matches(relative):
+                    events[name].append(('placeholder', relative))
+
+        matcher = _UnionMatcher([(prefix, self.synchronizers[name].exclude_matcher)
+                                 for name, prefix in members.items()])
+        for item in walk_vault(Path(root), matcher,
+                               on_excluded=lambda source: dispatch(source, 'excluded'),
+                               stat_many=self.io.stat if self.io else None,
+                               on_placeholder=lambda source: dispatch(source, 'placeholder')):
+            dispatch(item.source, 'file', item)
+        return events
+
+    @staticmethod
+    def _replay(events: List[WalkEvent]) -> Callable[..., Iterator[VaultFile]]:
+        """A plan_vault walk that replays a target's share of a shared walk."""
+        def walk(on_excluded, on_placeholder) -> Iterator[VaultFile]:
+            for kind, value in events:
+                if kind == 'excluded':
+                    on_excluded(value)
+                elif kind == 'placeholder':
+                    on_placeholder(value)
+                else:
+                    yield value
+        return walk
+
+    def plan(self) -> Dict[str, SyncPlan]:
+        """Plan every target, without writing anything."""
+        walks: Dict[str, Callable[..., Iterator[VaultFile]]] = {}
+        readers: Dict[str, int] = {}
+        for root, members in self._walk_groups():
+            if len(members) == 1 or not os.path.isdir(root):
+                continue
+            for name, events in self._shared_walk(root, members).items():
+                walks[name] = self._replay(events)
+                for kind, item in events:
+                    if kind == 'file':
+                        key = os.path.abspath(item.path)
+                        readers[key] = readers.get(key, 0) + 1
+
+        shared_reads = SharedReads(readers)
+        plans = {}
+        try:
+            for name, synchronizer in self.synchronizers.items():
+                synchronizer.shared_reads = shared_reads
+                plans[name] = synchronizer.plan_vault(walks.get(name))
+        finally:
+            shared_reads.clear()
+            for synchronizer in self.synchronizers.values():
+                synchronizer.shared_reads = None
+        return plans
+
+    def _start_pool(self, plans: Dict[str, SyncPlan]) -> Optional[ProcessPoolExecutor]:
+        """One worker pool for every target, if any target asks for workers and has work."""
+        workers = max(synchronizer._worker_count() for synchronizer in self.synchronizers.values())
+        if workers <= 1 or sum(len(plan.convert) for plan in plans.values()) <= 1:
+            return None
+        self.logger.info(f"Processing notes of {len(plans)} targets with {workers} worker processes")
+        targets = {name: synchronizer.worker_state() for name, synchronizer in self.synchronizers.items()
+                   if plans[name].valid}
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_sync_worker,
+                                   initargs=(targets,))
+
+    def sync(self) -> Dict[str, Dict[str, int]]:
+        """Sync every target, returning each target's stats by name."""
+        for synchronizer in self.synchronizers.values():
+            synchronizer.metrics = SyncMetrics()
+        plans = self.plan()
+        executor = self._start_pool(plans)
+        results = {}
+        try:
+            for name, synchronizer in self.synchronizers.items():
+                self.logger.info(f"Syncing target {name}: {synchronizer.config.obsidian_vault_path} -> "
+                                 f"{synchronizer.config.hugo_content_path}")
+                synchronizer.executor = executor
+                results[name] = synchronizer.execute(plans[name])
+        finally:
+            for synchronizer in self.synchronizers.values():
+                synchronizer.executor = None
+            if executor is not None:
+                executor.shutdown()
+        return results
+
+    def close(self):
+        if self.io is not None:
+            self.io.close()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Note transclusion for `![[note]]`, `![[note#heading]]` and `![[note#^block]]`
+
+Obsidian shows an embedded note inline: the whole note, the section under
+one heading or one block marked with `^id`. The synchronizer expands these
+embeds into the embedding note's output instead of treating them as
+images. Expanded fragments are kept in a TransclusionCache for one sync
+run, so a glossary embedded in hundreds of notes is read and converted
+once. Each fragment carries the dependency keys of everything it was
+rendered from, nested embeds included, so the notes embedding it are
+re-rendered when any of them changes.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from sync_links import HEADING_RE, heading_slug, next_fence
+
+
+_BLOCK_ID_RE = re.compile(r'(?:^|\s)\^([A-Za-z0-9-]+)[ \t]*$')
+_LIST_ITEM_RE = re.compile(r'^\s*(?:[-*+]|\d+[.)])\s')
+
+
+def fragment_key(fragment: str) -> str:
+    """Normalised embed fragment: '' for the whole note, '^id' or the heading's slug."""
+    fragment = fragment.strip()
+    if not fragment or fragment.startswith('^'):
+        return fragment
+    # Nested heading paths (Note#H1#H2) name their last heading
+    return heading_slug(fragment.split('#')[-1])
+
+
+def embed_section(body: str, key: str) -> Optional[str]:
+    """The part of a note body a fragment_key() names, None if it is missing.
+
+    A heading's section runs up to the next heading of the same or a
+    higher level; a block is the paragraph or list item carrying the id.
+    Headings and block ids inside fenced code do not count.
+    """
+    if not key:
+        return body.strip('\n')
+    lines = body.split('\n')
+    code = _code_lines(lines)
+    if key.startswith('^'):
+        return _block(lines, code, key[1:])
+
+    start = level = None
+    for index, line in enumerate(lines):
+        match = None if code[index] else HEADING_RE.match(line)
+        if match is None:
+            continue
+        if start is None:
+            if heading_slug(match.group(2)) == key:
+                start, level = index, len(match.group(1))
+        elif len(match.group(1)) <= level:
+            return '\n'.join(lines[start:index]).strip('\n')
+    if start is None:
+        return None
+    return '\n'.join(lines[start:]).strip('\n')
+
+
+def _code_lines(lines: List[str]) -> List[bool]:
+    """Whether each line belongs to a fenced code block, fences included."""
+    flags = []
+    fence = None
+    for line in lines:
+        after = next_fence(line, fence)
+        flags.append(fence is not None or after is not None)
+        fence = after
+    return flags
+
+
+def _block(lines: List[str], code: List[bool], block_id: str) -> Optional[str]:
+    for index, line in enumerate(lines):
+        if code[index]:
+            continue
+        match = _BLOCK_ID_RE.search(line)
+        if match is None or match.group(1) != block_id:
+            continue
+        if not line[:match.start()].strip():
+            # An id on its own line marks the block above it, e.g. a table
+            end, last = index, index - 1
+        elif _LIST_ITEM_RE.match(line):
+            return line[:match.start()].rstrip()
+        else:
+            end, last = index + 1, index
+        first = last
+        while first > 0 and lines[first - 1].strip() and not code[first - 1]:
+            first -= 1
+        block = lines[first:end]
+        if last == index:
+            block[-1] = line[:match.start()].rstrip()
+        return '\n'.join(block)
+    return None
+
+
+@dataclass(frozen=True)
+class Fragment:
+    """An expanded embed and what it was rendered from.
+
+    `keys` are the (source, fragment_key) expansions it contains, its own
+    included, and `height` how many levels of embeds it spans.
+    """
+    text: str
+    deps: FrozenSet[str]
+    keys: FrozenSet[Tuple[str, str]]
+    height: int
+
+
+class TransclusionCache:
+    """Notes and fragments expanded during one sync run.
+
+    `notes` holds each embedded note's parsed (frontmatter, body), so
+    embedding several sections of one note reads it once; `fragments`
+    holds complete expansions by (source, fragment_key).
+    """
+
+    def __init__(self):
+        self.notes: Dict[str, Tuple[Dict, str]] = {}
+        self.fragments: Dict[Tuple[str, str], Fragment] = {}
+        self.hits = 0
+
+    def get(self, key: Tuple[str, str], stack: Tuple[Tuple[str, str], ...],
+            max_depth: int) -> Optional[Fragment]:
+        """The memoized fragment, if expanding it inside `stack` would give the same text.
+
+        It would not when one of its embeds repeats an expansion in
+        progress or would nest deeper than `max_depth`, so the output
+        never depends on which note happened to expand it first.
+        """
+        fragment = self.fragments.get(key)
+        if fragment is None or len(stack) + fragment.height - 1 > max_depth \
+                or not fragment.keys.isdisjoint(stack):
+            return None
+        self.hits += 1
+        return fragment
+
+    def add(self, key: Tuple[str, str], fragment: Fragment):
+        self.fragments[key] = fragment
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Watch mode for the Obsidian to Hugo synchronizer
+
+Keeps one ObsidianHugoSynchronizer alive, waits for changes in the vault
+and re-syncs only the affected notes. Uses inotify on Linux and falls back
+to polling elsewhere. Bursts of Obsidian autosaves are debounced into one
+batch.
+"""
+
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+               | IN_DELETE | IN_DELETE_SELF)
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _is_hidden_dir(name: str) -> bool:
+    """Hidden directories (.obsidian, .trash, .git) never hold publishable notes."""
+    return name.startswith('.')
+
+
+class _DirFilter:
+    """Decide which vault directories are worth watching."""
+
+    def __init__(self, vault_path: Path, matcher=None):
+        self.vault_path = str(vault_path)
+        self.matcher = matcher
+
+    def ignored(self, directory: str) -> bool:
+        if _is_hidden_dir(os.path.basename(directory)):
+            return True
+        if self.matcher is None:
+            return False
+        relative = os.path.relpath(directory, self.vault_path).replace(os.sep, '/')
+        return relative != '.' and self.matcher.matches_dir(relative)
+
+
+class PollingWatcher:
+    """Detect vault changes by comparing (mtime, size) snapshots."""
+
+    def __init__(self, vault_path: Path, interval: float = 1.0, matcher=None):
+        self.vault_path = Path(vault_path)
+        self.interval = interval
+        self.dir_filter = _DirFilter(self.vault_path, matcher)
+        self.snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for root, dirs, files in os.walk(self.vault_path):
+            dirs[:] = [d for d in dirs if not self.dir_filter.ignored(os.path.join(root, d))]
+            for name in files:
+                if not name.endswith('.md'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def wait(self, timeout: Optional[float]) -> Optional[Set[Path]]:
+        """Return the paths changed since the last call, or an empty set on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {
+                Path(path) for path in current.keys() | self.snapshot.keys()
+                if current.get(path) != self.snapshot.get(path)
+            }
+            self.snapshot = current
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            sleep_for = self.interval
+            if deadline is not None:
+                sleep_for = min(sleep_for, max(0.0, deadline - time.monotonic()))
+            time.sleep(sleep_for)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Recursive inotify watcher built on libc through ctypes."""
+
+    def __init__(self, vault_path: Path, matcher=None):
+        self.vault_path = Path(vault_path)
+        self.dir_filter = _DirFilter(self.vault_path, matcher)
+        self.logger = logging.getLogger(__name__)
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError(errno.ENOSYS, "libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.watches: Dict[int, Path] = {}
+        self._add_tree(self.vault_path)
+
+    def _add_watch(self, directory: Path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            self.logger.warning(f"Cannot watch {directory}: {os.strerror(err)}")
+            return
+        self.watches[wd] = directory
+
+    def _add_tree(self, directory: Path):
+        for root, dirs, _ in os.walk(directory):
+            dirs[:] = [d for d in dirs if not self.dir_filter.ignored(os.path.join(root, d))]
+            self._add_watch(Path(root))
+
+    def wait(self, timeout: Optional[float]) -> Optional[Set[Path]]:
+        """Return changed paths, an empty set on timeout, or None after a queue overflow."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed: Set[Path] = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + name_len].rstrip(b'\0')
+                offset += name_len
+
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+                    continue
+                directory = self.watches.get(wd)
+                if directory is None or not name:
+                    continue
+                path = directory / os.fsdecode(name)
+
+                if mask & IN_ISDIR:
+                    if self.dir_filter.ignored(str(path)):
+                        continue
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self._add_tree(path)
+                    changed.add(path)
+                elif path.suffix == '.md':
+                    changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def create_watcher(vault_path: Path, poll_interval: float = 1.0, matcher=None):
+    """Prefer inotify, fall back to polling where it is unavailable.
+
+    `matcher` is the synchronizer's ExcludeMatcher; excluded directories
+    are not watched at all.
+    """
+    logger = logging.getLogger(__name__)
+    try:
+        watcher = InotifyWatcher(vault_path, matcher)
+        logger.info("Watching vault with inotify")
+        return watcher
+    except (OSError, AttributeError) as e:
+        logger.info(f"inotify unavailable ({e}), polling every {poll_interval}s")
+        return PollingWatcher(vault_path, poll_interval, matcher)
+
+
+def watch_vault(synchronizer: 'ObsidianHugoSynchronizer',
+                debounce: float = 0.3,
+                poll_interval: float = 1.0):
+    """Run an initial sync, then re-sync debounced batches of changes until interrupted."""
+    logger = logging.getLogger(__name__)
+    vault_path = Path(synchronizer.config.obsidian_vault_path)
+
+    synchronizer.sync_vault()
+    watcher = create_watcher(vault_path, poll_interval, synchronizer.exclude_matcher)
+    logger.info(f"Watching {vault_path} for changes (Ctrl+C to stop)")
+
+    try:
+        while True:
+            # Poll while iCloud downloads requested by the synchronizer are pending
+            batch = watcher.wait(poll_interval if synchronizer.awaiting_downloads() else None)
+            if batch is not None and not batch:
+                stats = synchronizer.sync_downloaded()
+                if stats['processed']:
+                    logger.info(f"Synced {stats['processed']} notes downloaded from iCloud")
+                continue
+            # Keep collecting until the vault has been quiet for `debounce` seconds
+            while batch is not None:
+                more = watcher.wait(debounce)
+                if more is None:
+                    batch = None
+                elif not more:
+                    break
+                else:
+                    batch |= more
+
+            started = time.monotonic()
+            if batch is None:
+                logger.warning("Watcher lost events, re-syncing the whole vault")
+                stats = synchronizer.sync_vault()
+            elif batch:
+                stats = synchronizer.sync_paths(batch)
+            else:
+                continue
+            elapsed = time.monotonic() - started
+            logger.info(f"Batch synced in {elapsed:.3f}s. Processed: {stats['processed']}, "
+                        f"Unchanged: {stats['unchanged']}, Errors: {stats['errors']}")
+    except KeyboardInterrupt:
+        logger.info("Stopping watch mode")
+    finally:
+        watcher.close()
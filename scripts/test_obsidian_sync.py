@@ -12,7 +12,7 @@ import sys
 # Add the parent directory to the path to import our module
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from obsidian_sync import ObsidianHugoSynchronizer, SyncConfig
+from obsidian_sync import ObsidianHugoSynchronizer, ObsidianParser, SyncConfig
 
 
 def create_test_obsidian_file(file_path: Path, content: str):
@@ -136,7 +136,7 @@ categories: ["技术"]
 
                 # Check for frontmatter
                 has_frontmatter = content.startswith('---')
-                print(f"  Frontmatter生成: {'✓' if has_frontmatter_links else '✗'}")
+                print(f"  Frontmatter生成: {'✓' if has_frontmatter else '✗'}")
 
                 # Check for comment removal
                 has_comments = "%%这是一个注释%%" in content
@@ -145,6 +145,1008 @@ categories: ["技术"]
         return stats
 
 
+def test_incremental_sync_skips_unchanged_notes():
+    """A second sync only re-processes notes that changed since the first."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        hugo_content = temp_path / "hugo_content"
+
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A\n\n正文 A\n")
+        create_test_obsidian_file(obsidian_vault / "b.md", "# B\n\n正文 B\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(hugo_content),
+        )
+
+        stats = ObsidianHugoSynchronizer(config).sync_vault()
+        assert stats['processed'] == 2
+        assert Path(config.manifest_path).exists()
+
+        stats = ObsidianHugoSynchronizer(config).sync_vault()
+        assert stats['processed'] == 0
+        assert stats['unchanged'] == 2
+
+        create_test_obsidian_file(obsidian_vault / "b.md", "# B\n\n新的正文 B\n")
+        stats = ObsidianHugoSynchronizer(config).sync_vault()
+        assert stats['processed'] == 1
+        assert stats['unchanged'] == 1
+
+        # A config change invalidates every entry
+        config.default_author = "someone-else"
+        stats = ObsidianHugoSynchronizer(config).sync_vault()
+        assert stats['processed'] == 2
+
+
+def test_parallel_sync_matches_serial():
+    """--jobs N produces the same files and counts as a serial run."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        for i in range(6):
+            create_test_obsidian_file(obsidian_vault / f"note{i}.md",
+                                      f"---\ntags: [t{i}]\n---\n# Note {i}\n\n见 [[note{i + 1}]]\n")
+
+        outputs = {}
+        for jobs in (1, 2):
+            hugo_content = temp_path / f"hugo_{jobs}"
+            config = SyncConfig(
+                obsidian_vault_path=str(obsidian_vault),
+                hugo_content_path=str(hugo_content),
+                jobs=jobs,
+            )
+            stats = ObsidianHugoSynchronizer(config).sync_vault()
+            assert stats['processed'] == 6
+            assert stats['errors'] == 0
+            outputs[jobs] = {
+                f.relative_to(hugo_content).as_posix(): f.read_text(encoding='utf-8')
+                for f in hugo_content.rglob("*.md")
+            }
+
+        assert outputs[1] == outputs[2]
+
+
+def test_sync_paths_only_touches_given_notes():
+    """Watch-mode batches re-sync just the reported notes."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A\n")
+        create_test_obsidian_file(obsidian_vault / "b.md", "# B\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "hugo_content"),
+        )
+        synchronizer = ObsidianHugoSynchronizer(config)
+        synchronizer.sync_vault()
+
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A2\n")
+        stats = synchronizer.sync_paths([obsidian_vault / "a.md"])
+        assert stats['processed'] == 1
+        assert stats['unchanged'] == 0
+
+        (obsidian_vault / "b.md").unlink()
+        synchronizer.sync_paths([obsidian_vault / "b.md"])
+        assert synchronizer.manifest.get("b.md") is None
+
+
+def test_transform_body_leaves_code_untouched():
+    """Links, embeds, comments and tags are handled outside code only."""
+    parser = ObsidianParser(SyncConfig(obsidian_vault_path="vault", hugo_content_path="content"))
+    body = """正文 #标签 [[笔记|别名]] ![[图片.png]] %%注释%% `#inline %%`
+
+```c
+#include <stdio.h>
+%% not a comment %%
+[[not a link]]
+```
+"""
+    scan = parser.transform_body(body)
+    processed = scan.text
+
+    assert "[别名](笔记.md)" in processed
+    assert "![图片.png](图片.png)" in processed
+    assert "注释" not in processed
+    assert "`#inline %%`" in processed
+    assert "#include <stdio.h>\n%% not a comment %%\n[[not a link]]" in processed
+    assert scan.tags == ["标签"]
+    assert scan.links == ["笔记"]
+    assert scan.embeds == ["图片.png"]
+
+
+def test_parse_note_builds_document_once():
+    """NoteDocument carries title, headings and first paragraph, ignoring code and images."""
+    parser = ObsidianParser(SyncConfig(obsidian_vault_path="vault", hugo_content_path="content"))
+    document = parser.parse_note("""---
+tags: [front]
+---
+```python
+# not a heading
+```
+
+# 标题
+
+<img src="/attachments/pic.webp" alt="pic.png">
+
+第一段 #内容标签
+
+## 小节
+""", fallback_title="fallback")
+
+    assert document.title == "标题"
+    assert document.headings == [(1, "标题"), (2, "小节")]
+    assert document.first_paragraph == "第一段 #内容标签"
+    assert document.tags == ["内容标签"]
+    assert document.frontmatter == {"tags": ["front"]}
+
+
+def test_outline_is_worked_out_once_per_note(monkeypatch):
+    """The scan's headings and first paragraph are reused when the note is rendered."""
+    import obsidian_sync
+    calls = []
+    outline = obsidian_sync._outline
+    monkeypatch.setattr(obsidian_sync, '_outline', lambda text: calls.append(text) or outline(text))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        for name in ("a", "b", "c"):
+            create_test_obsidian_file(obsidian_vault / f"{name}.md", f"# {name}\n\n正文\n")
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "hugo_content"),
+        )
+        stats = ObsidianHugoSynchronizer(config).sync_vault()
+        assert stats['processed'] == 3 and len(calls) == 3
+
+
+def test_walker_prunes_excluded_directories():
+    """Default exclusions apply at the vault root and prune whole directories."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "keep.md", "# Keep\n")
+        create_test_obsidian_file(obsidian_vault / "nested" / "keep2.md", "# Keep 2\n")
+        create_test_obsidian_file(obsidian_vault / ".obsidian" / "plugin.md", "# Plugin\n")
+        create_test_obsidian_file(obsidian_vault / "nested" / "_templates" / "t.md", "# T\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "hugo_content"),
+        )
+        synchronizer = ObsidianHugoSynchronizer(config)
+        stats = synchronizer.sync_vault()
+        assert stats['processed'] == 2
+        assert stats['skipped'] == 2
+        assert sorted(synchronizer.manifest.entries) == ["keep.md", "nested/keep2.md"]
+
+
+def test_exclude_patterns_keep_their_own_flags_and_depth():
+    """Patterns with inline flags or groups work, and anchored ones do not prune subfolders."""
+    from obsidian_sync import ExcludeMatcher
+    matcher = ExcludeMatcher([r"(?i).*draft.*", r"(\w)\1\.md$", r"old/[^/]*$"])
+    assert matcher.matches("My Draft.md") and matcher.matches("aa.md")
+    assert not matcher.matches("ab.md")
+    assert matcher.matches("old/a.md") and not matcher.matches("old/sub/a.md")
+    assert not matcher.matches_dir("old") and matcher.matches_dir("Drafts")
+    try:
+        ExcludeMatcher(["notes/("])
+    except ValueError as e:
+        assert "notes/(" in str(e)
+    else:
+        raise AssertionError("an invalid pattern was accepted")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "old" / "a.md", "# A\n")
+        create_test_obsidian_file(obsidian_vault / "old" / "sub" / "b.md", "# B\n")
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "hugo_content"),
+            exclude_patterns=[r"old/[^/]*$"],
+        )
+        synchronizer = ObsidianHugoSynchronizer(config)
+        synchronizer.sync_vault()
+        assert sorted(synchronizer.manifest.entries) == ["old/sub/b.md"]
+
+
+def test_attachments_are_stored_once_by_content():
+    """Embedded images are published under a content hash and shared between notes."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        (obsidian_vault / "assets").mkdir(parents=True)
+        (obsidian_vault / "assets" / "pic.png").write_bytes(b"\x89PNG fake image")
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A\n\n![[pic.png]]\n")
+        create_test_obsidian_file(obsidian_vault / "notes" / "b.md", "# B\n\n![[assets/pic.png|图]]\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "site" / "content"),
+            attachment_url_prefix="/attachments",
+        )
+        ObsidianHugoSynchronizer(config).sync_vault()
+
+        stored = list((temp_path / "site" / "static" / "attachments").rglob("*.png"))
+        assert len(stored) == 1
+        url = "/attachments/" + stored[0].relative_to(stored[0].parents[1]).as_posix()
+        outputs = [f.read_text(encoding='utf-8') for f in (temp_path / "site" / "content").rglob("*.md")]
+        assert all(url in text for text in outputs)
+        assert any(f"![图]({url})" in text for text in outputs)
+
+
+def test_attachments_outside_the_vault_or_excluded_are_not_published():
+    """Embeds cannot reach files above the vault root or in excluded folders."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        (temp_path / "secret.png").write_bytes(b"\x89PNG outside")
+        (obsidian_vault / "private").mkdir(parents=True)
+        (obsidian_vault / "private" / "hidden.png").write_bytes(b"\x89PNG excluded")
+        create_test_obsidian_file(
+            obsidian_vault / "notes" / "a.md",
+            f"# A\n\n![[../../secret.png]]\n\n![[{(temp_path / 'secret.png').as_posix()}]]\n\n"
+            "![[../private/hidden.png]]\n\n![[private/hidden.png]]\n\n![[hidden.png]]\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "site" / "content"),
+            exclude_patterns=[r".*/private/.*"],
+        )
+        stats = ObsidianHugoSynchronizer(config).sync_vault()
+        assert stats['processed'] == 1
+        assert not (temp_path / "site" / "static" / "attachments").exists()
+
+
+def test_image_embeds_carry_intrinsic_size():
+    """Image embeds are rendered with width/height from the file header and lazy loading."""
+    import struct
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        obsidian_vault.mkdir()
+        png_header = (b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR"
+                      + struct.pack(">II", 2000, 1000) + b"\x08\x02\x00\x00\x00")
+        (obsidian_vault / "photo.png").write_bytes(png_header)
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A\n\n![[photo.png|照片]]\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "site" / "content"),
+        )
+        ObsidianHugoSynchronizer(config).sync_vault()
+
+        output = next((temp_path / "site" / "content").rglob("*.md")).read_text(encoding='utf-8')
+        assert 'alt="照片"' in output
+        assert 'width="2000" height="1000"' in output
+        assert 'loading="lazy"' in output
+
+
+def test_failed_image_variants_are_left_out():
+    """A variant that fails to render is dropped from the srcset, never aliased to the original."""
+    import struct
+    import sync_images
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        obsidian_vault.mkdir()
+        png_header = (b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR"
+                      + struct.pack(">II", 2000, 1000) + b"\x08\x02\x00\x00\x00")
+        (obsidian_vault / "photo.png").write_bytes(png_header)
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A\n\n![[photo.png]]\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "site" / "content"),
+            image_jobs=1,
+        )
+        image, render_variant = sync_images.Image, sync_images._render_variant
+        sync_images.Image = object()
+        sync_images._render_variant = lambda job: "OSError: cannot identify image file"
+        try:
+            ObsidianHugoSynchronizer(config).sync_vault()
+        finally:
+            sync_images.Image, sync_images._render_variant = image, render_variant
+
+        output = next((temp_path / "site" / "content").rglob("*.md")).read_text(encoding='utf-8')
+        assert 'srcset' not in output
+        assert 'width="2000" height="1000"' in output
+        assert not list((temp_path / "site" / "static" / "attachments").rglob("*w-*"))
+
+
+def test_wikilinks_resolve_to_hugo_permalinks():
+    """Wikilinks point at the notes' Hugo URLs, headings at their anchors."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "Target Note.md", "# Target\n\n## Some Section!\n")
+        create_test_obsidian_file(obsidian_vault / "sub" / "other.md",
+                                  "---\naliases: [别名]\n---\n# Other\n")
+        create_test_obsidian_file(obsidian_vault / "a.md",
+                                  "# A\n\n[[Target Note]] [[target note#Some Section|节]] "
+                                  "[[别名]] [[#A]] [[Missing]]\n")
+        for path in obsidian_vault.rglob("*.md"):
+            os.utime(path, (1735732800, 1735732800))  # 2025-01-01
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "hugo_content"),
+            site_base_path="/blog",
+        )
+        synchronizer = ObsidianHugoSynchronizer(config)
+        stats = synchronizer.sync_vault()
+        assert stats['unresolved_links'] == 1
+
+        output = temp_path / "hugo_content" / "posts" / "2025" / "a.md"
+        text = output.read_text(encoding='utf-8')
+        assert "[Target Note](/blog/posts/2025/target-note/)" in text
+        assert "[节](/blog/posts/2025/target-note/#some-section)" in text
+        assert "[别名](/blog/posts/2025/other/)" in text
+        assert "[A](#a)" in text
+        assert "Missing" in text and "Missing.md" not in text
+
+        # An incremental batch resolves against the notes it did not touch
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A\n\n[[other]]\n")
+        os.utime(obsidian_vault / "a.md", (1735732900, 1735732900))
+        synchronizer.sync_paths([obsidian_vault / "a.md"])
+        assert "[other](/blog/posts/2025/other/)" in output.read_text(encoding='utf-8')
+
+
+def test_backlinks_data_follows_changed_notes():
+    """data/backlinks.json lists each note's links and backlinks by output path."""
+    import json
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A\n\n[[b]] [[c]]\n")
+        create_test_obsidian_file(obsidian_vault / "b.md", "# B\n")
+        create_test_obsidian_file(obsidian_vault / "c.md", "# C\n\n[[b]]\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "site" / "content"),
+        )
+        synchronizer = ObsidianHugoSynchronizer(config)
+        synchronizer.sync_vault()
+
+        data_file = temp_path / "site" / "data" / "backlinks.json"
+        outputs = {source: entry['output'] for source, entry in synchronizer.manifest.entries.items()}
+        data = json.loads(data_file.read_text(encoding='utf-8'))
+        assert data[outputs["b.md"]]['backlinks'] == sorted([outputs["a.md"], outputs["c.md"]])
+        assert data[outputs["a.md"]]['links'] == sorted([outputs["b.md"], outputs["c.md"]])
+        assert data[outputs["b.md"]]['title'] == "B"
+
+        create_test_obsidian_file(obsidian_vault / "c.md", "# C\n")
+        synchronizer.sync_paths([obsidian_vault / "c.md"])
+        data = json.loads(data_file.read_text(encoding='utf-8'))
+        assert data[outputs["b.md"]]['backlinks'] == [outputs["a.md"]]
+
+
+def test_changed_link_targets_rerender_dependents_only():
+    """Notes linking to a changed URL, a new note or a changed file are re-rendered."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A\n\n[[b]] [[later]]\n")
+        create_test_obsidian_file(obsidian_vault / "b.md", "# B\n")
+        create_test_obsidian_file(obsidian_vault / "c.md", "# C\n\n![[pic.gif]]\n")
+        create_test_obsidian_file(obsidian_vault / "d.md", "# D\n")
+        (obsidian_vault / "pic.gif").write_bytes(b"GIF89a\x01\x00\x01\x00")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "site" / "content"),
+        )
+        synchronizer = ObsidianHugoSynchronizer(config)
+        synchronizer.sync_vault()
+        output_a = temp_path / "site" / "content" / synchronizer.manifest.get("a.md")['output']
+
+        create_test_obsidian_file(obsidian_vault / "b.md", "---\nslug: bee\n---\n# B\n")
+        stats = synchronizer.sync_vault()
+        assert (stats['processed'], stats['invalidated']) == (2, 1)
+        assert "/bee/)" in output_a.read_text(encoding='utf-8')
+
+        create_test_obsidian_file(obsidian_vault / "later.md", "# Later\n")
+        stats = synchronizer.sync_paths([obsidian_vault / "later.md"])
+        assert (stats['processed'], stats['invalidated']) == (2, 1)
+        assert "[later](" in output_a.read_text(encoding='utf-8')
+
+        (obsidian_vault / "pic.gif").write_bytes(b"GIF89a\x02\x00\x02\x00")
+        stats = synchronizer.sync_vault()
+        assert (stats['processed'], stats['invalidated']) == (1, 1)
+        assert synchronizer.manifest.get("c.md")['deps'] == ["file:pic.gif"]
+
+
+def test_renamed_note_moves_its_output():
+    """A renamed note takes over its old output; deleted notes lose theirs."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        hugo_content = temp_path / "hugo_content"
+        create_test_obsidian_file(obsidian_vault / "old name.md", "---\ntitle: 固定标题\n---\n正文\n")
+        create_test_obsidian_file(obsidian_vault / "gone.md", "# Gone\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(hugo_content),
+        )
+        synchronizer = ObsidianHugoSynchronizer(config)
+        synchronizer.sync_vault()
+        old_output = hugo_content / synchronizer.manifest.get("old name.md")['output']
+        gone_output = hugo_content / synchronizer.manifest.get("gone.md")['output']
+        inode = old_output.stat().st_ino
+
+        (obsidian_vault / "folder").mkdir()
+        (obsidian_vault / "old name.md").rename(obsidian_vault / "folder" / "new name.md")
+        (obsidian_vault / "gone.md").unlink()
+        stats = synchronizer.sync_vault()
+
+        new_output = hugo_content / synchronizer.manifest.get("folder/new name.md")['output']
+        assert stats['moved'] == 1
+        assert stats['processed'] == 0
+        assert new_output.name == "new-name.md"
+        assert new_output.stat().st_ino == inode
+        assert not old_output.exists()
+        assert not gone_output.exists()
+
+
+def test_notes_swapping_outputs_keep_both_files():
+    """An output left by one note but taken over by another in the same run is not deleted."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        hugo_content = temp_path / "hugo_content"
+        create_test_obsidian_file(obsidian_vault / "a.md", "---\ntitle: X\n---\nA\n")
+        create_test_obsidian_file(obsidian_vault / "b.md", "---\ntitle: Y\n---\nB\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(hugo_content),
+            organize_by_year=False,
+            filename_format="{title}",
+        )
+        ObsidianHugoSynchronizer(config).sync_vault()
+        create_test_obsidian_file(obsidian_vault / "a.md", "---\ntitle: Y\n---\nA2\n")
+        create_test_obsidian_file(obsidian_vault / "b.md", "---\ntitle: X\n---\nB2\n")
+        ObsidianHugoSynchronizer(config).sync_vault()
+
+        assert "A2" in (hugo_content / "posts" / "Y.md").read_text(encoding='utf-8')
+        assert "B2" in (hugo_content / "posts" / "X.md").read_text(encoding='utf-8')
+
+
+def test_dry_run_plan_writes_nothing_until_executed():
+    """A plan lists every action with a reason and only execute() touches the site."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        hugo_content = temp_path / "hugo_content"
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A\n\n[[b]]\n")
+        create_test_obsidian_file(obsidian_vault / "b.md", "---\ntitle: B\n---\n正文\n")
+        create_test_obsidian_file(obsidian_vault / "gone.md", "# Gone\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(hugo_content),
+        )
+        synchronizer = ObsidianHugoSynchronizer(config)
+        plan = synchronizer.plan_vault()
+        assert [(c.action, c.source) for c in plan.changes] == \
+            [('create', 'a.md'), ('create', 'b.md'), ('create', 'gone.md')]
+        assert not (temp_path / ".obsidian_sync").exists()
+        assert not hugo_content.exists()
+
+        stats = synchronizer.execute(plan)
+        assert stats['processed'] == 3
+        assert len(list(hugo_content.rglob("*.md"))) == 3
+
+        (obsidian_vault / "b.md").rename(obsidian_vault / "c.md")
+        (obsidian_vault / "gone.md").unlink()
+        plan = ObsidianHugoSynchronizer(config).plan_vault()
+        actions = {(c.action, c.source, c.reason) for c in plan.changes}
+        assert ('move', 'c.md', 'renamed') in actions
+        assert ('delete', 'gone.md', 'source deleted') in actions
+        assert ('update', 'a.md', 'a note or file it depends on changed') in actions
+        assert len(list(hugo_content.rglob("*.md"))) == 3
+        assert "1 to move, 1 to delete" in plan.describe()
+
+
+def test_sync_records_stage_metrics():
+    """Stage timings come back from workers; written bytes match the outputs."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        hugo_content = temp_path / "hugo_content"
+        for i in range(4):
+            create_test_obsidian_file(obsidian_vault / f"n{i}.md", f"# Note {i}\n\n{'正文 ' * (i + 1)}\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(hugo_content),
+            jobs=2,
+        )
+        synchronizer = ObsidianHugoSynchronizer(config)
+        stats = synchronizer.sync_vault()
+        metrics = synchronizer.metrics.to_dict(stats)
+
+        assert metrics['stats']['processed'] == 4
+        for stage in ('scan_read', 'hash', 'frontmatter', 'convert', 'generate', 'dump', 'write'):
+            assert stage in metrics['stages']
+        assert metrics['stages']['write']['bytes'] == \
+            sum(path.stat().st_size for path in hugo_content.rglob("*.md"))
+        assert {entry['source'] for entry in metrics['slowest']} == {f"n{i}.md" for i in range(4)}
+        assert set(metrics['phases']) == {'plan', 'moves', 'convert', 'finish'}
+
+
+def test_generated_vault_is_deterministic_and_syncs():
+    """The benchmark vault generator is reproducible and its vaults sync cleanly."""
+    from vault_generator import generate_vault
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        summary = generate_vault(temp_path / "a", 120, seed=7)
+        generate_vault(temp_path / "b", 120, seed=7)
+        files = sorted(p.relative_to(temp_path / "a") for p in (temp_path / "a").rglob("*.*"))
+        assert summary['notes'] == 120 and len(files) == 120 + summary['images']
+        for relative in files:
+            assert (temp_path / "a" / relative).read_bytes() == (temp_path / "b" / relative).read_bytes()
+
+        config = SyncConfig(
+            obsidian_vault_path=str(temp_path / "a"),
+            hugo_content_path=str(temp_path / "site" / "content"),
+        )
+        stats = ObsidianHugoSynchronizer(config).sync_vault()
+        assert stats['processed'] == 120
+        assert stats['errors'] == 0
+
+
+def test_io_engine_matches_serial_sync():
+    """io_concurrency overlaps stats, reads and writes without changing the output."""
+    import obsidian_sync
+    from vault_generator import generate_vault
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        generate_vault(temp_path / "vault", 60, seed=3)
+
+        outputs = {}
+        read_ahead = obsidian_sync.READ_AHEAD_BYTES
+        # No read-ahead, so conversion reads every note again through the engine
+        obsidian_sync.READ_AHEAD_BYTES = 0
+        try:
+            for io_concurrency in (0, 8):
+                hugo_content = temp_path / f"site_{io_concurrency}" / "content"
+                config = SyncConfig(
+                    obsidian_vault_path=str(temp_path / "vault"),
+                    hugo_content_path=str(hugo_content),
+                    io_concurrency=io_concurrency,
+                )
+                synchronizer = ObsidianHugoSynchronizer(config)
+                stats = synchronizer.sync_vault()
+                assert stats['processed'] == 60 and stats['errors'] == 0
+                outputs[io_concurrency] = {
+                    f.relative_to(hugo_content).as_posix(): f.read_bytes()
+                    for f in hugo_content.rglob("*.md")
+                }
+        finally:
+            obsidian_sync.READ_AHEAD_BYTES = read_ahead
+
+        assert synchronizer.io is not None
+        assert synchronizer.metrics.stages.bytes['write'] == sum(len(data) for data in outputs[8].values())
+        assert outputs[0] == outputs[8]
+
+
+def test_icloud_placeholders_are_skipped_and_picked_up_later():
+    """Undownloaded notes keep their output and sync once the download arrives."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A\n\n正文\n")
+        create_test_obsidian_file(obsidian_vault / "b.md", "# B\n\n见 [[a]]\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "hugo_content"),
+            icloud_prefetch=True,
+        )
+        synchronizer = ObsidianHugoSynchronizer(config)
+        synchronizer.sync_vault()
+        output = temp_path / "hugo_content" / synchronizer.manifest.get("a.md")['output']
+
+        # iCloud evicts a.md and leaves a stub in its place
+        (obsidian_vault / "a.md").rename(obsidian_vault / ".a.md.icloud")
+        stats = synchronizer.sync_paths([obsidian_vault / "a.md"])
+        assert stats['placeholders'] == 1
+        create_test_obsidian_file(obsidian_vault / "b.md", "# B\n\n还是见 [[a]]\n")
+        stats = synchronizer.sync_vault()
+        assert stats['placeholders'] == 1 and stats['processed'] == 1
+        assert output.exists()
+        assert synchronizer.manifest.get("a.md") is not None
+        assert synchronizer.awaiting_downloads()
+        b_output = temp_path / "hugo_content" / synchronizer.manifest.get("b.md")['output']
+        assert "[a](/posts/" in b_output.read_text(encoding='utf-8')
+
+        # The download finishes: the stub is replaced by the note, now edited
+        (obsidian_vault / ".a.md.icloud").unlink()
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A\n\n新的正文\n")
+        stats = synchronizer.sync_downloaded()
+        assert stats['processed'] == 1
+        assert not synchronizer.awaiting_downloads()
+        assert "新的正文" in output.read_text(encoding='utf-8')
+
+
+def test_config_file_drives_the_pipeline():
+    """Settings from sync_config.yaml switch stages off and reshape the output."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "a.md",
+                                  "---\ntitle: 第一篇\nmodified: 2025-10-23\n---\n"
+                                  "见 [[b]] %%注释%% #标签 以及很长的第一段文字\n")
+        create_test_obsidian_file(obsidian_vault / "b.md", "# B\n")
+        config_file = temp_path / "sync_config.yaml"
+        config_file.write_text(
+            f"obsidian_vault_path: {obsidian_vault.as_posix()}\n"
+            f"hugo_content_path: {(temp_path / 'hugo_content').as_posix()}\n"
+            "unknown_setting: 1\n"
+            "content_processing:\n  convert_wikilinks: false\n  extract_content_tags: false\n"
+            "  summary_length: 10\n"
+            "frontmatter_mapping:\n  modified: lastmod\n"
+            "file_organization:\n  organize_by_year: false\n  filename_format: \"{title}\"\n",
+            encoding='utf-8')
+
+        config = SyncConfig.from_yaml(config_file, default_author="someone")
+        assert config.default_author == "someone" and not config.convert_wikilinks
+        synchronizer = ObsidianHugoSynchronizer(config)
+        synchronizer.sync_vault()
+
+        text = (temp_path / "hugo_content" / "posts" / "第一篇.md").read_text(encoding='utf-8')
+        assert "见 [[b]]" in text and "注释" not in text
+        assert "lastmod: '2025-10-23T00:00:00+08:00'" in text and "modified:" not in text
+        assert "description: 见 [[b]]...\n" in text
+        assert "标签" not in text.split("---")[1]
+
+
+def test_nested_targets_share_walk_reads_and_manifest():
+    """A vault and a folder inside it sync together, reading shared notes once."""
+    import json
+    from sync_multi import MultiVaultSynchronizer
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A\n\n正文\n")
+        create_test_obsidian_file(obsidian_vault / "阅读笔记" / "b.md", "# B\n\n见 [[c]]\n")
+        create_test_obsidian_file(obsidian_vault / "阅读笔记" / "c.md", "# C\n")
+        create_test_obsidian_file(obsidian_vault / "阅读笔记" / "草稿" / "d.md", "# D\n")
+        config_file = temp_path / "sync_config.yaml"
+        config_file.write_text(
+            "jobs: 2\n"
+            "targets:\n"
+            f"  - name: blog\n    obsidian_vault_path: {obsidian_vault.as_posix()}\n"
+            f"    hugo_content_path: {(temp_path / 'blog' / 'content').as_posix()}\n"
+            f"  - name: notes\n    obsidian_vault_path: {(obsidian_vault / '阅读笔记').as_posix()}\n"
+            f"    hugo_content_path: {(temp_path / 'notes' / 'content').as_posix()}\n"
+            "    exclude_patterns: ['草稿/.*']\n",
+            encoding='utf-8')
+
+        configs = SyncConfig.targets_from_yaml(config_file)
+        assert [config.manifest_scope for config in configs] == ["blog", "notes"]
+        assert configs[0].manifest_path == configs[1].manifest_path
+        multi = MultiVaultSynchronizer(configs)
+        results = multi.sync()
+        assert results["blog"]["processed"] == 4
+        assert results["notes"]["processed"] == 2 and results["notes"]["skipped"] == 1
+        # The notes target got b.md and c.md from the blog target's reads
+        assert multi.synchronizers["notes"].metrics.stages.bytes.get('scan_read', 0) == 0
+        assert "[c](/posts/" in next((temp_path / "notes" / "content").rglob("b.md")).read_text(encoding='utf-8')
+
+        with open(configs[0].manifest_path, encoding='utf-8') as f:
+            scopes = json.load(f)["scopes"]
+        assert sorted(scopes["blog"]["entries"]) == ["a.md", "阅读笔记/b.md", "阅读笔记/c.md", "阅读笔记/草稿/d.md"]
+        assert sorted(scopes["notes"]["entries"]) == ["b.md", "c.md"]
+
+        results = MultiVaultSynchronizer(SyncConfig.targets_from_yaml(config_file)).sync()
+        assert results["blog"]["unchanged"] == 4 and results["notes"]["unchanged"] == 2
+
+
+def test_output_path_uses_the_note_date():
+    """The year folder and {date} come from the frontmatter date, not the file's mtime."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "a.md", "---\ncreated: 2019-05-04\n---\n# A\n")
+        os.utime(obsidian_vault / "a.md", (1735732800, 1735732800))  # 2025-01-01
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "hugo_content"),
+            filename_format="{date}-{stem}",
+        )
+        ObsidianHugoSynchronizer(config).sync_vault()
+
+        assert (temp_path / "hugo_content" / "posts" / "2019" / "2019-05-04-a.md").exists()
+
+
+def test_git_vault_uses_commit_dates_and_diffs():
+    """In a git vault, dates come from commits and later syncs only plan what git reports."""
+    import subprocess
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A\n\n正文\n")
+        create_test_obsidian_file(obsidian_vault / "b.md", "# B\n")
+
+        def git(*args, when="2025-03-01T12:00:00+00:00"):
+            env = {**os.environ, "GIT_AUTHOR_DATE": when, "GIT_COMMITTER_DATE": when,
+                   "GIT_AUTHOR_NAME": "t", "GIT_AUTHOR_EMAIL": "t@example.com",
+                   "GIT_COMMITTER_NAME": "t", "GIT_COMMITTER_EMAIL": "t@example.com"}
+            subprocess.run(["git", *args], cwd=obsidian_vault, check=True, capture_output=True, env=env)
+
+        git("init", "-q")
+        git("add", ".")
+        git("commit", "-qm", "notes")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "hugo_content"),
+            use_git=True,
+        )
+        stats = ObsidianHugoSynchronizer(config).sync_vault()
+        assert stats['processed'] == 2
+        output = next((temp_path / "hugo_content").rglob("a.md"))
+        assert "date: '2025-03-01T20:00:00+08:00'\nlastmod: '2025-03-01T20:00:00+08:00'" \
+            in output.read_text(encoding='utf-8')
+
+        # An uncommitted edit: only a.md is planned, b.md is never looked at
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A\n\n新的正文\n")
+        synchronizer = ObsidianHugoSynchronizer(config)
+        plan = synchronizer.plan_vault()
+        assert [change.source for change in plan.changes] == ["a.md"]
+        synchronizer.execute(plan)
+
+        # Committing it later moves lastmod without a content change
+        git("commit", "-qam", "edit", when="2025-04-01T12:00:00+00:00")
+        stats = ObsidianHugoSynchronizer(config).sync_vault()
+        assert stats['processed'] == 1
+        text = output.read_text(encoding='utf-8')
+        assert "date: '2025-03-01T20:00:00+08:00'" in text and "lastmod: '2025-04-01T20:00:00+08:00'" in text
+        assert ObsidianHugoSynchronizer(config).sync_vault()['processed'] == 0
+
+
+def test_written_text_keeps_platform_line_endings():
+    """Text goes to disk with os.linesep line endings, as text-mode writes did."""
+    import output_writer
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "note.md"
+        linesep = os.linesep
+        os.linesep = '\r\n'
+        try:
+            assert output_writer.write_if_changed(path, "a\nb\n")
+            assert not output_writer.write_if_changed(path, "a\nb\n")
+        finally:
+            os.linesep = linesep
+        assert path.read_bytes() == b"a\r\nb\r\n"
+
+
+def test_frontmatter_dump_does_not_depend_on_libyaml():
+    """Frontmatter is dumped by the same emitter whether or not PyYAML has libyaml."""
+    from frontmatter_codec import dump_yaml
+    assert dump_yaml({'title': '😀 表情', 'tags': ['a']}) == "title: 😀 表情\ntags:\n- a\n"
+
+
+def test_publish_filter_reads_headers_only_and_unpublishes():
+    """Private notes are skipped from their header; unpublishing deletes the output."""
+    from frontmatter_codec import read_frontmatter
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "public.md",
+                                  "---\npublish: true\n---\n# 公开\n\n见 [[private]]\n")
+        create_test_obsidian_file(obsidian_vault / "private.md", "# 私密\n\n不公开的内容\n")
+        # Saved on Windows: the header check and the full parse must agree
+        (obsidian_vault / "crlf.md").write_bytes("---\r\npublish: true\r\n---\r\n# CRLF\r\n".encode('utf-8'))
+        # The header is parsed without touching the body, which is not even UTF-8
+        big = obsidian_vault / "big.md"
+        big.write_bytes(b"---\r\npublish: false\r\n---\r\n" + b"\xff" * 100000)
+        assert read_frontmatter(big) == {'publish': False}
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "hugo_content"),
+            publish_filter='publish',
+        )
+        synchronizer = ObsidianHugoSynchronizer(config)
+        stats = synchronizer.sync_vault()
+        assert stats['processed'] == 2 and stats['skipped'] == 2 and stats['errors'] == 0
+        assert synchronizer.manifest.get("private.md") is None
+        assert synchronizer.manifest.get("crlf.md") is not None
+        output = temp_path / "hugo_content" / synchronizer.manifest.get("public.md")['output']
+        assert "不公开" not in output.read_text(encoding='utf-8')
+        assert "/private" not in output.read_text(encoding='utf-8')
+
+        create_test_obsidian_file(obsidian_vault / "public.md", "---\npublish: false\n---\n# 公开\n")
+        plan = synchronizer.plan_vault()
+        assert [(c.action, c.reason) for c in plan.changes if c.source == "public.md"] == \
+            [('skip', 'not published'), ('delete', 'unpublished')]
+        synchronizer.execute(plan)
+        assert not output.exists() and synchronizer.manifest.get("public.md") is None
+
+        # A header that does not parse may hide draft: true, so it is not published
+        create_test_obsidian_file(obsidian_vault / "broken.md", "---\ndraft: [true\n---\n# 草稿\n")
+        config.publish_filter = 'draft'
+        ObsidianHugoSynchronizer(config).sync_vault()
+        assert not list((temp_path / "hugo_content").rglob("broken.md"))
+        assert list((temp_path / "hugo_content").rglob("private.md"))
+
+
+def test_note_embeds_are_transcluded_once_per_run():
+    """![[note#section]] inlines the section, memoized, with cycles cut to links."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "术语.md",
+                                  "# 术语\n\n## Term\n\n术语的定义，见 [[a]]。\n\n"
+                                  "```\n## 代码里的标题\n```\n\n## Other\n\n其他 ^blk\n")
+        for name in ("a", "b", "c"):
+            create_test_obsidian_file(obsidian_vault / f"{name}.md",
+                                      f"# {name}\n\n![[术语#Term]]\n\n![[术语#^blk]]\n")
+        # No title of its own: the embedded note's heading must not become it
+        create_test_obsidian_file(obsidian_vault / "d.md", "![[术语]]\n\n自己的段落\n")
+        create_test_obsidian_file(obsidian_vault / "loop1.md", "# Loop1\n\n一号\n\n![[loop2]]\n")
+        create_test_obsidian_file(obsidian_vault / "loop2.md", "# Loop2\n\n二号\n\n![[loop1]]\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "hugo_content"),
+        )
+        synchronizer = ObsidianHugoSynchronizer(config)
+        stats = synchronizer.sync_vault()
+        assert stats['processed'] == 7 and stats['errors'] == 0
+        hugo_root = temp_path / "hugo_content"
+
+        def output(source):
+            return (hugo_root / synchronizer.manifest.get(source)['output']).read_text(encoding='utf-8')
+
+        text = output("a.md")
+        assert "## Term\n\n术语的定义，见 [a](/posts/" in text and "代码里的标题" in text
+        assert "\n其他\n" in text and "## Other" not in text and "![" not in text
+        # Expanded once, then reused by the other two notes
+        assert synchronizer.transclusions.hits == 4
+        # loop1 -> loop2 -> loop1 stops with a link back
+        assert "二号" in output("loop1.md") and "[loop1](/posts/" in output("loop1.md")
+        assert "title: d\n" in output("d.md") and "description: 自己的段落\n" in output("d.md")
+        assert "## Other" in output("d.md")
+
+        create_test_obsidian_file(obsidian_vault / "术语.md", "# 术语\n\n## Term\n\n新的定义\n")
+        stats = synchronizer.sync_vault()
+        assert stats['processed'] == 5
+        assert "新的定义" in output("b.md") and "\n其他\n" not in output("b.md")
+
+
+def test_embeds_of_missing_notes_become_text():
+    """![[Missing note]] is left as its text and reported, not turned into a broken image."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A\n\n![[Missing note]]\n\n![[b]]\n")
+        create_test_obsidian_file(obsidian_vault / "b.md", "# B\n\n![[Gone|别名]]\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "hugo_content"),
+        )
+        synchronizer = ObsidianHugoSynchronizer(config)
+        synchronizer.sync_vault()
+        entry = synchronizer.manifest.get("a.md")
+        text = (temp_path / "hugo_content" / entry['output']).read_text(encoding='utf-8')
+        assert "\nMissing note\n" in text and "\n别名\n" in text
+        assert "](Missing note)" not in text and "](Gone)" not in text
+        assert "Missing note" in entry['unresolved']
+
+
+def test_embeds_of_unpublished_notes_become_text():
+    """An embed of a note the publish filter skips degrades like a wikilink to it."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "public.md",
+                                  "---\npublish: true\n---\n# 公开\n\n![[priv]]\n")
+        create_test_obsidian_file(obsidian_vault / "priv.md", "# 私密\n\n不公开的内容\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "hugo_content"),
+            publish_filter='publish',
+        )
+        synchronizer = ObsidianHugoSynchronizer(config)
+        synchronizer.sync_vault()
+        output = temp_path / "hugo_content" / synchronizer.manifest.get("public.md")['output']
+        text = output.read_text(encoding='utf-8')
+        assert "\npriv\n" in text
+        assert "](priv)" not in text and "不公开" not in text
+
+
+def test_evicted_embedded_note_is_expanded_once_downloaded():
+    """An embed of a note iCloud has evicted is left unexpanded until the note is back."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "g.md", "# G\n\n定义\n")
+        create_test_obsidian_file(obsidian_vault / "e.md", "# E\n\n![[g]]\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "hugo_content"),
+        )
+        synchronizer = ObsidianHugoSynchronizer(config)
+        synchronizer.sync_vault()
+
+        def output(source):
+            path = temp_path / "hugo_content" / synchronizer.manifest.get(source)['output']
+            return path.read_text(encoding='utf-8')
+
+        (obsidian_vault / "g.md").rename(obsidian_vault / ".g.md.icloud")
+        create_test_obsidian_file(obsidian_vault / "e.md", "# E\n\n![[g]]\n\n改动\n")
+        stats = synchronizer.sync_vault()
+        assert stats['errors'] == 0 and stats['placeholders'] == 1
+        assert "改动" in output("e.md") and "定义" not in output("e.md")
+
+        (obsidian_vault / ".g.md.icloud").unlink()
+        create_test_obsidian_file(obsidian_vault / "g.md", "# G\n\n定义\n")
+        stats = synchronizer.sync_vault()
+        assert stats['invalidated'] == 1
+        assert "定义" in output("e.md")
+
+
+def test_identical_output_is_not_rewritten():
+    """A forced re-sync leaves byte-identical outputs and their mtimes alone."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "a.md", "# A\n\n正文\n")
+
+        config = SyncConfig(
+            obsidian_vault_path=str(obsidian_vault),
+            hugo_content_path=str(temp_path / "hugo_content"),
+        )
+        ObsidianHugoSynchronizer(config).sync_vault()
+        output = next((temp_path / "hugo_content").rglob("a.md"))
+        os.utime(output, ns=(1_000_000_000, 1_000_000_000))
+
+        config.use_manifest = False
+        stats = ObsidianHugoSynchronizer(config).sync_vault()
+        assert stats['processed'] == 1
+        assert output.stat().st_mtime_ns == 1_000_000_000
+        assert not list(output.parent.glob(".*.tmp"))
+
+
+def test_output_is_identical_across_hash_seeds():
+    """Tag order and dates do not depend on the interpreter's hash seed."""
+    import subprocess
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        obsidian_vault = temp_path / "obsidian_vault"
+        create_test_obsidian_file(obsidian_vault / "a.md",
+                                  "---\ntags: [b, a, c, a]\ncategories: 技术\ncreated: 2025-10-22 10:00:00\n---\n"
+                                  "# A\n\n#z #y #x\n")
+
+        outputs = []
+        for seed in ("1", "2"):
+            hugo_content = temp_path / f"hugo_{seed}"
+            subprocess.run(
+                [sys.executable, str(Path(__file__).with_name("obsidian_sync.py")),
+                 "--obsidian-vault", str(obsidian_vault), "--hugo-content", str(hugo_content),
+                 "--log-level", "ERROR"],
+                check=True, cwd=temp_dir, capture_output=True,
+                env={**os.environ, "PYTHONHASHSEED": seed},
+            )
+            outputs.append(next(hugo_content.rglob("a.md")).read_bytes())
+
+        assert outputs[0] == outputs[1]
+        text = outputs[0].decode("utf-8")
+        assert "date: '2025-10-22T10:00:00+08:00'" in text
+        assert "tags:\n- z\n- y\n- x\n- b\n- a\n- c\n" in text
+
+
 def extract_title_from_content(content: str) -> str:
     """Extract title from markdown content."""
     import re
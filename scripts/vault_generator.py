@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Synthetic Obsidian vault generator
+
+Builds a vault of any size for benchmarks and tests: nested folders, notes
+with and without frontmatter, mixed Chinese and English paragraphs,
+headings, wikilinks (plain, aliased, to headings and to missing notes),
+image embeds, %% comments %%, code fences holding link-like text, inline
+tags and frontmatter aliases. The same seed always produces the same
+files, mtimes included, so numbers measured on it compare across commits.
+"""
+
+import os
+import zlib
+import random
+import struct
+import argparse
+from pathlib import Path
+from typing import Dict, List
+
+
+# Fixed modification time (2025-06-01 UTC) so output paths and dates never
+# depend on when the vault was generated.
+BASE_MTIME = 1748736000
+
+_ZH_WORDS = ('同步', '笔记', '博客', '文章', '性能', '索引', '链接', '缓存', '目录', '标题',
+             '内容', '数据', '文件', '生成', '解析', '阅读', '政治学', '社会学', '哲学', '经济学')
+_EN_WORDS = ('sync', 'note', 'vault', 'index', 'link', 'cache', 'render', 'parser', 'output',
+             'heading', 'stream', 'batch', 'hash', 'graph', 'static', 'content', 'review', 'draft')
+_TAGS = ('读书', 'python', 'hugo', '笔记/摘录', 'research', '政治学', 'perf', 'idea')
+_HEADINGS = ('背景', 'Overview', '方法', 'Details', '总结', 'Notes', '参考', 'Open questions')
+
+
+def _png(width: int, height: int) -> bytes:
+    """A valid grayscale PNG of the given size."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    rows = b''.join(b'\x00' + bytes(width) for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows))
+            + chunk(b'IEND', b''))
+
+
+def _sentence(rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return ''.join(rng.choice(_ZH_WORDS) for _ in range(rng.randint(6, 16))) + '。'
+    words = [rng.choice(_EN_WORDS) for _ in range(rng.randint(6, 16))]
+    return ' '.join(words).capitalize() + '.'
+
+
+def _note_name(index: int) -> str:
+    return f"笔记 {index:06d}" if index % 3 == 0 else f"note-{index:06d}"
+
+
+def _folder(index: int, notes: int) -> str:
+    """Nested folders: about 50 notes per leaf folder, up to three levels deep."""
+    leaf = index // 50
+    parts = [f"area-{leaf % 8}"]
+    if notes > 400:
+        parts.append(f"topic-{leaf // 8 % 16}")
+    if notes > 6400:
+        parts.append(f"batch-{leaf // 128}")
+    return '/'.join(parts)
+
+
+def _note(rng: random.Random, index: int, names: List[str], images: List[str]) -> str:
+    lines = []
+    if rng.random() < 0.7:
+        lines.append('---')
+        if rng.random() < 0.6:
+            lines.append(f"title: \"{_sentence(rng)[:24].rstrip('。.')}\"")
+        lines.append(f"created: 2025-{index % 12 + 1:02d}-{index % 28 + 1:02d}T10:00:00")
+        lines.append(f"tags: [{', '.join(rng.sample(_TAGS, rng.randint(0, 3)))}]")
+        if rng.random() < 0.2:
+            lines.append(f"aliases: [alias-{index}]")
+        if rng.random() < 0.1:
+            lines.append('draft: true')
+        lines.append('---')
+        lines.append('')
+    lines.append(f"# {names[index]}")
+    lines.append('')
+
+    for section in range(rng.randint(1, 4)):
+        if section:
+            lines.append(f"## {rng.choice(_HEADINGS)}")
+            lines.append('')
+        for _ in range(rng.randint(1, 3)):
+            parts = [_sentence(rng) for _ in range(rng.randint(2, 6))]
+            roll = rng.random()
+            target = names[rng.randrange(len(names))]
+            if roll < 0.3:
+                parts.append(f"[[{target}]]")
+            elif roll < 0.45:
+                parts.append(f"[[{target}|{rng.choice(_EN_WORDS)}]]")
+            elif roll < 0.55:
+                parts.append(f"[[{target}#{rng.choice(_HEADINGS)}]]")
+            elif roll < 0.6:
+                parts.append(f"[[missing-{rng.randrange(1000)}]]")
+            if rng.random() < 0.3:
+                parts.append(f"#{rng.choice(_TAGS)}")
+            if rng.random() < 0.15:
+                parts.append(f"%%{_sentence(rng)}%%")
+            lines.append(' '.join(parts))
+            lines.append('')
+        if images and rng.random() < 0.15:
+            lines.append(f"![[{rng.choice(images)}]]")
+            lines.append('')
+        if rng.random() < 0.2:
+            lines.extend(['```python', "# [[not-a-link]] #not-a-tag", f"value = {index}", '```', ''])
+    return '\n'.join(lines)
+
+
+def generate_vault(root, notes: int, seed: int = 0, images: int = None) -> Dict[str, int]:
+    """Write a synthetic vault with `notes` notes under `root`.
+
+    `images` defaults to one image per 50 notes. Returns file and byte counts.
+    """
+    root = Path(root)
+    rng = random.Random(seed)
+    if images is None:
+        images = max(1, notes // 50)
+    names = [_note_name(index) for index in range(notes)]
+
+    image_names = []
+    attachments = root / 'attachments'
+    attachments.mkdir(parents=True, exist_ok=True)
+    for index in range(images):
+        name = f"image-{index:05d}.png"
+        path = attachments / name
+        path.write_bytes(_png(16 + index % 32, 8 + index % 16))
+        os.utime(path, (BASE_MTIME, BASE_MTIME))
+        image_names.append(name)
+
+    total_bytes = 0
+    folders = set()
+    for index in range(notes):
+        folder = root / _folder(index, notes)
+        if folder not in folders:
+            folder.mkdir(parents=True, exist_ok=True)
+            folders.add(folder)
+        data = _note(rng, index, names, image_names).encode('utf-8')
+        path = folder / f"{names[index]}.md"
+        path.write_bytes(data)
+        os.utime(path, (BASE_MTIME + index, BASE_MTIME + index))
+        total_bytes += len(data)
+
+    return {'notes': notes, 'images': images, 'folders': len(folders), 'bytes': total_bytes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Obsidian vault')
+    parser.add_argument('output', help='Directory to create the vault in')
+    parser.add_argument('--notes', type=int, default=1000, help='Number of notes')
+    parser.add_argument('--images', type=int, help='Number of images (default: notes / 50)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    args = parser.parse_args()
+
+    summary = generate_vault(args.output, args.notes, args.seed, args.images)
+    print(f"Generated {summary['notes']} notes, {summary['images']} images in "
+          f"{summary['folders']} folders ({summary['bytes'] / 1e6:.1f} MB) under {args.output}")
+
+
+if __name__ == "__main__":
+    main()